@@ -1,19 +1,38 @@
 import os
 from dotenv import load_dotenv
-from flask import Flask
 from flask_cors import CORS
+from app.utils.asincrono import FlaskAsync
 
 load_dotenv()
 
 def create_app():
-    app = Flask(__name__)
+    app = FlaskAsync(__name__)
     CORS(app, supports_credentials=True, origins=["http://localhost:4200"])
     app.secret_key = os.environ.get("SECRET_KEY")
+
+    from app.utils.session_store import configurar_sesiones
+    configurar_sesiones(app)
     
     api_version = 'v1'
 
-    from app.routes import admin_bp, maestro_bp
+    from app.utils.metrics import instrumentar_app
+    from app.utils.query_tracer import configurar_trazado
+    from app.utils.replica import configurar_replica
+    from app.utils.idempotencia import configurar_idempotencia
+    from app.utils.resiliencia import configurar_resiliencia
+    instrumentar_app(app)
+    configurar_trazado(app)
+    configurar_replica(app)
+    configurar_idempotencia(app)
+    configurar_resiliencia(app)
+
+    from app.routes import admin_bp, maestro_bp, metrics_bp
     app.register_blueprint(admin_bp, url_prefix=f'/{api_version}/admin')
     app.register_blueprint(maestro_bp, url_prefix=f'/{api_version}/maestro')
+    app.register_blueprint(metrics_bp, url_prefix=f'/{api_version}')
+
+    # Después de importar las rutas, para que las cachés ya estén suscritas
+    from app.utils.cambios import iniciar_cambios
+    iniciar_cambios()
 
     return app
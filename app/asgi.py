@@ -0,0 +1,187 @@
+"""
+Adaptador ASGI de la aplicación.
+
+Las vistas `async def` (calificaciones, listas de alumnos, dashboard y horarios del maestro)
+se esperan directamente en el event loop del servidor, por lo que una llamada lenta a PostgREST
+no ocupa un hilo. El resto de las rutas se ejecutan como WSGI en un pool de hilos.
+
+Los hooks de Flask (sesión, métricas, trazado de consultas, CORS) se ejecutan igual en ambos caminos,
+y en ambos corren en el pool: abren la sesión o esperan una llave de idempotencia en curso, y
+no deben bloquear el event loop.
+"""
+import asyncio
+import contextvars
+import functools
+import inspect
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from flask import request_started
+from flask.globals import request_ctx
+from werkzeug.exceptions import HTTPException
+
+# Hilos para las rutas síncronas cuando la app se sirve por ASGI
+ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 32))
+
+def _environ(scope: dict, cuerpo: bytes) -> dict:
+    """Construye el environ WSGI equivalente a un scope HTTP de ASGI."""
+    servidor = scope.get('server') or ('localhost', 80)
+    cliente = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': servidor[0],
+        'SERVER_PORT': str(servidor[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': cliente[0],
+        'CONTENT_LENGTH': str(len(cuerpo)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(cuerpo),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for nombre, valor in scope.get('headers', []):
+        nombre = nombre.decode('latin-1').upper().replace('-', '_')
+        valor = valor.decode('latin-1')
+        if nombre == 'CONTENT_LENGTH':
+            continue
+        if nombre == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = valor
+            continue
+        clave = f'HTTP_{nombre}'
+        environ[clave] = f'{environ[clave]},{valor}' if clave in environ else valor
+    return environ
+
+def _ejecutar_wsgi(aplicacion, environ: dict):
+    """Ejecuta una aplicación WSGI y regresa (status, headers ASGI, cuerpo)."""
+    estado = {}
+
+    def start_response(status, headers, exc_info=None):
+        estado['status'] = int(status.split(' ', 1)[0])
+        estado['headers'] = headers
+
+    resultado = aplicacion(environ, start_response)
+    try:
+        cuerpo = b''.join(resultado)
+    finally:
+        if hasattr(resultado, 'close'):
+            resultado.close()
+
+    headers = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in estado['headers']]
+    return estado['status'], headers, cuerpo
+
+def _con_excepcion(manejador, e: Exception):
+    """Llama a un manejador de errores de Flask con `e` como excepción activa (usan sys.exc_info y `raise`)."""
+    try:
+        raise e
+    except Exception:
+        return manejador(e)
+
+class AsgiFlask:
+    """
+    Aplicación ASGI que envuelve una app Flask.
+
+    Uso (requiere un servidor ASGI, p. ej. uvicorn):
+        uvicorn asgi:app --workers 2
+    """
+    def __init__(self, app):
+        self.app = app
+        self._pool = ThreadPoolExecutor(max_workers=ASGI_WSGI_THREADS, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise RuntimeError(f'Tipo de conexión no soportado: {scope["type"]}')
+
+        cuerpo = await self._leer_cuerpo(receive)
+        environ = _environ(scope, cuerpo)
+        if self._es_async(environ):
+            status, headers, contenido = await self._despachar_async(environ)
+        else:
+            loop = asyncio.get_running_loop()
+            status, headers, contenido = await loop.run_in_executor(self._pool, _ejecutar_wsgi, self.app, environ)
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': contenido})
+
+    async def _leer_cuerpo(self, receive) -> bytes:
+        partes = []
+        while True:
+            mensaje = await receive()
+            if mensaje['type'] == 'http.disconnect':
+                break
+            partes.append(mensaje.get('body', b''))
+            if not mensaje.get('more_body'):
+                break
+        return b''.join(partes)
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            mensaje = await receive()
+            if mensaje['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensaje['type'] == 'lifespan.shutdown':
+                self._pool.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _es_async(self, environ: dict) -> bool:
+        if environ['REQUEST_METHOD'] == 'OPTIONS':
+            return False
+        try:
+            endpoint, _ = self.app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return False
+        return inspect.iscoroutinefunction(self.app.view_functions.get(endpoint))
+
+    async def _despachar_async(self, environ: dict):
+        """
+        Equivalente a Flask.wsgi_app + full_dispatch_request. Solo la vista se espera en el loop;
+        los hooks, los manejadores de errores y la serialización de la respuesta corren en el pool.
+
+        Flask guarda los contextos de app y request en contextvars, así que todos los pasos
+        (en el pool y la vista) se ejecutan dentro del mismo contextvars.Context.
+        """
+        app = self.app
+        loop = asyncio.get_running_loop()
+        contexto = contextvars.copy_context()
+        ctx = app.request_context(environ)
+
+        def en_pool(funcion, *args):
+            return loop.run_in_executor(self._pool, functools.partial(contexto.run, funcion, *args))
+
+        def preprocesar():
+            request_started.send(app, _async_wrapper=app.ensure_sync)
+            rv = app.preprocess_request()
+            if rv is not None:
+                return rv, None
+            req = request_ctx.request
+            if req.routing_exception is not None:
+                app.raise_routing_exception(req)
+            return None, app.view_functions[req.url_rule.endpoint](**req.view_args)
+
+        error = None
+        try:
+            try:
+                await en_pool(ctx.push)
+                try:
+                    rv, vista = await en_pool(preprocesar)
+                    if vista is not None:
+                        rv = await asyncio.create_task(vista, context=contexto)
+                except Exception as e:
+                    rv = await en_pool(_con_excepcion, app.handle_user_exception, e)
+                response = await en_pool(app.finalize_request, rv)
+            except Exception as e:
+                error = e
+                response = await en_pool(_con_excepcion, app.handle_exception, e)
+            return await en_pool(_ejecutar_wsgi, response, environ)
+        finally:
+            await en_pool(ctx.pop, error)
@@ -1,4 +1,5 @@
 from .admin import admin_bp
 from .maestro import maestro_bp
+from .metrics import metrics_bp
 
-__all__ = ['admin_bp', 'maestro_bp']
\ No newline at end of file
+__all__ = ['admin_bp', 'maestro_bp', 'metrics_bp']
\ No newline at end of file
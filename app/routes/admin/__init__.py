@@ -1,5 +1,8 @@
 from flask import Blueprint, jsonify, session
 from app.utils.supabase_connection import supabaseConnection as sC
+from app.utils.formatos import respuesta_lista
+from app.utils.idempotencia import idempotente
+from app.services.fechas_parciales_service import FILTROS_VENTANA, aplicar_ventana_parcial
 from .auth import admin_auth_bp, admin_required
 from .grades import grades_admin_bp
 from .alums import alumnos_admin_bp
@@ -7,6 +10,7 @@ from .teachers import maestros_admin_bp
 from .courses import cursos_admin_bp
 from .groups import grupos_admin_bp
 from .assignments import asignaciones_admin_bp
+from .exports import exportaciones_admin_bp
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
@@ -32,7 +36,7 @@ def get_parciales():
                 'error': 'No se encontraron fechas parciales'
             }), 404
 
-        return jsonify({
+        return respuesta_lista({
             'success': True,
             'data': response.data,
             'total': len(response.data)
@@ -45,6 +49,7 @@ def get_parciales():
         }), 500
 
 @admin_bp.route('/parciales', methods=['POST'])
+@idempotente()
 @admin_required
 def create_partial_period():
     """
@@ -135,6 +140,108 @@ def create_partial_period():
             'error': f'Error interno del servidor: {str(e)}'
         }), 500
 
+@admin_bp.route('/parciales/lote', methods=['POST'])
+@idempotente()
+@admin_required
+def create_partial_periods_bulk():
+    """
+    Endpoint para abrir la ventana de un parcial en muchas asignaciones a la vez.
+
+    Body JSON:
+        numero_parcial, fecha_inicio, fecha_fin, activo (opcional, true)
+        filtro: {} para todas las asignaciones, o facultad / generacion / id_curso / id_grupo
+        actualizar_existentes (opcional, true): mover también las ventanas que ya existen
+    """
+    try:
+        from flask import request
+        from datetime import datetime
+        
+        data = request.get_json(silent=True)
+        
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': 'No se proporcionaron datos JSON'
+            }), 400
+        
+        # Validar campos requeridos
+        required_fields = ['numero_parcial', 'fecha_inicio', 'fecha_fin']
+        missing_fields = [field for field in required_fields if field not in data or not data[field]]
+        if 'filtro' not in data:
+            missing_fields.append('filtro')
+        
+        if missing_fields:
+            return jsonify({
+                'success': False,
+                'error': f'Campos requeridos faltantes: {", ".join(missing_fields)}'
+            }), 400
+        
+        # Validar formato de fechas
+        try:
+            fecha_inicio = datetime.fromisoformat(data['fecha_inicio'])
+            fecha_fin = datetime.fromisoformat(data['fecha_fin'])
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'Formato de fecha inválido. Use formato ISO (YYYY-MM-DDTHH:MM:SS)'
+            }), 400
+        
+        if fecha_inicio >= fecha_fin:
+            return jsonify({
+                'success': False,
+                'error': 'La fecha de inicio debe ser anterior a la fecha de fin'
+            }), 400
+        
+        # Validar número de parcial
+        if not isinstance(data['numero_parcial'], int) or data['numero_parcial'] < 1 or data['numero_parcial'] > 3:
+            return jsonify({
+                'success': False,
+                'error': 'El número de parcial debe ser 1, 2 o 3'
+            }), 400
+        
+        # Validar filtro ({} aplica a todas las asignaciones)
+        filtro = data['filtro']
+        if not isinstance(filtro, dict) or set(filtro) - set(FILTROS_VENTANA):
+            return jsonify({
+                'success': False,
+                'error': f'filtro debe ser un objeto con alguno de: {", ".join(FILTROS_VENTANA)}'
+            }), 400
+        
+        # Validar banderas opcionales (un "false" como texto no debe tomarse como verdadero)
+        activo = data.get('activo', True)
+        actualizar_existentes = data.get('actualizar_existentes', True)
+        for campo, valor in (('activo', activo), ('actualizar_existentes', actualizar_existentes)):
+            if not isinstance(valor, bool):
+                return jsonify({
+                    'success': False,
+                    'error': f'{campo} debe ser true o false'
+                }), 400
+        
+        resultado = aplicar_ventana_parcial(
+            data['numero_parcial'], fecha_inicio, fecha_fin, filtro,
+            activo=activo,
+            actualizar_existentes=actualizar_existentes
+        )
+        
+        if not resultado['asignaciones']:
+            return jsonify({
+                'success': False,
+                'error': 'No hay asignaciones que cumplan el filtro'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'message': f"Parcial {data['numero_parcial']}: {resultado['creadas']} ventana(s) creada(s), "
+                       f"{resultado['actualizadas']} actualizada(s)",
+            'data': resultado
+        }), 201 if resultado['creadas'] else 200
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error interno del servidor: {str(e)}'
+        }), 500
+
 @admin_bp.route('/parciales/<int:id_fecha_parcial>', methods=['PUT'])
 @admin_required
 def update_partial_period(id_fecha_parcial):
@@ -308,3 +415,4 @@ admin_bp.register_blueprint(maestros_admin_bp)
 admin_bp.register_blueprint(cursos_admin_bp)
 admin_bp.register_blueprint(grupos_admin_bp)
 admin_bp.register_blueprint(asignaciones_admin_bp)
+admin_bp.register_blueprint(exportaciones_admin_bp)
@@ -1,11 +1,19 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from app.utils.supabase_connection import supabaseConnection as sC
 from app.models import Alumno
+from app.services.kardex_service import obtener_kardex
+from app.services.alumnos_service import importar_alumnos as importar_lote_alumnos, transferir_alumnos as transferir_lote_alumnos
+from app.utils.importacion import ErrorImportacion, iterar_filas
+from app.utils.formatos import respuesta_lista
+from app.utils.replica import lectura_replica
+from app.utils.query_tracer import presupuesto_consultas
+from .auth import admin_required
 
 alumnos_admin_bp = Blueprint("alumnos_admin", __name__)
 
 # Ruta para obtener todos los alumnos
 @alumnos_admin_bp.route('/alumnos')
+@lectura_replica()
 def get_alumnos():
     """"Endpoint para obtener todos los alumnos registrados en la base de datos."""
     try:
@@ -19,7 +27,7 @@ def get_alumnos():
         alumnos = [Alumno.from_dict(row) for row in response.data]
         alumnos_data = [alumno.to_dict() for alumno in alumnos]
         
-        return jsonify({
+        return respuesta_lista({
             'success': True,
             'data': alumnos_data,
             'total': len(alumnos_data)
@@ -33,6 +41,7 @@ def get_alumnos():
 
 # Ruta para obtener un alumno por ID
 @alumnos_admin_bp.route('/alumnos/<string:id_alumno>')
+@lectura_replica()
 def get_alumno(id_alumno):
     """Endpoint para obtener un alumno por su ID."""
     try:
@@ -62,8 +71,44 @@ def get_alumno(id_alumno):
             'error': str(e)
         }), 500
 
+# Ruta para obtener el kardex de un alumno
+@alumnos_admin_bp.route('/alumnos/<string:id_alumno>/kardex')
+@admin_required
+@presupuesto_consultas(1)
+def get_kardex(id_alumno):
+    """
+    Endpoint para obtener las calificaciones de un alumno en todas sus materias, con la
+    calificación final de cada una y los promedios por parcial y general.
+
+    Se responde con ETag: si el kardex no ha cambiado, una petición con If-None-Match
+    recibe 304 sin cuerpo.
+    """
+    try:
+        kardex = obtener_kardex(id_alumno)
+        if kardex is None:
+            return jsonify({
+                'success': False,
+                'error': 'Alumno no encontrado'
+            }), 404
+
+        response = jsonify({
+            'success': True,
+            'data': kardex.datos
+        })
+        response.set_etag(kardex.etag)
+        # El navegador puede guardarlo, pero debe revalidar con el ETag antes de usarlo
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 # Ruta para obtener alumnos por nombre completo
 @alumnos_admin_bp.route('/alumnos/nombre/<string:nombre>')
+@lectura_replica()
 def get_alumno_by_name(nombre):
     """Endpoint para obtener un alumno por su nombre completo.
     
@@ -125,7 +170,7 @@ def get_alumno_by_name(nombre):
             x['nombre_completo'].lower()
         ))
         
-        return jsonify({
+        return respuesta_lista({
             'success': True,
             'data': alumnos_data,
             'total': len(alumnos_data),
@@ -141,6 +186,7 @@ def get_alumno_by_name(nombre):
 
 # Ruta para obtener alumnos por grupo
 @alumnos_admin_bp.route('/alumnos/grupo/<string:id_grupo>')
+@lectura_replica()
 def get_alumnos_by_group(id_grupo):
     """Endpoint para obtener alumnos por ID de grupo."""
     try:
@@ -160,7 +206,7 @@ def get_alumnos_by_group(id_grupo):
         alumnos = [Alumno.from_dict(row) for row in response.data]
         alumnos_data = [alumno.to_dict() for alumno in alumnos]
         
-        return jsonify({
+        return respuesta_lista({
             'success': True,
             'data': alumnos_data,
             'total': len(alumnos_data)
@@ -172,3 +218,104 @@ def get_alumnos_by_group(id_grupo):
             'error': str(e)
         }), 500
 
+# Ruta para importar alumnos en lote (CSV o NDJSON)
+@alumnos_admin_bp.route('/alumnos/importar', methods=['POST'])
+@admin_required
+def importar_alumnos():
+    """
+    Endpoint para importar alumnos en lote.
+
+    El cuerpo (o el archivo en el campo `file`) puede ser CSV o NDJSON con las columnas
+    id_alumno, id_grupo, nombre, apellido_paterno, apellido_materno, fecha_nacimiento y sexo.
+    Se procesa conforme se lee, por lo que acepta decenas de miles de alumnos por llamada.
+    Con ?actualizar=true los alumnos existentes se actualizan en lugar de reportarse como error.
+    """
+    actualizar = request.args.get('actualizar', 'false').lower() in ('true', '1', 'si', 'sí')
+    try:
+        filas = iterar_filas()
+    except ErrorImportacion as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    try:
+        reporte = importar_lote_alumnos(filas, actualizar=actualizar)
+        
+        # 201 si todo se guardó, 207 si fue parcial, 400 si no se guardó ninguno
+        if not reporte['errores'] and not reporte.get('interrumpido'):
+            status_code = 201
+        else:
+            status_code = 207 if reporte['guardados'] else 400
+        return jsonify({
+            'success': status_code == 201,
+            'message': f"{reporte['guardados']} de {reporte['total']} alumno(s) guardados",
+            'resumen': reporte
+        }), status_code
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error interno del servidor: {str(e)}'
+        }), 500
+
+# Ruta para cambiar de grupo a varios alumnos a la vez
+@alumnos_admin_bp.route('/alumnos/transferir', methods=['POST'])
+@admin_required
+def transferir_alumnos():
+    """
+    Endpoint para reasignar alumnos a otro grupo.
+
+    Body JSON:
+        {"id_grupo_destino": "...", "id_grupo_origen": "..."}  mueve a todo el grupo de origen
+        {"id_grupo_destino": "...", "alumnos": ["...", ...]}   mueve solo los alumnos indicados
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        id_grupo_destino = data.get('id_grupo_destino')
+        id_grupo_origen = data.get('id_grupo_origen')
+        alumnos = data.get('alumnos')
+        
+        if not id_grupo_destino:
+            return jsonify({
+                'success': False,
+                'error': 'El campo id_grupo_destino es requerido'
+            }), 400
+        
+        if bool(id_grupo_origen) == bool(alumnos):
+            return jsonify({
+                'success': False,
+                'error': 'Proporcione id_grupo_origen o una lista no vacía en alumnos, pero no ambos'
+            }), 400
+        
+        if alumnos is not None and not isinstance(alumnos, list):
+            return jsonify({
+                'success': False,
+                'error': 'El campo alumnos debe ser una lista de IDs'
+            }), 400
+        
+        if id_grupo_origen == id_grupo_destino:
+            return jsonify({
+                'success': False,
+                'error': 'El grupo de origen y el de destino son el mismo'
+            }), 400
+        
+        try:
+            resultado = transferir_lote_alumnos(id_grupo_destino, id_grupo_origen, alumnos)
+        except LookupError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'message': f"{resultado['movidos']} alumno(s) movidos al grupo {id_grupo_destino}",
+            'data': resultado
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error interno del servidor: {str(e)}'
+        }), 500
@@ -1,16 +1,24 @@
 from flask import Blueprint, jsonify, request
+import json
 import os
 from flask import send_from_directory
 from app.services.fechas_parciales_service import crear_fecha_parcial
 from urllib.parse import urlparse
 from datetime import datetime
 from app.utils.supabase_connection import supabaseConnection as sC
+from app.services.asignaciones_service import crear_asignaciones, expandir_matriz, validar_parciales
+from app.utils.formatos import respuesta_lista
+from app.utils.replica import lectura_replica
+from app.utils.idempotencia import idempotente
+from app.utils.importacion import ErrorImportacion, leer_filas
+from .auth import admin_required
 
 asignaciones_admin_bp = Blueprint("asignaciones_admin", __name__)
 
 # == Ruta para gestion de asignaciones ==
 # Listar asignaciones
 @asignaciones_admin_bp.route('/asignaciones')
+@lectura_replica()
 def get_asignaciones():
     """
     Endpoint para obtener todas las asignaciones registradas en la base de datos.
@@ -30,7 +38,7 @@ def get_asignaciones():
                 'error': 'No se encontraron asignaciones'
             }), 404
         
-        return jsonify({
+        return respuesta_lista({
             'success': True,
             'data': response.data,
             'total': len(response.data)
@@ -42,6 +50,90 @@ def get_asignaciones():
             'error': str(e)
         }), 500
 
+# Crear asignaciones en lote
+@asignaciones_admin_bp.route('/asignaciones/lote', methods=['POST'])
+@idempotente()
+@admin_required
+def crear_asignaciones_lote():
+    """
+    Endpoint para crear muchas asignaciones (curso × grupo × maestro) a la vez.
+
+    Acepta:
+    - {"matriz": {"id_grupo": {"id_curso": "id_maestro", ...}, ...}}
+    - Un arreglo JSON (o {"asignaciones": [...]}) o un CSV con id_curso, id_grupo e id_maestro.
+
+    Opcionalmente "parciales" (en el JSON, o como campo de formulario con JSON si se envía un CSV)
+    con las ventanas [{"numero_parcial", "fecha_inicio", "fecha_fin"}] que se crearán en cada
+    asignación nueva.
+
+    Un curso × grupo que ya tiene otro maestro, o que se repite en la solicitud, se reporta
+    como conflicto y no se crea.
+    """
+    try:
+        data = request.get_json(silent=True)
+        
+        try:
+            if isinstance(data, dict) and 'matriz' in data:
+                filas = expandir_matriz(data['matriz'])
+                if not filas:
+                    raise ErrorImportacion('La matriz no contiene asignaciones')
+            else:
+                filas = leer_filas('asignaciones')
+        except (ErrorImportacion, ValueError) as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        # Ventanas de parciales opcionales
+        parciales = data.get('parciales') if isinstance(data, dict) else request.form.get('parciales')
+        if isinstance(parciales, str):
+            try:
+                parciales = json.loads(parciales)
+            except ValueError:
+                return jsonify({
+                    'success': False,
+                    'error': 'parciales debe ser un arreglo JSON'
+                }), 400
+        if parciales is not None:
+            parciales, error = validar_parciales(parciales)
+            if error:
+                return jsonify({
+                    'success': False,
+                    'error': error
+                }), 400
+        
+        resultados = crear_asignaciones(filas, parciales)
+        creadas = sum(1 for r in resultados if r['estado'] == 'creada')
+        existentes = sum(1 for r in resultados if r['estado'] == 'existente')
+        conflictos = sum(1 for r in resultados if r['estado'] == 'conflicto')
+        errores = len(resultados) - creadas - existentes
+        
+        # 201 si se creó alguna sin errores, 200 si ya existían todas, 207 si fue parcial, 400 si todo falló
+        if errores:
+            status_code = 207 if creadas or existentes else 400
+        else:
+            status_code = 201 if creadas else 200
+        return jsonify({
+            'success': errores == 0,
+            'message': f'{creadas} asignación(es) creada(s), {existentes} ya existían',
+            'resumen': {
+                'total': len(resultados),
+                'creadas': creadas,
+                'existentes': existentes,
+                'conflictos': conflictos,
+                'errores': errores,
+                'parciales_por_asignacion': len(parciales) if parciales else 0
+            },
+            'resultados': resultados
+        }), status_code
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error interno del servidor: {str(e)}'
+        }), 500
+
 @asignaciones_admin_bp.route('/asignaciones/<string:id_asignacion>/planeacion', methods=['GET'])
 def ver_pdf_planeacion_asignacion(id_asignacion):
     """
@@ -1,5 +1,10 @@
 from flask import Blueprint, jsonify, request
 from app.utils.supabase_connection import supabaseConnection as sC
+from app.services.dependencias_service import dependencias_curso
+from app.services.kardex_service import invalidar_kardex
+from app.utils.formatos import respuesta_lista
+from app.utils.replica import lectura_replica
+from app.utils.idempotencia import idempotente
 import re
 from datetime import datetime
 
@@ -7,6 +12,8 @@ cursos_admin_bp = Blueprint("cursos_admin", __name__)
 
 # === Ruta para la gestión de cursos ===
 @cursos_admin_bp.route('/cursos', methods=['GET', 'POST'])
+@idempotente()
+@lectura_replica()
 def manejo_cursos():
     if request.method == 'GET':
         return get_cursos()
@@ -28,7 +35,7 @@ def get_cursos():
                 'error': 'No se encontraron cursos'
             }), 404
         
-        return jsonify({
+        return respuesta_lista({
             'success': True,
             'data': response.data,
             'total': len(response.data)
@@ -253,6 +260,7 @@ def crear_curso():
 
 # Ruta para obtener un curso por su ID, nombre o código
 @cursos_admin_bp.route('/cursos/<string:identificador>')
+@lectura_replica()
 def get_curso(identificador):
     """Endpoint para obtener un curso por su ID, nombre o código."""
     try:
@@ -334,85 +342,8 @@ def delete_curso(id_curso):
         # Obtener información del curso para la respuesta
         curso_info = curso_response.data[0]
         
-        # Verificar relaciones existentes que impiden la eliminación
-        relacionales_errors = []
-        
-        # Verificar si tiene asignaciones activas
-        asignaciones_response = supabase.table('asignacion').select(
-            'id_asignacion, id_grupo, id_maestro, grupo(nombre_grupo), maestro(nombre, apellido_paterno)'
-        ).eq('id_curso', id_curso).execute()
-        
-        if asignaciones_response.data:
-            asignaciones_detalles = []
-            for asignacion in asignaciones_response.data:
-                grupo_nombre = asignacion.get('grupo', {}).get('nombre_grupo', 'N/A')
-                maestro_info = asignacion.get('maestro', {})
-                maestro_nombre = f"{maestro_info.get('nombre', 'N/A')} {maestro_info.get('apellido_paterno', '')}"
-                
-                asignaciones_detalles.append({
-                    'id_asignacion': asignacion['id_asignacion'],
-                    'grupo': grupo_nombre,
-                    'maestro': maestro_nombre.strip()
-                })
-            
-            relacionales_errors.append({
-                'tabla': 'asignacion',
-                'count': len(asignaciones_response.data),
-                'mensaje': f'El curso tiene {len(asignaciones_response.data)} asignación(es) activa(s)',
-                'detalles': asignaciones_detalles
-            })
-        
-        # Verificar si tiene calificaciones asociadas a través de asignaciones
-        if asignaciones_response.data:
-            asignacion_ids = [asig['id_asignacion'] for asig in asignaciones_response.data]
-            
-            # Usar filtro 'in' para verificar calificaciones
-            calificaciones_response = supabase.table('calificaciones_alumno_curso').select(
-                'id_calif_alum_curso, id_alumno, alumno(nombre, apellido_paterno)'
-            ).in_('id_asignacion', asignacion_ids).execute()
-            
-            if calificaciones_response.data:
-                calificaciones_detalles = []
-                for calif in calificaciones_response.data[:10]:  # Limitar a 10 para no sobrecargar
-                    alumno_info = calif.get('alumno', {})
-                    alumno_nombre = f"{alumno_info.get('nombre', 'N/A')} {alumno_info.get('apellido_paterno', '')}"
-                    
-                    calificaciones_detalles.append({
-                        'id_alumno': calif['id_alumno'],
-                        'alumno': alumno_nombre.strip()
-                    })
-                
-                relacionales_errors.append({
-                    'tabla': 'calificaciones_alumno_curso',
-                    'count': len(calificaciones_response.data),
-                    'mensaje': f'El curso tiene {len(calificaciones_response.data)} calificación(es) registrada(s)',
-                    'detalles': calificaciones_detalles,
-                    'nota': 'Se muestran solo las primeras 10 calificaciones' if len(calificaciones_response.data) > 10 else None
-                })
-        
-        # Verificar si tiene horarios asociados a través de asignaciones
-        if asignaciones_response.data:
-            asignacion_ids = [asig['id_asignacion'] for asig in asignaciones_response.data]
-            
-            horarios_response = supabase.table('horario_asignacion').select(
-                'id_horario, dia_semana, hora_inicio, hora_fin'
-            ).in_('id_asignacion', asignacion_ids).execute()
-            
-            if horarios_response.data:
-                horarios_detalles = []
-                for horario in horarios_response.data:
-                    horarios_detalles.append({
-                        'dia': horario['dia_semana'],
-                        'hora_inicio': horario['hora_inicio'],
-                        'hora_fin': horario['hora_fin']
-                    })
-                
-                relacionales_errors.append({
-                    'tabla': 'horario_asignacion',
-                    'count': len(horarios_response.data),
-                    'mensaje': f'El curso tiene {len(horarios_response.data)} horario(s) programado(s)',
-                    'detalles': horarios_detalles
-                })
+        # Verificar relaciones existentes que impiden la eliminación (solo conteos y una muestra)
+        relacionales_errors = dependencias_curso(id_curso)
         
         # Si hay relaciones, no permitir eliminación
         if relacionales_errors:
@@ -649,6 +580,9 @@ def edit_curso(id_curso):
                 'error': 'No se pudo actualizar el curso. Verifique los datos proporcionados'
             }), 500
 
+        # El nombre y el código del curso aparecen en el kardex de sus alumnos
+        invalidar_kardex()
+
         # Obtener el curso actualizado
         curso_actualizado = update_response.data[0]
         
@@ -0,0 +1,58 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from datetime import datetime
+from app.services.exportacion_service import (
+    FORMATOS_EXPORTACION, ExportacionNoDisponible, generar_zip_exportacion, tablas_solicitadas, verificar_disponible
+)
+from .auth import admin_required
+
+exportaciones_admin_bp = Blueprint("exportaciones_admin", __name__)
+
+@exportaciones_admin_bp.route('/export/snapshot', methods=['GET'])
+@admin_required
+def export_snapshot():
+    """
+    Endpoint para descargar una copia de las tablas principales para análisis, como un ZIP
+    con un archivo Parquet (o Arrow IPC) tipado por tabla.
+
+    Query params:
+        formato: parquet (por defecto) o arrow
+        tablas: lista separada por comas (por defecto alumno, grupo, curso, maestro, asignacion,
+                horario_asignacion y calificaciones)
+    """
+    try:
+        formato = request.args.get('formato', 'parquet').lower()
+        if formato not in FORMATOS_EXPORTACION:
+            return jsonify({
+                'success': False,
+                'error': f'Formato inválido. Debe ser uno de: {", ".join(FORMATOS_EXPORTACION)}'
+            }), 400
+
+        nombres = [nombre.strip() for nombre in request.args.get('tablas', '').split(',') if nombre.strip()]
+        try:
+            tablas = tablas_solicitadas(nombres)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
+        try:
+            verificar_disponible()
+        except ExportacionNoDisponible as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 501
+
+        nombre = f"snapshot-{datetime.now():%Y%m%d-%H%M%S}.zip"
+        return Response(
+            stream_with_context(generar_zip_exportacion(tablas, formato)),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename="{nombre}"'}
+        )
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error interno del servidor: {str(e)}'
+        }), 500
@@ -1,11 +1,16 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from app.utils.supabase_connection import supabaseConnection as sC
+from app.services.boletas_service import buscar_grupos, generar_zip_boletas
+from app.services.calificacion_service import matriz_calificaciones
+from app.utils.formatos import respuesta_lista
+from app.utils.query_tracer import presupuesto_consultas
 from .auth import admin_required
 
 grades_admin_bp = Blueprint("grades_admin", __name__)
 
 @grades_admin_bp.route('/grades/assignments/<int:id_asignacion>', methods=['GET'])
 @admin_required
+@presupuesto_consultas(2)
 def get_grades_by_assignment(id_asignacion):
     """Endpoint para que el administrador vea todas las calificaciones de una asignación"""
     try:
@@ -29,14 +34,14 @@ def get_grades_by_assignment(id_asignacion):
             '*, alumno(id_alumno, nombre, apellido_paterno, apellido_materno)'
         ).eq('id_asignacion', id_asignacion).execute()
         
-        return jsonify({
+        return respuesta_lista({
             'success': True,
             'data': {
                 'asignacion_info': asignacion_info,
                 'calificaciones': calificaciones_response.data,
                 'total_calificaciones': len(calificaciones_response.data)
             }
-        })
+        }, clave='data.calificaciones')
     
     except Exception as e:
         return jsonify({
@@ -44,8 +49,37 @@ def get_grades_by_assignment(id_asignacion):
             'error': f'Error interno del servidor: {str(e)}'
         }), 500
 
+@grades_admin_bp.route('/grades/groups/<string:id_grupo>/gradebook', methods=['GET'])
+@admin_required
+@presupuesto_consultas(1)
+def get_group_gradebook(id_grupo):
+    """
+    Endpoint para obtener las calificaciones de todo un grupo (alumnos × materias × parciales)
+    como matriz: listas de alumnos y materias, y un arreglo plano por parcial.
+    """
+    try:
+        matriz = matriz_calificaciones(id_grupo)
+
+        if matriz is None:
+            return jsonify({
+                'success': False,
+                'error': 'Grupo no encontrado'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'data': matriz
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error interno del servidor: {str(e)}'
+        }), 500
+
 @grades_admin_bp.route('/grades/maestro/<string:id_maestro>', methods=['GET'])
 @admin_required
+@presupuesto_consultas(2)
 def get_grades_by_teacher(id_maestro):
     """Endpoint para que el administrador vea todas las calificaciones de un maestro"""
     try:
@@ -61,22 +95,20 @@ def get_grades_by_teacher(id_maestro):
         
         maestro_info = maestro_response.data[0]
         
-        # Obtener asignaciones del maestro
+        # Obtener asignaciones del maestro con sus calificaciones embebidas en una sola consulta
         asignaciones_response = supabase.table('asignacion').select(
-            'id_asignacion, curso(id_curso, nombre, codigo), grupo(id_grupo, nombre_grupo)'
+            'id_asignacion, curso(id_curso, nombre, codigo), grupo(id_grupo, nombre_grupo), '
+            'calificaciones(*, alumno(id_alumno, nombre, apellido_paterno, apellido_materno))'
         ).eq('id_maestro', id_maestro).execute()
 
         grades_data = []
         
         for asignacion in asignaciones_response.data:
-            # Obtener calificaciones para cada asignación
-            calificaciones_response = supabase.table('calificaciones').select(
-                '*, alumno(id_alumno, nombre, apellido_paterno, apellido_materno)'
-            ).eq('id_asignacion', asignacion['id_asignacion']).execute()
+            calificaciones = asignacion.pop('calificaciones', None) or []
             
             grades_data.append({
                 'asignacion': asignacion,
-                'calificaciones': calificaciones_response.data
+                'calificaciones': calificaciones
             })
         
         return jsonify({
@@ -164,3 +196,44 @@ def get_lesson_plans_by_teacher(id_maestro):
             'success': False,
             'error': f'Error interno del servidor: {str(e)}'
         }), 500
+
+@grades_admin_bp.route('/report-cards', methods=['GET'])
+@admin_required
+def download_report_cards():
+    """
+    Endpoint para descargar las boletas de un grupo o de una generación completa como ZIP,
+    con un archivo HTML por alumno.
+
+    Query params: id_grupo, o generacion (y opcionalmente facultad).
+    El ZIP se envía conforme se generan las boletas, sin esperar a tenerlas todas.
+    """
+    try:
+        id_grupo = request.args.get('id_grupo')
+        generacion = request.args.get('generacion')
+        facultad = request.args.get('facultad')
+
+        if not id_grupo and not generacion:
+            return jsonify({
+                'success': False,
+                'error': 'Se requiere id_grupo o generacion'
+            }), 400
+
+        grupos = buscar_grupos(id_grupo=id_grupo, generacion=generacion, facultad=facultad)
+        if not grupos:
+            return jsonify({
+                'success': False,
+                'error': 'No se encontraron grupos con los filtros indicados'
+            }), 404
+
+        nombre = f"boletas-{id_grupo or generacion}.zip".replace('"', '')
+        return Response(
+            stream_with_context(generar_zip_boletas(grupos)),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename="{nombre}"'}
+        )
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error interno del servidor: {str(e)}'
+        }), 500
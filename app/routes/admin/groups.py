@@ -1,11 +1,14 @@
 from flask import Blueprint, jsonify
 from app.utils.supabase_connection import supabaseConnection as sC
+from app.utils.formatos import respuesta_lista
+from app.utils.replica import lectura_replica
 
 grupos_admin_bp = Blueprint("grupos_admin", __name__)
 
 
 # == Ruta para la gestion de grupos ==
 @grupos_admin_bp.route('/grupos')
+@lectura_replica()
 def get_grupos():
     """
     Endpoint para obtener todos los grupos registrados en la base de datos.
@@ -23,7 +26,7 @@ def get_grupos():
                 'error': 'No se encontraron grupos'
             }), 404
         
-        return jsonify({
+        return respuesta_lista({
             'success': True,
             'data': response.data,
             'total': len(response.data)
@@ -37,6 +40,7 @@ def get_grupos():
 
 # ver grupos por id, nombre o codigo
 @grupos_admin_bp.route('/grupos/<string:identificador>')
+@lectura_replica()
 def get_grupo(identificador):
     """
     Endpoint para obtener un grupo por su ID, nombre o código.
@@ -1,8 +1,16 @@
 from flask import Blueprint, jsonify, request
-import bcrypt
 from datetime import datetime
 from app.utils.supabase_connection import supabaseConnection as sC
 from app.models import Maestro
+from app.utils.session_store import revocar_sesiones_usuario
+from app.services.dependencias_service import dependencias_maestro
+from app.services.maestros_service import (
+    hashear_contrasena, importar_maestros as importar_lote_maestros, preparar_registros_maestro, validar_datos_maestro
+)
+from app.utils.formatos import respuesta_lista
+from app.utils.replica import lectura_replica
+from app.utils.idempotencia import idempotente
+from app.utils.importacion import ErrorImportacion, leer_filas
 from .auth import admin_required
 
 maestros_admin_bp = Blueprint("maestros_admin", __name__)
@@ -12,7 +20,9 @@ maestros_admin_bp = Blueprint("maestros_admin", __name__)
 
 # Ruta para ver todos los maestros y crear uno nuevo
 @maestros_admin_bp.route('/maestros', methods=['GET', 'POST'])
+@idempotente()
 @admin_required
+@lectura_replica()
 def manejo_maestros():
     if request.method == 'GET':
         return get_maestros()
@@ -37,7 +47,7 @@ def get_maestros():
                 'error': 'No se encontraron maestros'
             }), 404
         
-        return jsonify({
+        return respuesta_lista({
             'success': True,
             'data': maestros_data,
             'total': len(maestros_data)
@@ -61,125 +71,35 @@ def crear_maestro():
                 'error': 'No se proporcionaron datos JSON'
             }), 400
         
-        # Validar campos requeridos
-        required_fields = ['id_usuario', 'nombre', 'apellido_paterno', 'contrasena']
-        missing_fields = [field for field in required_fields if field not in data or not data[field]]
-        
-        if missing_fields:
-            return jsonify({
-                'success': False,
-                'error': f'Campos requeridos faltantes: {", ".join(missing_fields)}'
-            }), 400
-        
-        # Validar formato del ID (6 caracteres)
-        if len(data['id_usuario']) != 6:
-            return jsonify({
-                'success': False,
-                'error': 'El ID de usuario debe tener exactamente 6 caracteres'
-            }), 400
-        
-        # Validar longitud mínima de contraseña
-        if len(data['contrasena']) < 6:
+        # Validar campos requeridos, formato del ID, contraseña, rol y fecha de nacimiento
+        error = validar_datos_maestro(data)
+        if error:
             return jsonify({
                 'success': False,
-                'error': 'La contraseña debe tener al menos 6 caracteres'
+                'error': error
             }), 400
         
         # Obtener conexión a Supabase
         supabase = sC.get_instance().get_client()
         
-        # Verificar si ya existe el ID de usuario
-        existing_user = supabase.table('usuario').select('id_usuario').eq('id_usuario', data['id_usuario']).execute()
-        if existing_user.data:
-            return jsonify({
-                'success': False,
-                'error': f'El ID de usuario {data["id_usuario"]} ya existe'
-            }), 409
-        
-        # Encriptar contraseña
-        password_bytes = data['contrasena'].encode('utf-8')
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(password_bytes, salt)
-        
-        # Preparar datos del usuario
-        user_data = {
-            'id_usuario': data['id_usuario'],
-            'contrasena': hashed_password.decode('utf-8'),
-            'role': data.get('role', 'maestro'),  # Default a 'maestro'
-            'fecha_creacion': datetime.now().isoformat()
-        }
-        
-        # Validar rol si se proporciona
-        valid_roles = ['admin', 'maestro']
-        if user_data['role'] not in valid_roles:
-            return jsonify({
-                'success': False,
-                'error': f'Rol inválido. Debe ser uno de: {", ".join(valid_roles)}'
-            }), 400
+        # Encriptar contraseña y preparar datos del usuario y del maestro
+        user_data, maestro_data = preparar_registros_maestro(data, hashear_contrasena(data['contrasena']))
         
-        # Preparar datos del maestro
-        maestro_data = {
-            'id_usuario': data['id_usuario'],
-            'nombre': data['nombre'],
-            'apellido_paterno': data['apellido_paterno'],
-            'apellido_materno': data.get('apellido_materno'),
-            'fecha_nacimiento': data.get('fecha_nacimiento'),
-            'especialidad': data.get('especialidad')
-        }
-        
-        # Validar fecha de nacimiento si se proporciona
-        if maestro_data['fecha_nacimiento']:
-            try:
-                datetime.strptime(maestro_data['fecha_nacimiento'], '%Y-%m-%d')
-            except ValueError:
-                return jsonify({
-                    'success': False,
-                    'error': 'Formato de fecha de nacimiento inválido. Use YYYY-MM-DD'
-                }), 400
-        
-        # Iniciar transacción - crear usuario primero
+        # Crear usuario y maestro en una sola transacción (función crear_maestro en la base de datos)
         try:
-            # Crear usuario
-            user_response = supabase.table('usuario').insert(user_data).execute()
-            
-            if not user_response.data:
-                return jsonify({
-                    'success': False,
-                    'error': 'Error al crear el usuario'
-                }), 500
-            
-            # Crear maestro
-            maestro_response = supabase.table('maestro').insert(maestro_data).execute()
-            
-            if not maestro_response.data:
-                # Si falla crear maestro, eliminar usuario creado
-                supabase.table('usuario').delete().eq('id_usuario', data['id_usuario']).execute()
-                return jsonify({
-                    'success': False,
-                    'error': 'Error al crear el maestro'
-                }), 500
-            
-            # Preparar respuesta exitosa (sin incluir contraseña)
-            created_user = user_response.data[0].copy()
-            created_user.pop('contrasena', None)  # Remover contraseña de la respuesta
+            response = supabase.rpc('crear_maestro', {
+                'datos_usuario': user_data,
+                'datos_maestro': maestro_data
+            }).execute()
             
             return jsonify({
                 'success': True,
-                'data': {
-                    'usuario': created_user,
-                    'maestro': maestro_response.data[0]
-                },
+                'data': response.data,
                 'message': 'Maestro y usuario creados exitosamente'
             }), 201
             
         except Exception as db_error:
-            # Limpiar usuario si se creó pero falló el maestro
-            try:
-                supabase.table('usuario').delete().eq('id_usuario', data['id_usuario']).execute()
-            except:
-                pass
-            
-            # Verificar si es error de duplicado
+            # Verificar si es error de duplicado (la transacción ya se revirtió)
             if 'duplicate' in str(db_error).lower() or 'unique' in str(db_error).lower():
                 return jsonify({
                     'success': False,
@@ -194,10 +114,54 @@ def crear_maestro():
             'error': f'Error interno del servidor: {str(e)}'
         }), 500
 
+# Ruta para dar de alta muchos maestros a la vez (JSON o CSV)
+@maestros_admin_bp.route('/maestros/importar', methods=['POST'])
+@idempotente()
+@admin_required
+def importar_maestros():
+    """
+    Endpoint para importar maestros en lote.
+
+    Acepta un arreglo JSON (o {"maestros": [...]}) o un CSV con las columnas de POST /maestros.
+    Regresa un resultado por fila; las filas válidas se crean aunque otras tengan errores.
+    """
+    try:
+        filas = leer_filas('maestros')
+    except ErrorImportacion as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    try:
+        resultados = importar_lote_maestros(filas)
+        creados = sum(1 for r in resultados if r['estado'] == 'creado')
+        errores = len(resultados) - creados
+        
+        # 201 si todo se creó, 207 si fue parcial, 400 si no se creó ninguno
+        status_code = 201 if not errores else 207 if creados else 400
+        return jsonify({
+            'success': errores == 0,
+            'message': f'{creados} de {len(resultados)} maestro(s) creados',
+            'resumen': {
+                'total': len(resultados),
+                'creados': creados,
+                'errores': errores
+            },
+            'resultados': resultados
+        }), status_code
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error interno del servidor: {str(e)}'
+        }), 500
+
 # Rutas para ver a un maestro en específico
 # por id
 @maestros_admin_bp.route('/maestros/<string:id_usuario>')
 @admin_required
+@lectura_replica()
 def get_maestro(id_usuario):
     """Endpoint para obtener un maestro por su ID de usuario."""
     try:
@@ -227,6 +191,7 @@ def get_maestro(id_usuario):
 # por nombre
 @maestros_admin_bp.route('/maestros/nombre/<string:nombre>')
 @admin_required
+@lectura_replica()
 def get_maestro_by_name(nombre):
     """Endpoint para obtener un maestro por su nombre completo."""
     try:
@@ -259,7 +224,7 @@ def get_maestro_by_name(nombre):
                 'searched_term': nombre_limpio
             }), 404
         
-        return jsonify({
+        return respuesta_lista({
             'success': True,
             'data': response.data,
             'total': len(response.data),
@@ -276,6 +241,7 @@ def get_maestro_by_name(nombre):
 # por especialidad
 @maestros_admin_bp.route('/maestros/especialidad/<string:especialidad>')
 @admin_required
+@lectura_replica()
 def get_maestros_by_specialty(especialidad):
     """Endpoint para obtener maestros por especialidad."""
     try:
@@ -291,7 +257,7 @@ def get_maestros_by_specialty(especialidad):
                 'error': 'No se encontraron maestros con esa especialidad'
             }), 404
         
-        return jsonify({
+        return respuesta_lista({
             'success': True,
             'data': response.data,
             'total': len(response.data)
@@ -306,6 +272,7 @@ def get_maestros_by_specialty(especialidad):
 # por edad
 @maestros_admin_bp.route('/maestros/edad/<int:edad>')
 @admin_required
+@lectura_replica()
 def get_maestros_by_age(edad):
     """Endpoint para obtener maestros por edad."""
     try:
@@ -324,7 +291,7 @@ def get_maestros_by_age(edad):
                 'error': 'No se encontraron maestros con esa edad'
             }), 404
         
-        return jsonify({
+        return respuesta_lista({
             'success': True,
             'data': response.data,
             'total': len(response.data)
@@ -363,61 +330,8 @@ def delete_maestro(id_usuario):
         # Obtener información del maestro para la respuesta
         maestro_info = maestro_response.data[0]
         
-        # Verificar relaciones existentes que impiden la eliminación
-        relacionales_errors = []
-        
-        # Ejemplo: Verificar si tiene clases asignadas
-        clases_response = supabase.table('clase').select('id_clase, nombre_clase').eq('id_maestro', id_usuario).execute()
-        if clases_response.data:
-            clases_nombres = [clase['nombre_clase'] for clase in clases_response.data]
-            relacionales_errors.append({
-                'tabla': 'clase',
-                'count': len(clases_response.data),
-                'mensaje': f'El maestro tiene {len(clases_response.data)} clase(s) asignada(s)',
-                'detalles': clases_nombres
-            })
-        
-        # Ejemplo: Verificar si tiene horarios asignados
-        horarios_response = supabase.table('horario').select('id_horario, dia, hora_inicio, hora_fin').eq('id_maestro', id_usuario).execute()
-        if horarios_response.data:
-            horarios_info = [f"{h['dia']} {h['hora_inicio']}-{h['hora_fin']}" for h in horarios_response.data]
-            relacionales_errors.append({
-                'tabla': 'horario',
-                'count': len(horarios_response.data),
-                'mensaje': f'El maestro tiene {len(horarios_response.data)} horario(s) asignado(s)',
-                'detalles': horarios_info
-            })
-        
-        # Ejemplo: Verificar si tiene evaluaciones creadas
-        evaluaciones_response = supabase.table('evaluacion').select('id_evaluacion, titulo').eq('id_maestro', id_usuario).execute()
-        if evaluaciones_response.data:
-            evaluaciones_titulos = [eval['titulo'] for eval in evaluaciones_response.data]
-            relacionales_errors.append({
-                'tabla': 'evaluacion',
-                'count': len(evaluaciones_response.data),
-                'mensaje': f'El maestro tiene {len(evaluaciones_response.data)} evaluación(es) creada(s)',
-                'detalles': evaluaciones_titulos
-            })
-        
-        # Ejemplo: Verificar si tiene calificaciones registradas
-        calificaciones_response = supabase.table('calificacion').select('id_calificacion').eq('id_maestro', id_usuario).execute()
-        if calificaciones_response.data:
-            relacionales_errors.append({
-                'tabla': 'calificacion',
-                'count': len(calificaciones_response.data),
-                'mensaje': f'El maestro tiene {len(calificaciones_response.data)} calificación(es) registrada(s)',
-                'detalles': ['Calificaciones de estudiantes']
-            })
-        
-        # Ejemplo: Verificar si tiene asistencias registradas
-        asistencias_response = supabase.table('asistencia').select('id_asistencia').eq('id_maestro', id_usuario).execute()
-        if asistencias_response.data:
-            relacionales_errors.append({
-                'tabla': 'asistencia',
-                'count': len(asistencias_response.data),
-                'mensaje': f'El maestro tiene {len(asistencias_response.data)} registro(s) de asistencia',
-                'detalles': ['Registros de asistencia de estudiantes']
-            })
+        # Verificar relaciones existentes que impiden la eliminación (solo conteos y una muestra)
+        relacionales_errors = dependencias_maestro(id_usuario)
         
         # Si hay relaciones, no permitir eliminación
         if relacionales_errors:
@@ -436,25 +350,13 @@ def delete_maestro(id_usuario):
         
         # Si no hay relaciones, proceder con la eliminación
         try:
-            # Eliminar el maestro primero (por la foreign key)
-            delete_maestro_response = supabase.table('maestro').delete().eq('id_usuario', id_usuario).execute()
+            # Eliminar maestro y usuario en una sola transacción (función eliminar_maestro en la base de datos).
+            # Si entre la verificación y este punto se agregó una relación, la llave foránea revierte todo.
+            delete_response = supabase.rpc('eliminar_maestro', {'maestro_id': id_usuario}).execute()
+            maestro_info = delete_response.data['maestro']
             
-            if not delete_maestro_response.data:
-                return jsonify({
-                    'success': False,
-                    'error': 'Error al eliminar el registro del maestro'
-                }), 500
-            
-            # Eliminar el usuario asociado
-            delete_usuario_response = supabase.table('usuario').delete().eq('id_usuario', id_usuario).execute()
-            
-            if not delete_usuario_response.data:
-                # Si falla eliminar usuario, restaurar maestro (rollback manual)
-                supabase.table('maestro').insert(maestro_info).execute()
-                return jsonify({
-                    'success': False,
-                    'error': 'Error al eliminar el usuario asociado'
-                }), 500
+            # Cerrar las sesiones activas del maestro eliminado
+            revocar_sesiones_usuario(id_usuario)
             
             return jsonify({
                 'success': True,
@@ -463,13 +365,21 @@ def delete_maestro(id_usuario):
                     'id_usuario': maestro_info['id_usuario'],
                     'nombre_completo': f"{maestro_info['nombre']} {maestro_info['apellido_paterno']} {maestro_info.get('apellido_materno', '')}".strip(),
                     'especialidad': maestro_info.get('especialidad', 'No especificada')
-                }
+                },
+                'usuario_eliminado': delete_response.data['usuario']
             }), 200
             
         except Exception as delete_error:
             # Manejar errores específicos de eliminación
             error_msg = str(delete_error).lower()
             
+            # Otro administrador lo eliminó entre la verificación y la transacción
+            if 'p0002' in error_msg:
+                return jsonify({
+                    'success': False,
+                    'error': 'Maestro no encontrado'
+                }), 404
+            
             if 'foreign key' in error_msg or 'constraint' in error_msg:
                 return jsonify({
                     'success': False,
@@ -496,9 +406,31 @@ def delete_maestro(id_usuario):
             'error': f'Error interno del servidor: {str(e)}'
         }), 500
 
+# Ruta para cerrar todas las sesiones activas de un maestro
+@maestros_admin_bp.route('/maestros/<string:id_usuario>/sesiones', methods=['DELETE'])
+@admin_required
+def revocar_sesiones_maestro(id_usuario):
+    """Endpoint para revocar todas las sesiones activas de un maestro."""
+    try:
+        revocadas = revocar_sesiones_usuario(id_usuario)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Sesiones del maestro revocadas exitosamente',
+            'sesiones_revocadas': revocadas,
+            'id_usuario': id_usuario
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error interno del servidor: {str(e)}'
+        }), 500
+
 # Ruta para ver los cursos de un maestro
 @maestros_admin_bp.route('/maestros/<string:id_maestro>/cursos', methods=['GET'])
 @admin_required
+@lectura_replica()
 def get_cursos_maestro(id_maestro):
     """
     Endpoint para obtener los cursos asignados a un maestro por su ID.
@@ -526,7 +458,7 @@ def get_cursos_maestro(id_maestro):
                 'id_maestro': id_maestro
             }), 404
         
-        return jsonify({
+        return respuesta_lista({
             'success': True,
             'data': response.data,
             'total_cursos': len(response.data),
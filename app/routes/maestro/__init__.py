@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request, session
 from app.utils.supabase_connection import supabaseConnection as sC
+from app.utils.concurrencia import en_paralelo_async
 from .auth import maestro_auth_bp
 from .profile import maestro_profile_bp
 from .groups import maestro_groups_bp
@@ -14,7 +15,7 @@ def ping():
     return jsonify({'msg': 'maestro service is running'})
 
 @maestro_bp.route('/dashboard')
-def dashboard():
+async def dashboard():
     """Dashboard principal para maestros - información general"""
     try:
         # Verificar si el usuario está autenticado
@@ -32,10 +33,20 @@ def dashboard():
             }), 403
         
         user_id = session['user_id']
-        supabase = sC.get_instance().get_client()
+        supabase = sC.get_instance().get_async_client()
         
-        # Obtener información básica del maestro
-        maestro_response = supabase.table('maestro').select('*').eq('id_usuario', user_id).execute()
+        # Las tres consultas son independientes: se ejecutan en paralelo
+        maestro_response, asignaciones_response, disponibilidad_response = await en_paralelo_async(
+            # Obtener información básica del maestro
+            supabase.table('maestro').select('*').eq('id_usuario', user_id).execute(),
+            # Obtener resumen de asignaciones
+            supabase.table('asignacion').select(
+                'id_asignacion, curso(nombre, codigo), grupo(nombre_grupo)'
+            ).eq('id_maestro', user_id).execute(),
+            # Obtener disponibilidad
+            supabase.table('disponibilidad').select('*').eq('id_maestro', user_id).execute()
+        )
+
         if not maestro_response.data:
             return jsonify({
                 'success': False,
@@ -44,14 +55,6 @@ def dashboard():
         
         maestro_info = maestro_response.data[0]
         
-        # Obtener resumen de asignaciones
-        asignaciones_response = supabase.table('asignacion').select(
-            'id_asignacion, curso(nombre, codigo), grupo(nombre_grupo)'
-        ).eq('id_maestro', user_id).execute()
-        
-        # Obtener disponibilidad
-        disponibilidad_response = supabase.table('disponibilidad').select('*').eq('id_maestro', user_id).execute()
-        
         return jsonify({
             'success': True,
             'data': {
@@ -1,9 +1,80 @@
 from flask import Blueprint, jsonify, request, session
+import asyncio
+import inspect
 import bcrypt
+from functools import wraps
 from app.utils.supabase_connection import supabaseConnection as sC
+from app.services.asignaciones_maestro_service import maestro_tiene_asignacion, maestro_tiene_grupo
 
 maestro_auth_bp = Blueprint("maestro_auth", __name__)
 
+def _validar_maestro_asignacion(kwargs):
+    """Regresa la respuesta de error si la sesión no puede acceder a la ruta, o None."""
+    if 'user_id' not in session or 'role' not in session:
+        return jsonify({
+            'success': False,
+            'error': 'No autenticado'
+        }), 401
+
+    if session['role'] != 'maestro':
+        return jsonify({
+            'success': False,
+            'error': 'Acceso denegado - Solo maestros'
+        }), 403
+
+    user_id = session['user_id']
+    # Una escritura no se autoriza con la caché: puede conservar una asignación ya reasignada
+    verificar = request.method not in ('GET', 'HEAD')
+
+    try:
+        asignacion_valida = 'id_asignacion' not in kwargs or maestro_tiene_asignacion(user_id, kwargs['id_asignacion'], verificar)
+        grupo_valido = 'id_grupo' not in kwargs or maestro_tiene_grupo(user_id, kwargs['id_grupo'], verificar)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error interno del servidor: {str(e)}'
+        }), 500
+
+    if not asignacion_valida:
+        return jsonify({
+            'success': False,
+            'error': 'Asignación no encontrada o no pertenece al maestro'
+        }), 403
+
+    if not grupo_valido:
+        return jsonify({
+            'success': False,
+            'error': 'Este grupo no está asignado al maestro'
+        }), 403
+
+    return None
+
+def maestro_asignacion_required(f):
+    """
+    Decorador para rutas de maestro que reciben `id_asignacion` o `id_grupo`.
+    Valida la sesión y que la asignación o el grupo pertenezcan al maestro, usando el
+    conjunto de asignaciones en caché del maestro en las lecturas y la base de datos en
+    las escrituras.
+    Funciona también con vistas `async def`; la consulta de asignaciones se hace
+    en un hilo para no bloquear el event loop.
+    """
+    if inspect.iscoroutinefunction(f):
+        @wraps(f)
+        async def decorated_async(*args, **kwargs):
+            error = await asyncio.to_thread(_validar_maestro_asignacion, kwargs)
+            if error is not None:
+                return error
+            return await f(*args, **kwargs)
+        return decorated_async
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        error = _validar_maestro_asignacion(kwargs)
+        if error is not None:
+            return error
+        return f(*args, **kwargs)
+    return decorated_function
+
 @maestro_auth_bp.route('/login', methods=['POST'])
 def login():
     """Endpoint para autenticar maestros"""
@@ -1,42 +1,24 @@
-from flask import Blueprint, jsonify, request, session
+from flask import Blueprint, jsonify, request
 from app.utils.supabase_connection import supabaseConnection as sC
 from app.services.calificacion_service import puede_subir_calificacion
+from app.services.kardex_service import invalidar_kardex
+from app.utils.formatos import respuesta_lista
+from app.utils.query_tracer import presupuesto_consultas
+from app.utils.idempotencia import idempotente
+from .auth import maestro_asignacion_required
 
 maestro_grades_bp = Blueprint("maestro_grades", __name__)
 
 @maestro_grades_bp.route('/grades/<int:id_asignacion>/<int:numero_parcial>', methods=['GET'])
-def get_grades(id_asignacion, numero_parcial):
+@maestro_asignacion_required
+@presupuesto_consultas(2)
+async def get_grades(id_asignacion, numero_parcial):
     """Endpoint para obtener calificaciones de un parcial específico de una asignación."""
     try:
-        # Verificar autenticación
-        if 'user_id' not in session or 'role' not in session:
-            return jsonify({
-                'success': False,
-                'error': 'No autenticado'
-            }), 401
-
-        if session['role'] != 'maestro':
-            return jsonify({
-                'success': False,
-                'error': 'Acceso denegado - Solo maestros'
-            }), 403
-        
-        user_id = session['user_id']
-        supabase = sC.get_instance().get_client()
-
-        # Verificar que la asignación pertenece al maestro
-        asignacion_response = supabase.table('asignacion').select(
-            'id_asignacion'
-        ).eq('id_asignacion', id_asignacion).eq('id_maestro', user_id).execute()
-        
-        if not asignacion_response.data:
-            return jsonify({
-                'success': False,
-                'error': 'Asignación no encontrada o no pertenece al maestro'
-            }), 403
+        supabase = sC.get_instance().get_async_client()
 
         # Obtener calificaciones
-        calificaciones_response = supabase.table('calificaciones').select(
+        calificaciones_response = await supabase.table('calificaciones').select(
             '*'
         ).eq('id_asignacion', id_asignacion).execute()
         
@@ -46,7 +28,7 @@ def get_grades(id_asignacion, numero_parcial):
                 'error': 'No se encontraron calificaciones'
             }), 404
 
-        return jsonify({
+        return respuesta_lista({
             'success': True,
             'data': calificaciones_response.data,
             'total_calificaciones': len(calificaciones_response.data)
@@ -59,34 +41,13 @@ def get_grades(id_asignacion, numero_parcial):
         }), 500
 
 @maestro_grades_bp.route('/grades/<int:id_asignacion>/<int:numero_parcial>', methods=['POST'])
+@idempotente()
+@maestro_asignacion_required
+@presupuesto_consultas(3)
 def upload_grades(id_asignacion, numero_parcial):
     """Endpoint para subir o actualizar calificaciones con UPSERT nativo."""
     try:
-        # Verificar autenticación
-        if 'user_id' not in session or 'role' not in session:
-            return jsonify({
-                'success': False,
-                'error': 'No autenticado'
-            }), 401
-        if session['role'] != 'maestro':
-            return jsonify({
-                'success': False,
-                'error': 'Acceso denegado - Solo maestros'
-            }), 403
-       
-        user_id = session['user_id']
         supabase = sC.get_instance().get_client()
-        
-        # Verificar que la asignación pertenece al maestro
-        asignacion_response = supabase.table('asignacion').select(
-            'id_asignacion'
-        ).eq('id_asignacion', id_asignacion).eq('id_maestro', user_id).execute()
-       
-        if not asignacion_response.data:
-            return jsonify({
-                'success': False,
-                'error': 'Asignación no encontrada o no pertenece al maestro'
-            }), 403
             
         # Verificar si se puede subir calificaciones
         calificacion_status = puede_subir_calificacion(id_asignacion, numero_parcial)
@@ -128,6 +89,8 @@ def upload_grades(id_asignacion, numero_parcial):
                 'success': False,
                 'error': 'No se pudieron procesar las calificaciones'
             }), 500
+
+        invalidar_kardex(record['id_alumno'] for record in upsert_data)
         
         return jsonify({
             'success': True,
@@ -155,36 +118,11 @@ def get_alum_grade(id_asignacion, id_alumno, numero_parcial):
 
 # Agregar este endpoint a tu archivo de rutas
 @maestro_grades_bp.route('/grades/<int:id_asignacion>/<int:numero_parcial>/check', methods=['GET'])
+@maestro_asignacion_required
+@presupuesto_consultas(2)
 def check_grades_availability(id_asignacion, numero_parcial):
     """Endpoint para verificar si se pueden subir calificaciones."""
     try:
-        # Verificar autenticación
-        if 'user_id' not in session or 'role' not in session:
-            return jsonify({
-                'success': False,
-                'error': 'No autenticado'
-            }), 401
-        
-        if session['role'] != 'maestro':
-            return jsonify({
-                'success': False,
-                'error': 'Acceso denegado - Solo maestros'
-            }), 403
-       
-        user_id = session['user_id']
-        supabase = sC.get_instance().get_client()
-        
-        # Verificar que la asignación pertenece al maestro
-        asignacion_response = supabase.table('asignacion').select(
-            'id_asignacion'
-        ).eq('id_asignacion', id_asignacion).eq('id_maestro', user_id).execute()
-       
-        if not asignacion_response.data:
-            return jsonify({
-                'success': False,
-                'error': 'Asignación no encontrada o no pertenece al maestro'
-            }), 403
-        
         # Verificar si se puede subir calificaciones
         calificacion_status = puede_subir_calificacion(id_asignacion, numero_parcial)
         
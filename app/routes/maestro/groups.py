@@ -1,9 +1,15 @@
 from flask import Blueprint, jsonify, request, session
 from app.utils.supabase_connection import supabaseConnection as sC
+from app.utils.formatos import respuesta_lista
+from app.utils.replica import lectura_replica
+from app.utils.query_tracer import presupuesto_consultas
+from app.utils.concurrencia import en_paralelo
+from .auth import maestro_asignacion_required
 
 maestro_groups_bp = Blueprint("maestro_groups", __name__)
 
 @maestro_groups_bp.route('/groups', methods=['GET'])
+@lectura_replica()
 def get_assigned_groups():
     """Endpoint para obtener grupos asignados al maestro."""
     try:
@@ -34,7 +40,7 @@ def get_assigned_groups():
                 'error': 'No se encontraron grupos asignados'
             }), 404
 
-        return jsonify({
+        return respuesta_lista({
             'success': True,
             'data': grupos_response.data,
             'total_grupos': len(grupos_response.data)
@@ -47,35 +53,16 @@ def get_assigned_groups():
         }), 500
 
 @maestro_groups_bp.route('/groups/<string:id_grupo>/students', methods=['GET'])
-def get_students_in_group(id_grupo):
+@maestro_asignacion_required
+@presupuesto_consultas(2)
+@lectura_replica()
+async def get_students_in_group(id_grupo):
     """Endpoint para obtener estudiantes en un grupo específico."""
     try:
-        # Verificar autenticación
-        if 'user_id' not in session or 'role' not in session:
-            return jsonify({
-                'success': False,
-                'error': 'No autenticado'
-            }), 401
-
-        if session['role'] != 'maestro':
-            return jsonify({
-                'success': False,
-                'error': 'Acceso denegado - Solo maestros'
-            }), 403
-        
-        user_id = session['user_id']
-        supabase = sC.get_instance().get_client()
-
-        # Verificar que el grupo esté asignado al maestro
-        asignacion_response = supabase.table('asignacion').select('id_asignacion').eq('id_maestro', user_id).eq('id_grupo', id_grupo).execute()
-        if not asignacion_response.data:
-            return jsonify({
-                'success': False,
-                'error': 'Este grupo no está asignado al maestro'
-            }), 403
+        supabase = sC.get_instance().get_async_client()
 
         # Obtener estudiantes en el grupo
-        estudiantes_response = supabase.table('alumno').select(
+        estudiantes_response = await supabase.table('alumno').select(
             'id_alumno, nombre, apellido_paterno, apellido_materno'
         ).eq('id_grupo', id_grupo).execute()
         
@@ -85,7 +72,7 @@ def get_students_in_group(id_grupo):
                 'error': 'No se encontraron estudiantes en el grupo'
             }), 404
 
-        return jsonify({
+        return respuesta_lista({
             'success': True,
             'data': estudiantes_response.data,
             'total_estudiantes': len(estudiantes_response.data)
@@ -98,29 +85,28 @@ def get_students_in_group(id_grupo):
         }), 500
 
 @maestro_groups_bp.route('/groups/<string:id_grupo>/details', methods=['GET'])
+@maestro_asignacion_required
+@presupuesto_consultas(3)
+@lectura_replica()
 def get_group_details(id_grupo):
     """Endpoint para obtener detalles completos de un grupo asignado al maestro."""
     try:
-        # Verificar autenticación
-        if 'user_id' not in session or 'role' not in session:
-            return jsonify({
-                'success': False,
-                'error': 'No autenticado'
-            }), 401
-
-        if session['role'] != 'maestro':
-            return jsonify({
-                'success': False,
-                'error': 'Acceso denegado - Solo maestros'
-            }), 403
-        
         user_id = session['user_id']
         supabase = sC.get_instance().get_client()
 
-        # Verificar que el grupo esté asignado al maestro y obtener información completa
-        asignacion_response = supabase.table('asignacion').select(
-            'id_asignacion, planeacion_pdf_url, curso(id_curso, nombre, codigo, descripcion), grupo(id_grupo, nombre_grupo, generacion, facultad)'
-        ).eq('id_maestro', user_id).eq('id_grupo', id_grupo).execute()
+        # La asignación (con sus horarios embebidos) y los estudiantes no dependen entre sí
+        asignacion_response, estudiantes_response = en_paralelo(
+            # Verificar que el grupo esté asignado al maestro y obtener información completa
+            lambda: supabase.table('asignacion').select(
+                'id_asignacion, planeacion_pdf_url, curso(id_curso, nombre, codigo, descripcion), '
+                'grupo(id_grupo, nombre_grupo, generacion, facultad), '
+                'horario_asignacion(id_horario, dia_semana, hora_inicio, hora_fin)'
+            ).eq('id_maestro', user_id).eq('id_grupo', id_grupo).execute(),
+            # Obtener estudiantes en el grupo con información completa
+            lambda: supabase.table('alumno').select(
+                'id_alumno, nombre, apellido_paterno, apellido_materno, fecha_nacimiento, sexo'
+            ).eq('id_grupo', id_grupo).execute()
+        )
         
         if not asignacion_response.data:
             return jsonify({
@@ -129,25 +115,16 @@ def get_group_details(id_grupo):
             }), 403
 
         asignacion_info = asignacion_response.data[0]
-
-        # Obtener estudiantes en el grupo con información completa
-        estudiantes_response = supabase.table('alumno').select(
-            'id_alumno, nombre, apellido_paterno, apellido_materno, fecha_nacimiento, sexo'
-        ).eq('id_grupo', id_grupo).execute()
-
-        # Obtener horarios de la asignación
-        horarios_response = supabase.table('horario_asignacion').select(
-            'id_horario, dia_semana, hora_inicio, hora_fin'
-        ).eq('id_asignacion', asignacion_info['id_asignacion']).execute()
+        horarios = asignacion_info.pop('horario_asignacion', None) or []
 
         return jsonify({
             'success': True,
             'data': {
                 'asignacion': asignacion_info,
                 'estudiantes': estudiantes_response.data,
-                'horarios': horarios_response.data,
+                'horarios': horarios,
                 'total_estudiantes': len(estudiantes_response.data),
-                'total_horarios': len(horarios_response.data)
+                'total_horarios': len(horarios)
             }
         })
 
@@ -158,6 +135,8 @@ def get_group_details(id_grupo):
         }), 500
 
 @maestro_groups_bp.route('/assignments', methods=['GET'])
+@presupuesto_consultas(1)
+@lectura_replica()
 def get_all_assignments():
     """Endpoint para obtener todas las asignaciones del maestro con información detallada."""
     try:
@@ -177,9 +156,11 @@ def get_all_assignments():
         user_id = session['user_id']
         supabase = sC.get_instance().get_client()
 
-        # Obtener todas las asignaciones del maestro
+        # Obtener todas las asignaciones del maestro con el conteo de alumnos del grupo y horarios embebidos
         asignaciones_response = supabase.table('asignacion').select(
-            'id_asignacion, planeacion_pdf_url, curso(id_curso, nombre, codigo, descripcion), grupo(id_grupo, nombre_grupo, generacion, facultad)'
+            'id_asignacion, planeacion_pdf_url, curso(id_curso, nombre, codigo, descripcion), '
+            'grupo(id_grupo, nombre_grupo, generacion, facultad, alumno(count)), '
+            'horario_asignacion(dia_semana, hora_inicio, hora_fin)'
         ).eq('id_maestro', user_id).execute()
         
         if not asignaciones_response.data:
@@ -192,23 +173,16 @@ def get_all_assignments():
         asignaciones_detalladas = []
         
         for asignacion in asignaciones_response.data:
-            # Contar estudiantes en el grupo
-            estudiantes_count = supabase.table('alumno').select(
-                'id_alumno', count='exact'
-            ).eq('id_grupo', asignacion['grupo']['id_grupo']).execute()
-            
-            # Obtener horarios
-            horarios = supabase.table('horario_asignacion').select(
-                'dia_semana, hora_inicio, hora_fin'
-            ).eq('id_asignacion', asignacion['id_asignacion']).execute()
+            grupo = dict(asignacion['grupo'] or {})
+            conteo = grupo.pop('alumno', None) or [{'count': 0}]
             
             asignacion_detallada = {
                 'id_asignacion': asignacion['id_asignacion'],
                 'curso': asignacion['curso'],
-                'grupo': asignacion['grupo'],
+                'grupo': grupo,
                 'planeacion_pdf_url': asignacion['planeacion_pdf_url'],
-                'total_estudiantes': estudiantes_count.count if estudiantes_count.count else 0,
-                'horarios': horarios.data,
+                'total_estudiantes': conteo[0]['count'],
+                'horarios': asignacion['horario_asignacion'] or [],
                 'tiene_planeacion': bool(asignacion['planeacion_pdf_url'])
             }
             
@@ -227,27 +201,17 @@ def get_all_assignments():
         }), 500
 
 @maestro_groups_bp.route('/assignments/<int:id_asignacion>/students', methods=['GET'])
-def get_students_by_assignment(id_asignacion):
+@maestro_asignacion_required
+@presupuesto_consultas(3)
+@lectura_replica()
+async def get_students_by_assignment(id_asignacion):
     """Endpoint para obtener estudiantes de una asignación específica."""
     try:
-        # Verificar autenticación
-        if 'user_id' not in session or 'role' not in session:
-            return jsonify({
-                'success': False,
-                'error': 'No autenticado'
-            }), 401
-
-        if session['role'] != 'maestro':
-            return jsonify({
-                'success': False,
-                'error': 'Acceso denegado - Solo maestros'
-            }), 403
-        
         user_id = session['user_id']
-        supabase = sC.get_instance().get_client()
+        supabase = sC.get_instance().get_async_client()
 
-        # Verificar que la asignación pertenece al maestro
-        asignacion_response = supabase.table('asignacion').select(
+        # Obtener información de la asignación (el filtro por maestro protege contra caché desactualizada)
+        asignacion_response = await supabase.table('asignacion').select(
             'id_asignacion, id_grupo, curso(nombre), grupo(nombre_grupo)'
         ).eq('id_asignacion', id_asignacion).eq('id_maestro', user_id).execute()
         
@@ -261,7 +225,7 @@ def get_students_by_assignment(id_asignacion):
         id_grupo = asignacion_info['id_grupo']
 
         # Obtener estudiantes del grupo
-        estudiantes_response = supabase.table('alumno').select(
+        estudiantes_response = await supabase.table('alumno').select(
             'id_alumno, nombre, apellido_paterno, apellido_materno, fecha_nacimiento, sexo'
         ).eq('id_grupo', id_grupo).execute()
 
@@ -285,27 +249,17 @@ def get_students_by_assignment(id_asignacion):
         }), 500
 
 @maestro_groups_bp.route('/assignments/<int:id_asignacion>/schedule', methods=['GET'])
-def get_assignment_schedule(id_asignacion):
+@maestro_asignacion_required
+@presupuesto_consultas(3)
+@lectura_replica()
+async def get_assignment_schedule(id_asignacion):
     """Endpoint para obtener el horario de una asignación específica."""
     try:
-        # Verificar autenticación
-        if 'user_id' not in session or 'role' not in session:
-            return jsonify({
-                'success': False,
-                'error': 'No autenticado'
-            }), 401
-
-        if session['role'] != 'maestro':
-            return jsonify({
-                'success': False,
-                'error': 'Acceso denegado - Solo maestros'
-            }), 403
-        
         user_id = session['user_id']
-        supabase = sC.get_instance().get_client()
+        supabase = sC.get_instance().get_async_client()
 
-        # Verificar que la asignación pertenece al maestro
-        asignacion_response = supabase.table('asignacion').select(
+        # Obtener información de la asignación (el filtro por maestro protege contra caché desactualizada)
+        asignacion_response = await supabase.table('asignacion').select(
             'id_asignacion, curso(nombre), grupo(nombre_grupo)'
         ).eq('id_asignacion', id_asignacion).eq('id_maestro', user_id).execute()
         
@@ -318,7 +272,7 @@ def get_assignment_schedule(id_asignacion):
         asignacion_info = asignacion_response.data[0]
 
         # Obtener horarios de la asignación
-        horarios_response = supabase.table('horario_asignacion').select(
+        horarios_response = await supabase.table('horario_asignacion').select(
             'id_horario, dia_semana, hora_inicio, hora_fin'
         ).eq('id_asignacion', id_asignacion).order('dia_semana').order('hora_inicio').execute()
 
@@ -1,5 +1,8 @@
 from flask import Blueprint, jsonify, request, session
 from app.utils.supabase_connection import supabaseConnection as sC
+from app.utils.query_tracer import presupuesto_consultas
+from app.utils.idempotencia import idempotente
+from .auth import maestro_asignacion_required
 
 maestro_planning_bp = Blueprint("maestro_planning", __name__)
 
@@ -17,20 +20,14 @@ def _get_public_url(supabase, path):
         return getattr(url_response, 'publicUrl', None)
 
 @maestro_planning_bp.route('/planning/<int:id_asignacion>', methods=['POST'])
+@idempotente()
+@maestro_asignacion_required
+@presupuesto_consultas(2)
 def upload_planning(id_asignacion):
     """Subir planificación a Supabase Storage y guardar su URL en la DB."""
     try:
-        user_id = session['user_id']
         supabase = sC.get_instance().get_client()
         
-        # Validar que la asignación pertenezca al maestro
-        asignacion_response = supabase.table('asignacion').select(
-            'id_asignacion'
-        ).eq('id_asignacion', id_asignacion).eq('id_maestro', user_id).execute()
-        
-        if not asignacion_response.data:
-            return jsonify({'success': False, 'error': 'Asignación no encontrada'}), 404
-        
         file = request.files.get('file')
         if not file:
             return jsonify({'success': False, 'error': 'No se envió archivo'}), 400
@@ -77,6 +74,8 @@ def upload_planning(id_asignacion):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @maestro_planning_bp.route('/planning/<int:id_asignacion>', methods=['GET'])
+@maestro_asignacion_required
+@presupuesto_consultas(2)
 def get_planning(id_asignacion):
     """Obtiene la URL pública del PDF de planificación."""
     try:
@@ -0,0 +1,23 @@
+import os
+import hmac
+from flask import Blueprint, Response, jsonify, request
+from app.utils.metrics import render_metricas
+
+metrics_bp = Blueprint("metrics", __name__)
+
+@metrics_bp.route('/metrics')
+def metrics():
+    """
+    Endpoint con las métricas de latencia y llamadas a Supabase en formato de texto de Prometheus.
+    Si METRICS_TOKEN está definido, se requiere el header `Authorization: Bearer <token>`.
+    """
+    token = os.environ.get("METRICS_TOKEN")
+    if token:
+        auth = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(auth, f'Bearer {token}'):
+            return jsonify({
+                'success': False,
+                'error': 'No autenticado'
+            }), 401
+
+    return Response(render_metricas(), mimetype='text/plain; version=0.0.4; charset=utf-8')
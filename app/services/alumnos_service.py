@@ -0,0 +1,215 @@
+import os
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+from postgrest.types import ReturnMethod
+from app.models import Alumno
+from app.models.alumno_model import SexoEnum
+from app.models.base_model import ModelBase
+from app.services.kardex_service import invalidar_kardex
+from app.utils.importacion import IMPORT_CHUNK_SIZE, ErrorImportacion, en_lotes
+from app.utils.supabase_connection import supabaseConnection
+
+# Máximo de errores detallados en el reporte; el total siempre se reporta completo
+MAX_ERRORES_REPORTE = int(os.environ.get("MAX_ERRORES_REPORTE", 100))
+
+CAMPOS_REQUERIDOS = ['id_alumno', 'id_grupo', 'nombre', 'apellido_paterno']
+SEXOS_VALIDOS = [sexo.value for sexo in SexoEnum]
+
+class _Reporte:
+    """Reporte compacto: contadores y solo los primeros MAX_ERRORES_REPORTE errores."""
+    def __init__(self):
+        self.total = 0
+        self.guardados = 0
+        self.errores = 0
+        self.detalle_errores = []
+        self.interrumpido = None
+
+    def error(self, fila: int, id_alumno, mensaje: str) -> None:
+        self.errores += 1
+        if len(self.detalle_errores) < MAX_ERRORES_REPORTE:
+            self.detalle_errores.append({'fila': fila, 'id_alumno': id_alumno, 'error': mensaje})
+
+    def to_dict(self) -> dict:
+        resultado = {
+            'total': self.total,
+            'guardados': self.guardados,
+            'errores': self.errores,
+            'detalle_errores': self.detalle_errores,
+            'detalle_truncado': self.errores > len(self.detalle_errores)
+        }
+        if self.interrumpido:
+            resultado['interrumpido'] = self.interrumpido
+        return resultado
+
+def validar_alumno(data: dict) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Valida una fila contra el modelo Alumno (fecha ISO y SexoEnum).
+    Regresa (fila lista para insertar, None) o (None, mensaje de error).
+    """
+    missing_fields = [field for field in CAMPOS_REQUERIDOS if data.get(field) in (None, '')]
+    if missing_fields:
+        return None, f'Campos requeridos faltantes: {", ".join(missing_fields)}'
+
+    datos = dict(data)
+
+    # from_dict no convierte los campos Optional, así que el sexo y la fecha se validan aquí
+    sexo = datos.get('sexo')
+    if isinstance(sexo, str):
+        sexo = sexo.strip().upper() or None
+    try:
+        datos['sexo'] = SexoEnum(sexo) if sexo is not None else None
+    except ValueError:
+        return None, f'Sexo inválido. Debe ser uno de: {", ".join(SEXOS_VALIDOS)}'
+
+    fecha_nacimiento = datos.get('fecha_nacimiento')
+    try:
+        datos['fecha_nacimiento'] = date.fromisoformat(str(fecha_nacimiento)) if fecha_nacimiento else None
+    except ValueError:
+        return None, 'Formato de fecha de nacimiento inválido. Use YYYY-MM-DD'
+
+    alumno = Alumno.from_dict(datos)
+
+    # Solo las columnas de la tabla (sin nombre_completo)
+    fila = ModelBase.to_dict(alumno)
+    fila['id_alumno'] = str(fila['id_alumno']).strip()
+    fila['id_grupo'] = str(fila['id_grupo']).strip()
+    return fila, None
+
+def _grupos_existentes(supabase, ids_grupo: Iterable[str]) -> set:
+    existentes = set()
+    for lote in en_lotes(sorted(set(ids_grupo))):
+        response = supabase.table('grupo').select('id_grupo').in_('id_grupo', lote).execute()
+        existentes.update(str(row['id_grupo']) for row in response.data)
+    return existentes
+
+def _guardar_lote(supabase, lote: List[Tuple[int, dict]], actualizar: bool, reporte: _Reporte) -> None:
+    """
+    Inserta un lote en una sola llamada. Sin `actualizar`, los alumnos existentes se ignoran en
+    la base de datos y se reportan como error; PostgREST regresa solo las filas insertadas.
+    """
+    filas = [fila for _, fila in lote]
+    try:
+        response = supabase.table('alumno').upsert(
+            filas, on_conflict='id_alumno', ignore_duplicates=not actualizar
+        ).execute()
+    except Exception:
+        # Falló el lote completo (p. ej. un grupo eliminado durante la importación):
+        # se reintenta fila por fila para reportar el error de cada una
+        for numero, fila in lote:
+            _guardar_fila(supabase, numero, fila, actualizar, reporte)
+        return
+
+    guardados = {str(row['id_alumno']) for row in response.data}
+    reporte.guardados += len(guardados)
+    for numero, fila in lote:
+        if fila['id_alumno'] not in guardados:
+            reporte.error(numero, fila['id_alumno'], f'El alumno {fila["id_alumno"]} ya existe')
+
+def _guardar_fila(supabase, numero: int, fila: dict, actualizar: bool, reporte: _Reporte) -> None:
+    try:
+        response = supabase.table('alumno').upsert(
+            fila, on_conflict='id_alumno', ignore_duplicates=not actualizar
+        ).execute()
+        if response.data:
+            reporte.guardados += 1
+        else:
+            reporte.error(numero, fila['id_alumno'], f'El alumno {fila["id_alumno"]} ya existe')
+    except Exception as e:
+        mensaje = str(e)
+        if 'foreign key' in mensaje.lower():
+            mensaje = f'El grupo {fila["id_grupo"]} no existe'
+        reporte.error(numero, fila['id_alumno'], mensaje)
+
+def importar_alumnos(filas: Iterable[Tuple[int, Optional[dict], Optional[str]]], actualizar: bool = False) -> dict:
+    """
+    Importa alumnos leyendo las filas de forma incremental (ver app.utils.importacion.iterar_filas).
+
+    Cada lote de IMPORT_CHUNK_SIZE filas válidas hace a lo más dos llamadas: una para verificar
+    los grupos que no se han visto antes y una inserción en lote. La memoria usada no depende
+    del tamaño del archivo, salvo el conjunto de IDs ya vistos para detectar repetidos.
+
+    Con `actualizar` los alumnos existentes se actualizan (upsert); si no, se reportan como error.
+    """
+    supabase = supabaseConnection.get_instance().get_client()
+    reporte = _Reporte()
+    vistos = {}
+    grupos_validos, grupos_invalidos = set(), set()
+    pendientes: List[Tuple[int, dict]] = []
+
+    def vaciar():
+        nuevos = {fila['id_grupo'] for _, fila in pendientes} - grupos_validos - grupos_invalidos
+        if nuevos:
+            existentes = _grupos_existentes(supabase, nuevos)
+            grupos_validos.update(existentes)
+            grupos_invalidos.update(nuevos - existentes)
+
+        lote = []
+        for numero, fila in pendientes:
+            if fila['id_grupo'] in grupos_invalidos:
+                reporte.error(numero, fila['id_alumno'], f'El grupo {fila["id_grupo"]} no existe')
+            else:
+                lote.append((numero, fila))
+        if lote:
+            _guardar_lote(supabase, lote, actualizar, reporte)
+            if actualizar:
+                invalidar_kardex(fila['id_alumno'] for _, fila in lote)
+        pendientes.clear()
+
+    try:
+        for numero, data, error in filas:
+            reporte.total += 1
+            fila = None
+            if error is None:
+                fila, error = validar_alumno(data)
+            if error is None and fila['id_alumno'] in vistos:
+                error = f'ID de alumno repetido en la importación (fila {vistos[fila["id_alumno"]]})'
+            if error is not None:
+                reporte.error(numero, (data or {}).get('id_alumno'), error)
+                continue
+
+            vistos[fila['id_alumno']] = numero
+            pendientes.append((numero, fila))
+            if len(pendientes) >= IMPORT_CHUNK_SIZE:
+                vaciar()
+    except ErrorImportacion as e:
+        # Lo ya leído se guarda; el resto del archivo no se procesa
+        reporte.interrumpido = str(e)
+
+    if pendientes:
+        vaciar()
+    return reporte.to_dict()
+
+def transferir_alumnos(id_grupo_destino: str, id_grupo_origen: str = None, ids_alumno: List[str] = None) -> dict:
+    """
+    Cambia de grupo a una generación completa (`id_grupo_origen`) o a una lista de alumnos.
+
+    - Grupo completo: un solo UPDATE, sin importar cuántos alumnos tenga.
+    - Lista de alumnos: un UPDATE por lote de IMPORT_CHUNK_SIZE IDs.
+    En ambos casos solo se pide el conteo de filas afectadas, no las filas.
+
+    Lanza LookupError si alguno de los grupos no existe.
+    """
+    supabase = supabaseConnection.get_instance().get_client()
+    grupos = [id_grupo_destino] + ([id_grupo_origen] if id_grupo_origen else [])
+    faltantes = set(grupos) - _grupos_existentes(supabase, grupos)
+    if faltantes:
+        raise LookupError(f'Grupo(s) no encontrado(s): {", ".join(sorted(faltantes))}')
+
+    cambio = {'id_grupo': id_grupo_destino}
+    if id_grupo_origen:
+        response = supabase.table('alumno').update(cambio, count='exact', returning=ReturnMethod.minimal) \
+            .eq('id_grupo', id_grupo_origen) \
+            .execute()
+        # No se conocen los IDs movidos sin leerlos: se descarta todo el kardex en caché
+        invalidar_kardex()
+        return {'movidos': response.count or 0, 'no_encontrados': 0}
+
+    ids = list(dict.fromkeys(str(id_alumno) for id_alumno in ids_alumno or []))
+    movidos = 0
+    for lote in en_lotes(ids):
+        response = supabase.table('alumno').update(cambio, count='exact', returning=ReturnMethod.minimal) \
+            .in_('id_alumno', lote) \
+            .execute()
+        movidos += response.count or 0
+    invalidar_kardex(ids)
+    return {'movidos': movidos, 'no_encontrados': len(ids) - movidos}
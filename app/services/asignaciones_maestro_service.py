@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+from typing import List, NamedTuple
+from app.utils.cambios import Cambio, suscribir
+from app.utils.singleflight import SingleFlight
+from app.utils.supabase_connection import supabaseConnection
+from app.utils.supabase_transport import lecturas_autoritativas
+
+# Tiempo máximo (segundos) que se reutiliza el conjunto de asignaciones de un maestro
+TTL_SEGUNDOS = float(os.environ.get("ASIGNACIONES_CACHE_TTL", 60))
+
+class AsignacionesMaestro(NamedTuple):
+    asignaciones: frozenset
+    grupos: frozenset
+    expira: float
+
+_cache: dict = {}
+_generacion: dict = {}
+_generacion_global = 0
+_lock = threading.Lock()
+# Recargas en curso: los fallos de caché concurrentes de un maestro esperan a la misma consulta
+_recargas = SingleFlight("asignaciones_maestro")
+
+def _consultar(id_maestro: str) -> AsignacionesMaestro:
+    """Consulta en una sola llamada las asignaciones y grupos del maestro."""
+    with _lock:
+        generacion = (_generacion_global, _generacion.get(id_maestro, 0))
+
+    supabase = supabaseConnection.get_instance().get_client()
+    # Es la base de la autorización de las rutas del maestro: nunca desde la réplica local
+    with lecturas_autoritativas():
+        res = supabase.table("asignacion") \
+            .select("id_asignacion, id_grupo") \
+            .eq("id_maestro", id_maestro) \
+            .execute()
+
+    entrada = AsignacionesMaestro(
+        asignaciones=frozenset(str(row["id_asignacion"]) for row in res.data),
+        grupos=frozenset(str(row["id_grupo"]) for row in res.data),
+        expira=time.monotonic() + TTL_SEGUNDOS
+    )
+
+    # Si hubo una invalidación mientras se consultaba, no se guarda el resultado
+    with _lock:
+        if (_generacion_global, _generacion.get(id_maestro, 0)) == generacion:
+            _cache[id_maestro] = entrada
+    return entrada
+
+def _cargar(id_maestro: str) -> AsignacionesMaestro:
+    return _recargas.hacer(id_maestro, lambda: _consultar(id_maestro), "asignacion")
+
+def obtener_asignaciones_maestro(id_maestro: str) -> AsignacionesMaestro:
+    """
+    Regresa los IDs de asignaciones y grupos del maestro, usando la caché si sigue vigente.
+    """
+    entrada = _cache.get(id_maestro)
+    if entrada is None or entrada.expira <= time.monotonic():
+        entrada = _cargar(id_maestro)
+    return entrada
+
+def _pertenece(id_maestro: str, valor, campo: str, verificar: bool) -> bool:
+    if verificar:
+        # Sin caché ni recarga compartida: una recarga en curso pudo empezar antes de una
+        # reasignación que el feed de cambios aún no entrega
+        return str(valor) in getattr(_consultar(id_maestro), campo)
+    entrada = _cache.get(id_maestro)
+    if entrada is not None and entrada.expira > time.monotonic():
+        if str(valor) in getattr(entrada, campo):
+            return True
+    # Un fallo puede deberse a una asignación creada en otro worker: se recarga una vez
+    return str(valor) in getattr(_cargar(id_maestro), campo)
+
+def maestro_tiene_asignacion(id_maestro: str, id_asignacion, verificar: bool = False) -> bool:
+    """
+    Verifica si la asignación pertenece al maestro. Con `verificar` se consulta la base de datos
+    en lugar de la caché (para escrituras).
+    """
+    return _pertenece(id_maestro, id_asignacion, "asignaciones", verificar)
+
+def maestro_tiene_grupo(id_maestro: str, id_grupo, verificar: bool = False) -> bool:
+    """Verifica si el maestro tiene alguna asignación en el grupo (ver maestro_tiene_asignacion)."""
+    return _pertenece(id_maestro, id_grupo, "grupos", verificar)
+
+def invalidar_asignaciones_maestro(id_maestro: str = None) -> None:
+    """
+    Descarta el conjunto en caché de un maestro, o de todos si no se indica ninguno.
+    Debe llamarse después de crear, reasignar o eliminar asignaciones.
+    """
+    global _generacion_global
+    with _lock:
+        if id_maestro is None:
+            _generacion_global += 1
+            _cache.clear()
+        else:
+            _generacion[id_maestro] = _generacion.get(id_maestro, 0) + 1
+            _cache.pop(id_maestro, None)
+    # Las recargas en curso pueden traer datos de antes de la invalidación
+    _recargas.olvidar(id_maestro)
+
+def _al_cambiar_asignaciones(cambios: List[Cambio]) -> None:
+    # Una asignación nueva solo afecta a su maestro; una reasignación o eliminación también al
+    # maestro anterior, que el cambio no siempre trae
+    if all(cambio.tipo == "INSERT" and cambio.fila and cambio.fila.get("id_maestro") for cambio in cambios):
+        for id_maestro in {str(cambio.fila["id_maestro"]) for cambio in cambios}:
+            invalidar_asignaciones_maestro(id_maestro)
+    else:
+        invalidar_asignaciones_maestro()
+
+# Cambios hechos fuera de este proceso (otros workers, consola SQL, otros servicios)
+suscribir("asignacion", _al_cambiar_asignaciones)
@@ -0,0 +1,186 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+from app.services.asignaciones_maestro_service import invalidar_asignaciones_maestro
+from app.services.fechas_parciales_service import crear_fechas_parciales_asignaciones
+from app.utils.concurrencia import en_paralelo
+from app.utils.importacion import en_lotes
+from app.utils.supabase_connection import supabaseConnection
+
+CAMPOS_ASIGNACION = ['id_curso', 'id_grupo', 'id_maestro']
+
+def expandir_matriz(matriz: dict) -> List[dict]:
+    """
+    Convierte una matriz grupo × curso cuyas celdas son el maestro en filas de asignación:
+        {"G1": {"C1": "M1", "C2": "M2"}}  ->  [{id_grupo: G1, id_curso: C1, id_maestro: M1}, ...]
+    Lanza ValueError si la matriz no tiene ese formato.
+    """
+    if not isinstance(matriz, dict) or not all(isinstance(cursos, dict) for cursos in matriz.values()):
+        raise ValueError('La matriz debe tener el formato {"id_grupo": {"id_curso": "id_maestro"}}')
+    return [
+        {'id_curso': id_curso, 'id_grupo': id_grupo, 'id_maestro': id_maestro}
+        for id_grupo, cursos in matriz.items()
+        for id_curso, id_maestro in cursos.items()
+    ]
+
+def validar_parciales(parciales: list) -> Tuple[Optional[List[dict]], Optional[str]]:
+    """
+    Valida las ventanas de parciales que se crearán en cada asignación nueva.
+    Regresa (parciales con fechas convertidas a datetime, None) o (None, mensaje de error).
+    """
+    if not isinstance(parciales, list) or not parciales:
+        return None, 'parciales debe ser una lista con las ventanas de cada parcial'
+
+    validados = []
+    for parcial in parciales:
+        if not isinstance(parcial, dict):
+            return None, 'Cada parcial debe ser un objeto'
+        missing_fields = [f for f in ('numero_parcial', 'fecha_inicio', 'fecha_fin') if not parcial.get(f)]
+        if missing_fields:
+            return None, f'Campos requeridos faltantes en parciales: {", ".join(missing_fields)}'
+        if not isinstance(parcial['numero_parcial'], int) or not 1 <= parcial['numero_parcial'] <= 3:
+            return None, 'El número de parcial debe ser 1, 2 o 3'
+        try:
+            fecha_inicio = datetime.fromisoformat(parcial['fecha_inicio'])
+            fecha_fin = datetime.fromisoformat(parcial['fecha_fin'])
+        except (TypeError, ValueError):
+            return None, 'Formato de fecha inválido. Use formato ISO (YYYY-MM-DDTHH:MM:SS)'
+        if fecha_inicio >= fecha_fin:
+            return None, f'La fecha de inicio del parcial {parcial["numero_parcial"]} debe ser anterior a la fecha de fin'
+        validados.append({
+            'numero_parcial': parcial['numero_parcial'],
+            'fecha_inicio': fecha_inicio,
+            'fecha_fin': fecha_fin,
+            'activo': parcial.get('activo', True)
+        })
+
+    numeros = [parcial['numero_parcial'] for parcial in validados]
+    if len(set(numeros)) != len(numeros):
+        return None, 'Cada número de parcial debe aparecer una sola vez'
+    return validados, None
+
+def _existentes(supabase, tabla: str, columna: str, valores: set) -> set:
+    """IDs de `valores` que existen en la tabla, con una consulta `in_` por lote."""
+    encontrados = set()
+    for lote in en_lotes(sorted(valores)):
+        response = supabase.table(tabla).select(columna).in_(columna, lote).execute()
+        encontrados.update(str(row[columna]) for row in response.data)
+    return encontrados
+
+def _asignaciones_existentes(supabase, cursos: set, grupos: set) -> dict:
+    """(id_curso, id_grupo) -> (id_asignacion, id_maestro) de las asignaciones que ya existen."""
+    existentes = {}
+    for lote_grupos in en_lotes(sorted(grupos)):
+        for lote_cursos in en_lotes(sorted(cursos)):
+            response = supabase.table('asignacion') \
+                .select('id_asignacion, id_curso, id_grupo, id_maestro') \
+                .in_('id_grupo', lote_grupos) \
+                .in_('id_curso', lote_cursos) \
+                .execute()
+            for row in response.data:
+                clave = (str(row['id_curso']), str(row['id_grupo']))
+                existentes[clave] = (row['id_asignacion'], str(row['id_maestro']))
+    return existentes
+
+def crear_asignaciones(filas: List[dict], parciales: List[dict] = None) -> List[dict]:
+    """
+    Crea asignaciones (curso × grupo × maestro) en lote y regresa un resultado por fila:
+        {'fila', 'id_curso', 'id_grupo', 'id_maestro',
+         'estado': 'creada' | 'existente' | 'conflicto' | 'error', 'id_asignacion'?, 'error'?}
+
+    - Verifica cursos, grupos y maestros con una consulta por tabla, en paralelo.
+    - Un curso se imparte a un grupo por un solo maestro: si el curso × grupo ya tiene una
+      asignación con el mismo maestro se reporta como 'existente' con su ID, de modo que la misma
+      matriz se puede enviar otra vez sin efectos; si es con otro maestro, o si se repite en la
+      solicitud, la fila se reporta como 'conflicto' y no se inserta.
+    - Inserta por lotes; si un lote falla se reintenta fila por fila para reportar cada error.
+    - Con `parciales` (ya validados con validar_parciales) crea esas ventanas en cada asignación nueva.
+    """
+    supabase = supabaseConnection.get_instance().get_client()
+    resultados: List[Optional[dict]] = [None] * len(filas)
+    combinaciones = []
+
+    def resultado(indice: int, estado: str, **extra) -> None:
+        fila = filas[indice]
+        resultados[indice] = {
+            'fila': indice + 1,
+            **{campo: fila.get(campo) for campo in CAMPOS_ASIGNACION},
+            'estado': estado,
+            **extra
+        }
+
+    primera_fila = {}
+    for indice, fila in enumerate(filas):
+        missing_fields = [campo for campo in CAMPOS_ASIGNACION if not fila.get(campo)]
+        if missing_fields:
+            resultado(indice, 'error', error=f'Campos requeridos faltantes: {", ".join(missing_fields)}')
+            continue
+        clave = tuple(str(fila[campo]).strip() for campo in CAMPOS_ASIGNACION)
+        if clave[:2] in primera_fila:
+            resultado(indice, 'conflicto',
+                      error=f'El curso y grupo ya aparecen en la solicitud (fila {primera_fila[clave[:2]] + 1})')
+            continue
+        primera_fila[clave[:2]] = indice
+        combinaciones.append((indice, clave))
+
+    if not combinaciones:
+        return resultados
+
+    cursos = {clave[0] for _, clave in combinaciones}
+    grupos = {clave[1] for _, clave in combinaciones}
+    maestros = {clave[2] for _, clave in combinaciones}
+
+    cursos_validos, grupos_validos, maestros_validos, existentes = en_paralelo(
+        lambda: _existentes(supabase, 'curso', 'id_curso', cursos),
+        lambda: _existentes(supabase, 'grupo', 'id_grupo', grupos),
+        lambda: _existentes(supabase, 'maestro', 'id_usuario', maestros),
+        lambda: _asignaciones_existentes(supabase, cursos, grupos)
+    )
+
+    pendientes = []
+    for indice, (id_curso, id_grupo, id_maestro) in combinaciones:
+        faltantes = [
+            f'{nombre} {valor} no existe' for nombre, valor, validos in (
+                ('El curso', id_curso, cursos_validos),
+                ('El grupo', id_grupo, grupos_validos),
+                ('El maestro', id_maestro, maestros_validos)
+            ) if valor not in validos
+        ]
+        if faltantes:
+            resultado(indice, 'error', error='; '.join(faltantes))
+        elif (id_curso, id_grupo) in existentes:
+            id_asignacion, maestro_actual = existentes[(id_curso, id_grupo)]
+            if maestro_actual == id_maestro:
+                resultado(indice, 'existente', id_asignacion=id_asignacion)
+            else:
+                resultado(indice, 'conflicto', id_asignacion=id_asignacion,
+                          error=f'El curso ya está asignado a este grupo con el maestro {maestro_actual}')
+        else:
+            pendientes.append((indice, {'id_curso': id_curso, 'id_grupo': id_grupo, 'id_maestro': id_maestro}))
+
+    creadas = []
+    for lote in en_lotes(pendientes):
+        try:
+            response = supabase.table('asignacion').insert([registro for _, registro in lote]).execute()
+            for (indice, _), row in zip(lote, response.data):
+                resultado(indice, 'creada', id_asignacion=row['id_asignacion'])
+                creadas.append((indice, row))
+        except Exception:
+            for indice, registro in lote:
+                try:
+                    response = supabase.table('asignacion').insert(registro).execute()
+                    resultado(indice, 'creada', id_asignacion=response.data[0]['id_asignacion'])
+                    creadas.append((indice, response.data[0]))
+                except Exception as e:
+                    resultado(indice, 'error', error=str(e))
+
+    for id_maestro in {str(row['id_maestro']) for _, row in creadas}:
+        invalidar_asignaciones_maestro(id_maestro)
+
+    if parciales and creadas:
+        try:
+            crear_fechas_parciales_asignaciones([row['id_asignacion'] for _, row in creadas], parciales)
+        except Exception as e:
+            # Las asignaciones ya quedaron creadas; las fechas se pueden configurar después
+            for indice, _ in creadas:
+                resultados[indice]['advertencia'] = f'No se pudieron crear las fechas de parciales: {str(e)}'
+    return resultados
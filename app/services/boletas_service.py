@@ -0,0 +1,198 @@
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Iterator, List, Tuple
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from app.services.calificacion_service import calcular_final
+from app.utils.concurrencia import en_paralelo
+from app.utils.importacion import en_lotes
+from app.utils.nombres import nombre_completo
+from app.utils.paginacion import leer_todas
+from app.utils.supabase_connection import supabaseConnection
+from app.utils.zip_streaming import SalidaStreaming
+
+# Procesos para generar las boletas; con 1 se generan en el mismo proceso. Cada worker del
+# servidor tiene su propio pool, así que el total es (workers del servidor) × BOLETAS_WORKERS:
+# por eso el valor por defecto es fijo y pequeño en lugar de os.cpu_count()
+BOLETAS_WORKERS = int(os.environ.get("BOLETAS_WORKERS", 2))
+
+# Boletas que genera cada proceso por tarea (amortiza el envío de datos entre procesos)
+BOLETAS_POR_TAREA = int(os.environ.get("BOLETAS_POR_TAREA", 50))
+
+# Grupos cuyos alumnos y calificaciones se leen juntos; acota la memoria usada por lote
+BOLETAS_GRUPOS_POR_LOTE = int(os.environ.get("BOLETAS_GRUPOS_POR_LOTE", 10))
+
+# Caracteres que no se usan en los nombres de archivo dentro del ZIP
+_NO_PERMITIDOS = re.compile(r"[^\w.-]+")
+
+_entorno = Environment(
+    loader=FileSystemLoader(os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")),
+    autoescape=select_autoescape(["html"])
+)
+
+_pool: ProcessPoolExecutor = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn en lugar de fork: el servidor tiene hilos y conexiones abiertas
+                _pool = ProcessPoolExecutor(
+                    max_workers=BOLETAS_WORKERS, mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+def renderizar_boletas(boletas: List[dict]) -> List[Tuple[str, bytes]]:
+    """Genera el HTML de cada boleta. Corre en los procesos del pool: solo recibe y regresa datos."""
+    plantilla = _entorno.get_template("boleta.html")
+    return [(boleta["archivo"], plantilla.render(**boleta).encode("utf-8")) for boleta in boletas]
+
+def buscar_grupos(id_grupo: str = None, generacion: str = None, facultad: str = None) -> List[dict]:
+    """Grupos de los que se generarán boletas: uno por ID, o los de una generación (y facultad)."""
+    supabase = supabaseConnection.get_instance().get_client()
+
+    def query():
+        query = supabase.table("grupo").select("id_grupo, nombre_grupo, generacion, facultad").order("id_grupo")
+        if id_grupo:
+            query = query.eq("id_grupo", id_grupo)
+        if generacion:
+            query = query.eq("generacion", generacion)
+        if facultad:
+            query = query.eq("facultad", facultad)
+        return query
+
+    return leer_todas(query)
+
+def _archivo(grupo: dict, alumno: dict) -> str:
+    """Ruta de la boleta dentro del ZIP: <grupo>/<matrícula>_<apellido>_<nombre>.html"""
+    nombre = f"{alumno['id_alumno']}_{alumno.get('apellido_paterno') or ''}_{alumno.get('nombre') or ''}"
+    carpeta = _NO_PERMITIDOS.sub("_", str(grupo.get("nombre_grupo") or grupo["id_grupo"]))
+    return f"{carpeta}/{_NO_PERMITIDOS.sub('_', nombre).strip('_')}.html"
+
+def _boletas_lote(supabase, grupos: List[dict]) -> Iterator[dict]:
+    """Arma los datos de las boletas de un lote de grupos con tres consultas (paginadas)."""
+    ids_grupo = [grupo["id_grupo"] for grupo in grupos]
+
+    alumnos, asignaciones = en_paralelo(
+        lambda: leer_todas(lambda: supabase.table("alumno")
+                           .select("id_alumno, id_grupo, nombre, apellido_paterno, apellido_materno")
+                           .in_("id_grupo", ids_grupo)
+                           .order("id_alumno")),
+        lambda: leer_todas(lambda: supabase.table("asignacion")
+                           .select("id_asignacion, id_grupo, curso(nombre, codigo), maestro(nombre, apellido_paterno, apellido_materno)")
+                           .in_("id_grupo", ids_grupo)
+                           .order("id_asignacion"))
+    )
+
+    calificaciones = {}
+    for lote in en_lotes([asignacion["id_asignacion"] for asignacion in asignaciones]):
+        filas = leer_todas(lambda: supabase.table("calificaciones")
+                           .select("id_alumno, id_asignacion, parcial_1, parcial_2, parcial_3, calificacion_final")
+                           .in_("id_asignacion", lote)
+                           .order("id_calif_alum_curso"))
+        for fila in filas:
+            calificaciones[(str(fila["id_alumno"]), str(fila["id_asignacion"]))] = fila
+
+    materias_grupo = defaultdict(list)
+    for asignacion in asignaciones:
+        materias_grupo[str(asignacion["id_grupo"])].append(asignacion)
+    alumnos_grupo = defaultdict(list)
+    for alumno in alumnos:
+        alumnos_grupo[str(alumno["id_grupo"])].append(alumno)
+
+    fecha_emision = date.today().isoformat()
+    for grupo in grupos:
+        asignaciones_grupo = sorted(
+            materias_grupo[str(grupo["id_grupo"])], key=lambda a: (a.get("curso") or {}).get("nombre") or ""
+        )
+        ordenados = sorted(
+            alumnos_grupo[str(grupo["id_grupo"])],
+            key=lambda a: (a.get("apellido_paterno") or "", a.get("apellido_materno") or "", a.get("nombre") or "")
+        )
+        for alumno in ordenados:
+            materias = []
+            for asignacion in asignaciones_grupo:
+                calificacion = calificaciones.get((str(alumno["id_alumno"]), str(asignacion["id_asignacion"]))) or {}
+                curso = asignacion.get("curso") or {}
+                materias.append({
+                    "codigo": curso.get("codigo"),
+                    "curso": curso.get("nombre", "N/A"),
+                    "maestro": nombre_completo(asignacion.get("maestro")),
+                    "parcial_1": calificacion.get("parcial_1"),
+                    "parcial_2": calificacion.get("parcial_2"),
+                    "parcial_3": calificacion.get("parcial_3"),
+                    "final": calcular_final(calificacion)
+                })
+            finales = [materia["final"] for materia in materias if materia["final"] is not None]
+            yield {
+                "archivo": _archivo(grupo, alumno),
+                "alumno": {**alumno, "nombre_completo": nombre_completo(alumno)},
+                "grupo": grupo,
+                "materias": materias,
+                "promedio": sum(finales) / len(finales) if finales else None,
+                "fecha_emision": fecha_emision
+            }
+
+def _tareas(grupos: List[dict]) -> Iterator[List[dict]]:
+    """Boletas en tareas de BOLETAS_POR_TAREA, leyendo los grupos por lotes conforme se piden."""
+    supabase = supabaseConnection.get_instance().get_client()
+    tarea = []
+    for lote in en_lotes(grupos, BOLETAS_GRUPOS_POR_LOTE):
+        for boleta in _boletas_lote(supabase, lote):
+            tarea.append(boleta)
+            if len(tarea) >= BOLETAS_POR_TAREA:
+                yield tarea
+                tarea = []
+    if tarea:
+        yield tarea
+
+def _renderizadas(tareas: Iterator[List[dict]]) -> Iterator[List[Tuple[str, bytes]]]:
+    """
+    Genera las tareas en el pool de procesos y las entrega en orden. Como mucho hay
+    2 × BOLETAS_WORKERS tareas en vuelo, así que la lectura nunca se adelanta demasiado.
+    """
+    if BOLETAS_WORKERS <= 1:
+        for tarea in tareas:
+            yield renderizar_boletas(tarea)
+        return
+
+    pool = _get_pool()
+    en_vuelo = deque()
+    try:
+        for tarea in tareas:
+            en_vuelo.append(pool.submit(renderizar_boletas, tarea))
+            if len(en_vuelo) >= 2 * BOLETAS_WORKERS:
+                yield en_vuelo.popleft().result()
+        while en_vuelo:
+            yield en_vuelo.popleft().result()
+    finally:
+        # El cliente se desconectó o algo falló: no se generan las boletas restantes
+        for futuro in en_vuelo:
+            futuro.cancel()
+
+def generar_zip_boletas(grupos: List[dict]) -> Iterator[bytes]:
+    """
+    Genera un ZIP con una boleta HTML por alumno de los grupos (ver buscar_grupos) y lo
+    entrega por partes, conforme se generan las boletas.
+
+    - Alumnos, asignaciones y calificaciones se leen con tres consultas por cada
+      BOLETAS_GRUPOS_POR_LOTE grupos, no con una llamada por alumno.
+    - El HTML se genera en BOLETAS_WORKERS procesos.
+    - No se crean archivos temporales y en memoria solo están el lote de grupos actual y las
+      tareas en vuelo, sin importar cuántos alumnos haya.
+    """
+    salida = SalidaStreaming()
+    with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_DEFLATED) as archivo_zip:
+        for renderizadas in _renderizadas(_tareas(grupos)):
+            for nombre, contenido in renderizadas:
+                archivo_zip.writestr(nombre, contenido)
+            yield salida.vaciar()
+    # Directorio central del ZIP
+    yield salida.vaciar()
@@ -1,4 +1,6 @@
 from datetime import datetime
+from typing import Optional
+from app.utils.nombres import nombre_completo
 from app.utils.supabase_connection import supabaseConnection
 
 def puede_subir_calificacion(id_asignacion: int, numero_parcial: int) -> dict:
@@ -44,4 +46,91 @@ def puede_subir_calificacion(id_asignacion: int, numero_parcial: int) -> dict:
         return {
             "status": True,
             "mensaje": "Está dentro del periodo permitido. Puedes subir calificaciones."
-        }
\ No newline at end of file
+        }
+
+def calcular_final(calificacion: dict) -> Optional[float]:
+    """
+    Calificación final de una fila de `calificaciones`: la guardada, o si aún no existe,
+    el promedio de los tres parciales (igual que Calificaciones.calculate_final).
+    Regresa None si falta algún parcial.
+    """
+    if calificacion.get("calificacion_final") is not None:
+        return calificacion["calificacion_final"]
+    parciales = [calificacion.get(f"parcial_{n}") for n in (1, 2, 3)]
+    if any(parcial is None for parcial in parciales):
+        return None
+    return sum(parciales) / 3.0
+
+SELECT_MATRIZ = (
+    "id_grupo, nombre_grupo, generacion, facultad, "
+    "alumno(id_alumno, nombre, apellido_paterno, apellido_materno), "
+    "asignacion(id_asignacion, curso(id_curso, nombre, codigo), maestro(id_usuario, nombre, apellido_paterno), "
+    "calificaciones(id_alumno, parcial_1, parcial_2, parcial_3, calificacion_final))"
+)
+
+COLUMNAS_MATRIZ = ("parcial_1", "parcial_2", "parcial_3", "final")
+
+def matriz_calificaciones(id_grupo: str) -> Optional[dict]:
+    """
+    Calificaciones de un grupo (alumnos × materias) en forma columnar, con una sola consulta:
+    el grupo con sus alumnos y sus asignaciones, cada una con sus calificaciones embebidas.
+
+    Returns:
+        None si el grupo no existe, o
+        {
+            'grupo': {...},
+            'alumnos': [{'id_alumno', 'nombre'}],            # filas, ordenadas por apellido
+            'materias': [{'id_asignacion', 'id_curso', 'curso', 'codigo', 'maestro'}],  # columnas
+            'forma': [n_alumnos, n_materias],
+            'calificaciones': {'parcial_1': [...], 'parcial_2': [...], 'parcial_3': [...], 'final': [...]}
+        }
+        Cada arreglo de calificaciones tiene n_alumnos × n_materias valores por renglón:
+        la calificación del alumno i en la materia j está en [i * n_materias + j] (None si no hay).
+    """
+    supabase = supabaseConnection.get_instance().get_client()
+    res = supabase.table("grupo").select(SELECT_MATRIZ).eq("id_grupo", id_grupo).execute()
+    if not res.data:
+        return None
+
+    grupo = res.data[0]
+    alumnos = sorted(
+        grupo.get("alumno") or [],
+        key=lambda a: (a.get("apellido_paterno") or "", a.get("apellido_materno") or "", a.get("nombre") or "", str(a["id_alumno"]))
+    )
+    asignaciones = sorted(
+        grupo.get("asignacion") or [],
+        key=lambda a: ((a.get("curso") or {}).get("nombre") or "", a["id_asignacion"])
+    )
+
+    fila_alumno = {str(alumno["id_alumno"]): i for i, alumno in enumerate(alumnos)}
+    n_materias = len(asignaciones)
+    columnas = {columna: [None] * (len(alumnos) * n_materias) for columna in COLUMNAS_MATRIZ}
+
+    for j, asignacion in enumerate(asignaciones):
+        for calificacion in asignacion.get("calificaciones") or []:
+            # Calificaciones de alumnos que ya cambiaron de grupo no tienen renglón
+            i = fila_alumno.get(str(calificacion["id_alumno"]))
+            if i is None:
+                continue
+            posicion = i * n_materias + j
+            columnas["parcial_1"][posicion] = calificacion.get("parcial_1")
+            columnas["parcial_2"][posicion] = calificacion.get("parcial_2")
+            columnas["parcial_3"][posicion] = calificacion.get("parcial_3")
+            columnas["final"][posicion] = calcular_final(calificacion)
+
+    return {
+        "grupo": {campo: grupo.get(campo) for campo in ("id_grupo", "nombre_grupo", "generacion", "facultad")},
+        "alumnos": [{"id_alumno": alumno["id_alumno"], "nombre": nombre_completo(alumno)} for alumno in alumnos],
+        "materias": [
+            {
+                "id_asignacion": asignacion["id_asignacion"],
+                "id_curso": (asignacion.get("curso") or {}).get("id_curso"),
+                "curso": (asignacion.get("curso") or {}).get("nombre", "N/A"),
+                "codigo": (asignacion.get("curso") or {}).get("codigo"),
+                "maestro": nombre_completo(asignacion.get("maestro"))
+            }
+            for asignacion in asignaciones
+        ],
+        "forma": [len(alumnos), n_materias],
+        "calificaciones": columnas
+    }
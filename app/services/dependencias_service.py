@@ -0,0 +1,152 @@
+import os
+from typing import Callable, List, NamedTuple, Optional
+from app.utils.concurrencia import en_paralelo
+from app.utils.supabase_connection import supabaseConnection
+
+# Filas de ejemplo que se regresan por cada relación que impide una eliminación
+MUESTRA_DEPENDENCIAS = int(os.environ.get("MUESTRA_DEPENDENCIAS", 10))
+
+class Verificacion(NamedTuple):
+    """
+    Una relación a verificar antes de eliminar un registro.
+
+    - columnas: columnas de las filas de ejemplo; si es None solo se cuenta (HEAD, sin filas).
+    - filtro: función que recibe el query builder y le aplica el filtro (p. ej. `.eq(...)`).
+    - mensaje: función que recibe el total y regresa el texto del error.
+    - detalle: función que convierte una fila de ejemplo en su entrada de 'detalles'.
+    """
+    tabla: str
+    filtro: Callable
+    mensaje: Callable[[int], str]
+    columnas: Optional[str] = None
+    detalle: Optional[Callable[[dict], object]] = None
+    detalles_fijos: Optional[list] = None
+
+def _consultar(supabase, verificacion: Verificacion):
+    if verificacion.columnas is None:
+        # Solo el conteo: PostgREST responde con Content-Range y sin cuerpo
+        query = supabase.table(verificacion.tabla).select("*", count="exact", head=True)
+        return verificacion.filtro(query).execute()
+
+    # Conteo total y una muestra acotada en la misma llamada
+    query = supabase.table(verificacion.tabla).select(verificacion.columnas, count="exact")
+    return verificacion.filtro(query).limit(MUESTRA_DEPENDENCIAS).execute()
+
+def verificar_dependencias(verificaciones: List[Verificacion]) -> list:
+    """
+    Ejecuta las verificaciones en paralelo y regresa las relaciones activas con el formato
+    de 'relaciones_activas' de los endpoints de eliminación:
+        {'tabla', 'count', 'mensaje', 'detalles'[, 'nota']}
+
+    Nunca se descargan más de MUESTRA_DEPENDENCIAS filas por tabla, sin importar cuántas existan.
+    """
+    if not verificaciones:
+        return []
+
+    supabase = supabaseConnection.get_instance().get_client()
+    respuestas = en_paralelo(*[
+        (lambda v=verificacion: _consultar(supabase, v)) for verificacion in verificaciones
+    ])
+
+    relaciones = []
+    for verificacion, response in zip(verificaciones, respuestas):
+        total = response.count or 0
+        if not total:
+            continue
+
+        if verificacion.detalle is not None:
+            detalles = [verificacion.detalle(fila) for fila in response.data]
+        else:
+            detalles = list(verificacion.detalles_fijos or [])
+
+        relacion = {
+            "tabla": verificacion.tabla,
+            "count": total,
+            "mensaje": verificacion.mensaje(total),
+            "detalles": detalles
+        }
+        if verificacion.detalle is not None and total > len(detalles):
+            relacion["nota"] = f"Se muestran solo los primeros {len(detalles)} de {total} registros"
+        relaciones.append(relacion)
+    return relaciones
+
+def _nombre(persona: Optional[dict]) -> str:
+    persona = persona or {}
+    return f"{persona.get('nombre', 'N/A')} {persona.get('apellido_paterno', '')}".strip()
+
+def dependencias_curso(id_curso: str) -> list:
+    """
+    Relaciones que impiden eliminar un curso: asignaciones y, a través de ellas,
+    calificaciones y horarios.
+    """
+    supabase = supabaseConnection.get_instance().get_client()
+
+    # Solo los IDs: un curso tiene a lo más unas decenas de asignaciones
+    ids_response = supabase.table("asignacion").select("id_asignacion").eq("id_curso", id_curso).execute()
+    asignacion_ids = [fila["id_asignacion"] for fila in ids_response.data]
+    if not asignacion_ids:
+        return []
+
+    return verificar_dependencias([
+        Verificacion(
+            tabla="asignacion",
+            columnas="id_asignacion, grupo(nombre_grupo), maestro(nombre, apellido_paterno)",
+            filtro=lambda q: q.eq("id_curso", id_curso),
+            mensaje=lambda n: f"El curso tiene {n} asignación(es) activa(s)",
+            detalle=lambda fila: {
+                "id_asignacion": fila["id_asignacion"],
+                "grupo": (fila.get("grupo") or {}).get("nombre_grupo", "N/A"),
+                "maestro": _nombre(fila.get("maestro"))
+            }
+        ),
+        Verificacion(
+            tabla="calificaciones",
+            columnas="id_alumno, alumno(nombre, apellido_paterno)",
+            filtro=lambda q: q.in_("id_asignacion", asignacion_ids),
+            mensaje=lambda n: f"El curso tiene {n} calificación(es) registrada(s)",
+            detalle=lambda fila: {"id_alumno": fila["id_alumno"], "alumno": _nombre(fila.get("alumno"))}
+        ),
+        Verificacion(
+            tabla="horario_asignacion",
+            columnas="dia_semana, hora_inicio, hora_fin",
+            filtro=lambda q: q.in_("id_asignacion", asignacion_ids),
+            mensaje=lambda n: f"El curso tiene {n} horario(s) programado(s)",
+            detalle=lambda fila: {
+                "dia": fila["dia_semana"],
+                "hora_inicio": fila["hora_inicio"],
+                "hora_fin": fila["hora_fin"]
+            }
+        ),
+        Verificacion(
+            tabla="fechas_parciales",
+            filtro=lambda q: q.in_("id_asignacion", asignacion_ids),
+            mensaje=lambda n: f"El curso tiene {n} periodo(s) de parcial configurado(s)",
+            detalles_fijos=["Fechas de captura de parciales"]
+        )
+    ])
+
+def dependencias_maestro(id_maestro: str) -> list:
+    """
+    Relaciones que impiden eliminar un maestro: asignaciones (de las que dependen
+    calificaciones, horarios y fechas de parciales) y disponibilidad registrada.
+    """
+    return verificar_dependencias([
+        Verificacion(
+            tabla="asignacion",
+            columnas="id_asignacion, curso(nombre), grupo(nombre_grupo)",
+            filtro=lambda q: q.eq("id_maestro", id_maestro),
+            mensaje=lambda n: f"El maestro tiene {n} asignación(es) activa(s)",
+            detalle=lambda fila: {
+                "id_asignacion": fila["id_asignacion"],
+                "curso": (fila.get("curso") or {}).get("nombre", "N/A"),
+                "grupo": (fila.get("grupo") or {}).get("nombre_grupo", "N/A")
+            }
+        ),
+        Verificacion(
+            tabla="disponibilidad",
+            columnas="dia_semana, hora_inicio, hora_fin",
+            filtro=lambda q: q.eq("id_maestro", id_maestro),
+            mensaje=lambda n: f"El maestro tiene {n} horario(s) de disponibilidad registrado(s)",
+            detalle=lambda fila: f"{fila['dia_semana']} {fila['hora_inicio']}-{fila['hora_fin']}"
+        )
+    ])
@@ -0,0 +1,174 @@
+import os
+import typing
+import zipfile
+from dataclasses import fields
+from datetime import date, datetime, time
+from typing import Iterator, List, NamedTuple, Type, get_type_hints
+from app.models import AsignacionCurso, Alumno, Calificaciones, Curso, Grupo, HorarioAsignacion, Maestro
+from app.models.base_model import ModelBase
+from app.utils.paginacion import iterar_por_llave
+from app.utils.supabase_connection import supabaseConnection
+from app.utils.zip_streaming import SalidaStreaming
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    # Sin pyarrow la exportación no está disponible; el resto de la API funciona igual
+    pa = None
+
+# Filas por row group (Parquet) o por batch (Arrow IPC); acota la memoria de la exportación
+EXPORT_ROW_GROUP = int(os.environ.get("EXPORT_ROW_GROUP", 50000))
+
+# formato -> extensión. Arrow se escribe en formato stream (.arrows): el formato archivo no
+# permite que cada batch traiga su propio diccionario
+FORMATOS_EXPORTACION = {"parquet": "parquet", "arrow": "arrows"}
+
+class TablaExportacion(NamedTuple):
+    tabla: str
+    modelo: Type[ModelBase]
+    llave: str
+
+# Orden de exportación: catálogos primero, luego las tablas que los referencian
+TABLAS_EXPORTACION = [
+    TablaExportacion("grupo", Grupo, "id_grupo"),
+    TablaExportacion("curso", Curso, "id_curso"),
+    TablaExportacion("maestro", Maestro, "id_usuario"),
+    TablaExportacion("alumno", Alumno, "id_alumno"),
+    TablaExportacion("asignacion", AsignacionCurso, "id_asignacion"),
+    TablaExportacion("horario_asignacion", HorarioAsignacion, "id_horario"),
+    TablaExportacion("calificaciones", Calificaciones, "id_calif_alum_curso"),
+]
+
+class ExportacionNoDisponible(RuntimeError):
+    """pyarrow no está instalado."""
+    pass
+
+def _tipo_base(tipo):
+    # Optional[X] -> X
+    if typing.get_origin(tipo) is typing.Union:
+        argumentos = [argumento for argumento in typing.get_args(tipo) if argumento is not type(None)]
+        if len(argumentos) == 1:
+            return argumentos[0]
+    return tipo
+
+def _convertidor(tipo):
+    """Función que convierte el valor de PostgREST (JSON) al tipo de Python que espera pyarrow."""
+    if tipo is date:
+        return date.fromisoformat
+    if tipo is datetime:
+        return datetime.fromisoformat
+    if tipo is time:
+        return time.fromisoformat
+    if tipo in (int, float, bool):
+        return tipo
+    # Columnas de texto y Enums: el modelo manda aunque el valor llegue como número
+    return str
+
+def esquema_modelo(modelo: Type[ModelBase], llave: str):
+    """
+    Esquema de Arrow a partir de los tipos de los campos del modelo. Las columnas de texto
+    y los Enums se codifican como diccionario, salvo la llave primaria (todos sus valores son distintos).
+    """
+    tipos_arrow = {
+        int: pa.int64(),
+        float: pa.float64(),
+        bool: pa.bool_(),
+        date: pa.date32(),
+        datetime: pa.timestamp("us"),
+        time: pa.time64("us"),
+    }
+    columnas = []
+    hints = get_type_hints(modelo)
+    for campo in fields(modelo):
+        tipo = _tipo_base(hints[campo.name])
+        if tipo in tipos_arrow:
+            tipo_arrow = tipos_arrow[tipo]
+        elif campo.name == llave:
+            tipo_arrow = pa.string()
+        else:
+            # str y Enums de texto
+            tipo_arrow = pa.dictionary(pa.int32(), pa.string())
+        columnas.append(pa.field(campo.name, tipo_arrow, nullable=campo.name != llave))
+    return pa.schema(columnas, metadata={"tabla": modelo.__name__})
+
+def _lote_arrow(filas: List[dict], esquema, convertidores: dict):
+    columnas = []
+    for campo in esquema:
+        convertir = convertidores[campo.name]
+        valores = [fila.get(campo.name) for fila in filas]
+        valores = [convertir(valor) if valor is not None else None for valor in valores]
+        columnas.append(pa.array(valores, type=campo.type))
+    return pa.RecordBatch.from_arrays(columnas, schema=esquema)
+
+def _lotes_tabla(supabase, definicion: TablaExportacion, esquema) -> Iterator:
+    """RecordBatches de hasta EXPORT_ROW_GROUP filas de la tabla."""
+    hints = get_type_hints(definicion.modelo)
+    convertidores = {campo.name: _convertidor(_tipo_base(hints[campo.name])) for campo in esquema}
+    columnas = [campo.name for campo in esquema]
+
+    pendientes = []
+    paginas = iterar_por_llave(
+        lambda: supabase.table(definicion.tabla).select(", ".join(columnas)), definicion.llave
+    )
+    for pagina in paginas:
+        pendientes.extend(pagina)
+        if len(pendientes) >= EXPORT_ROW_GROUP:
+            yield _lote_arrow(pendientes, esquema, convertidores)
+            pendientes = []
+    if pendientes:
+        yield _lote_arrow(pendientes, esquema, convertidores)
+
+def tablas_solicitadas(nombres: List[str] = None) -> List[TablaExportacion]:
+    """Definiciones de las tablas pedidas (todas si no se indica ninguna). Lanza ValueError si alguna no existe."""
+    if not nombres:
+        return list(TABLAS_EXPORTACION)
+    disponibles = {definicion.tabla: definicion for definicion in TABLAS_EXPORTACION}
+    desconocidas = [nombre for nombre in nombres if nombre not in disponibles]
+    if desconocidas:
+        raise ValueError(
+            f'Tabla(s) no exportable(s): {", ".join(desconocidas)}. Disponibles: {", ".join(disponibles)}'
+        )
+    return [disponibles[nombre] for nombre in nombres]
+
+def verificar_disponible() -> None:
+    if pa is None:
+        raise ExportacionNoDisponible('La exportación requiere pyarrow, que no está instalado')
+
+def generar_zip_exportacion(tablas: List[TablaExportacion], formato: str = "parquet") -> Iterator[bytes]:
+    """
+    Genera un ZIP con un archivo por tabla (<tabla>.parquet, o <tabla>.arrows con Arrow IPC)
+    y lo entrega por partes.
+
+    - Los tipos de cada columna salen de los campos del modelo (ModelBase); fechas, horas y
+      números quedan tipados y el texto se codifica como diccionario.
+    - Cada tabla se lee por páginas y se escribe un row group (o batch) cada EXPORT_ROW_GROUP
+      filas, de modo que la memoria no crece con el tamaño de la tabla.
+    - Los archivos se leen directamente con pandas.read_parquet, pyarrow o DuckDB
+      (`SELECT * FROM 'alumno.parquet'`) después de descomprimir el ZIP; los .arrows con
+      pyarrow.ipc.open_stream.
+    """
+    verificar_disponible()
+    supabase = supabaseConnection.get_instance().get_client()
+    salida = SalidaStreaming()
+
+    with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_STORED) as archivo_zip:
+        for definicion in tablas:
+            esquema = esquema_modelo(definicion.modelo, definicion.llave)
+            # force_zip64: el tamaño final no se conoce al empezar a escribir
+            with archivo_zip.open(f"{definicion.tabla}.{FORMATOS_EXPORTACION[formato]}", "w", force_zip64=True) as destino:
+                if formato == "parquet":
+                    escritor = pq.ParquetWriter(destino, esquema, compression="zstd")
+                else:
+                    escritor = pa_ipc.new_stream(destino, esquema)
+                with escritor:
+                    for lote in _lotes_tabla(supabase, definicion, esquema):
+                        if formato == "parquet":
+                            escritor.write_batch(lote, row_group_size=EXPORT_ROW_GROUP)
+                        else:
+                            escritor.write_batch(lote)
+                        yield salida.vaciar()
+            yield salida.vaciar()
+    # Directorio central del ZIP
+    yield salida.vaciar()
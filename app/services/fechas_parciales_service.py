@@ -1,26 +1,135 @@
 from datetime import datetime
+from typing import List
+from app.utils.importacion import IMPORT_CHUNK_SIZE, en_lotes
+from app.utils.paginacion import leer_todas
 from app.utils.supabase_connection import supabaseConnection
 
 supabase = supabaseConnection.get_instance().get_client()
 
-def crear_fecha_parcial(id_asignacion: int, numero_parcial: int, fecha_inicio: datetime, fecha_fin: datetime, activo: bool = True) -> dict:
-    # Verificar que no exista ya una fecha para este parcial
-    existente = supabase.table("fechas_parciales") \
-        .select("*") \
-        .eq("id_asignacion", id_asignacion) \
-        .eq("numero_parcial", numero_parcial) \
-        .execute()
-
-    if existente.data:
-        return {"error": "Ya existe una fecha configurada para este parcial"}
-
-    # Insertar nuevo registro
-    res = supabase.table("fechas_parciales").insert({
+FILTROS_VENTANA = ("facultad", "generacion", "id_curso", "id_grupo")
+
+# Restricción única de las ventanas (ver 20261019160000_fechas_parciales_unica.sql)
+LLAVE_VENTANA = "id_asignacion,numero_parcial"
+
+def _registro_fecha_parcial(id_asignacion: int, numero_parcial: int, fecha_inicio: datetime, fecha_fin: datetime, activo: bool = True) -> dict:
+    return {
         "id_asignacion": id_asignacion,
         "numero_parcial": numero_parcial,
         "fecha_inicio": fecha_inicio.isoformat(),
         "fecha_fin": fecha_fin.isoformat(),
         "activo": activo
-    }).execute()
+    }
+
+def crear_fecha_parcial(id_asignacion: int, numero_parcial: int, fecha_inicio: datetime, fecha_fin: datetime, activo: bool = True) -> dict:
+    # Si ya existe una fecha para este parcial, la base de datos ignora la fila y no regresa nada
+    res = supabase.table("fechas_parciales").upsert(
+        _registro_fecha_parcial(id_asignacion, numero_parcial, fecha_inicio, fecha_fin, activo),
+        on_conflict=LLAVE_VENTANA, ignore_duplicates=True
+    ).execute()
+
+    return res.data[0] if res.data else {"error": "Ya existe una fecha configurada para este parcial"}
+
+def crear_fechas_parciales_asignaciones(ids_asignacion: List[int], parciales: List[dict]) -> List[dict]:
+    """
+    Versión en lote de crear_fecha_parcial para asignaciones recién creadas: inserta las mismas
+    ventanas (`parciales`: numero_parcial, fecha_inicio, fecha_fin y activo opcional) en cada
+    asignación, con una llamada por lote en lugar de dos por ventana.
+
+    Las ventanas que ya existan (p. ej. abiertas al mismo tiempo con aplicar_ventana_parcial)
+    se conservan y no se regresan.
+    """
+    registros = [
+        _registro_fecha_parcial(
+            id_asignacion, parcial["numero_parcial"], parcial["fecha_inicio"], parcial["fecha_fin"],
+            parcial.get("activo", True)
+        )
+        for id_asignacion in ids_asignacion
+        for parcial in parciales
+    ]
+
+    creadas = []
+    for lote in en_lotes(registros):
+        res = supabase.table("fechas_parciales").upsert(lote, on_conflict=LLAVE_VENTANA, ignore_duplicates=True).execute()
+        creadas.extend(res.data)
+    return creadas
+
+def _asignaciones_filtradas(filtro: dict) -> List[int]:
+    """IDs de las asignaciones que cumplen el filtro (facultad, generacion, id_curso, id_grupo)."""
+    def query_asignaciones():
+        query = supabase.table("asignacion").select("id_asignacion").order("id_asignacion")
+        if filtro.get("id_curso") is not None:
+            query = query.eq("id_curso", filtro["id_curso"])
+        if filtro.get("id_grupo") is not None:
+            query = query.eq("id_grupo", filtro["id_grupo"])
+        return query
+
+    # Un filtro presente se aplica aunque sea un valor vacío: nunca se amplía a todas las asignaciones
+    if filtro.get("facultad") is None and filtro.get("generacion") is None:
+        return [row["id_asignacion"] for row in leer_todas(query_asignaciones)]
+
+    # facultad y generación son columnas de grupo: primero los grupos, luego sus asignaciones
+    def query_grupos():
+        query = supabase.table("grupo").select("id_grupo").order("id_grupo")
+        if filtro.get("facultad") is not None:
+            query = query.eq("facultad", filtro["facultad"])
+        if filtro.get("generacion") is not None:
+            query = query.eq("generacion", filtro["generacion"])
+        return query
+
+    ids = []
+    for lote in en_lotes([row["id_grupo"] for row in leer_todas(query_grupos)]):
+        ids.extend(row["id_asignacion"] for row in leer_todas(lambda: query_asignaciones().in_("id_grupo", lote)))
+    return ids
+
+def _ventanas_existentes(numero_parcial: int, ids_asignacion: List[int]) -> dict:
+    """id_asignacion -> id_fecha_parcial de las ventanas que ya existen para ese parcial."""
+    def query():
+        return supabase.table("fechas_parciales") \
+            .select("id_fecha_parcial, id_asignacion") \
+            .eq("numero_parcial", numero_parcial) \
+            .order("id_fecha_parcial")
+
+    # Pocas asignaciones: se filtran por ID; muchas: una sola lectura de todo el parcial
+    if len(ids_asignacion) <= IMPORT_CHUNK_SIZE:
+        filas = leer_todas(lambda: query().in_("id_asignacion", ids_asignacion))
+    else:
+        filas = leer_todas(query)
+    solicitadas = {str(id_asignacion) for id_asignacion in ids_asignacion}
+    return {row["id_asignacion"]: row["id_fecha_parcial"] for row in filas if str(row["id_asignacion"]) in solicitadas}
+
+def aplicar_ventana_parcial(numero_parcial: int, fecha_inicio: datetime, fecha_fin: datetime, filtro: dict,
+                            activo: bool = True, actualizar_existentes: bool = True) -> dict:
+    """
+    Abre (o mueve) la ventana de un parcial en todas las asignaciones que cumplen `filtro`
+    ({} = todas; o cualquier combinación de facultad, generacion, id_curso, id_grupo).
+
+    En lugar de las dos llamadas por asignación de crear_fecha_parcial:
+    - una consulta (paginada) para las asignaciones y otra para las ventanas existentes, que
+      solo sirve para reportar cuántas se crearon y cuántas se actualizaron;
+    - un upsert por lote sobre (id_asignacion, numero_parcial). Sin `actualizar_existentes` las
+      ventanas que ya existen se ignoran en la base de datos. Una ventana creada al mismo tiempo
+      por otra petición no hace fallar el lote.
+
+    Returns:
+        dict: {'asignaciones', 'creadas', 'actualizadas', 'omitidas'}
+    """
+    ids_asignacion = _asignaciones_filtradas(filtro)
+    existentes = _ventanas_existentes(numero_parcial, ids_asignacion) if ids_asignacion else {}
+    previas = {str(id_asignacion) for id_asignacion in existentes}
+    pendientes = ids_asignacion if actualizar_existentes else \
+        [id_asignacion for id_asignacion in ids_asignacion if str(id_asignacion) not in previas]
+
+    escritas = set()
+    for lote in en_lotes(pendientes):
+        res = supabase.table("fechas_parciales").upsert(
+            [_registro_fecha_parcial(id_asignacion, numero_parcial, fecha_inicio, fecha_fin, activo) for id_asignacion in lote],
+            on_conflict=LLAVE_VENTANA, ignore_duplicates=not actualizar_existentes
+        ).execute()
+        escritas.update(str(row["id_asignacion"]) for row in res.data)
 
-    return res.data[0] if res.data else {"error": "No se pudo registrar la fecha"}
+    return {
+        "asignaciones": len(ids_asignacion),
+        "creadas": len(escritas - previas),
+        "actualizadas": len(escritas & previas),
+        "omitidas": len(ids_asignacion) - len(escritas)
+    }
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, NamedTuple, Optional
+from app.services.calificacion_service import calcular_final
+from app.utils.cambios import Cambio, suscribir
+from app.utils.nombres import nombre_completo
+from app.utils.singleflight import SingleFlight
+from app.utils.supabase_connection import supabaseConnection
+
+# Tiempo máximo (segundos) que se reutiliza el kardex de un alumno. Las calificaciones que se
+# suben en este proceso lo invalidan de inmediato; el TTL cubre los cambios hechos en otros workers.
+TTL_SEGUNDOS = float(os.environ.get("KARDEX_CACHE_TTL", 300))
+# Máximo de alumnos en caché por proceso; al llenarse se descarta el usado hace más tiempo
+CACHE_MAX = int(os.environ.get("KARDEX_CACHE_MAX", 5000))
+
+SELECT_KARDEX = (
+    "id_alumno, nombre, apellido_paterno, apellido_materno, id_grupo, "
+    "grupo(nombre_grupo, generacion, facultad), "
+    "calificaciones(parcial_1, parcial_2, parcial_3, calificacion_final, "
+    "asignacion(id_asignacion, curso(id_curso, nombre, codigo), maestro(id_usuario, nombre, apellido_paterno, apellido_materno)))"
+)
+
+class Kardex(NamedTuple):
+    datos: dict
+    etag: str
+    expira: float
+
+_cache: OrderedDict = OrderedDict()
+# Consultas en curso por alumno; una invalidación las quita para que su resultado no se guarde
+_consultas: dict = {}
+_lock = threading.Lock()
+# Recargas en curso: los fallos de caché concurrentes de un alumno esperan a la misma consulta
+_recargas = SingleFlight("kardex")
+
+def _promedio(valores: list) -> Optional[float]:
+    valores = [valor for valor in valores if valor is not None]
+    return round(sum(valores) / len(valores), 2) if valores else None
+
+def _armar_kardex(fila: dict) -> dict:
+    """Calcula finales y promedios a partir de la fila del alumno con sus calificaciones embebidas."""
+    materias = []
+    for calificacion in fila.get("calificaciones") or []:
+        asignacion = calificacion.get("asignacion") or {}
+        curso = asignacion.get("curso") or {}
+        maestro = asignacion.get("maestro") or {}
+        materias.append({
+            "id_asignacion": asignacion.get("id_asignacion"),
+            "id_curso": curso.get("id_curso"),
+            "curso": curso.get("nombre", "N/A"),
+            "codigo": curso.get("codigo"),
+            "id_maestro": maestro.get("id_usuario"),
+            "maestro": nombre_completo(maestro),
+            "parcial_1": calificacion.get("parcial_1"),
+            "parcial_2": calificacion.get("parcial_2"),
+            "parcial_3": calificacion.get("parcial_3"),
+            "calificacion_final": calcular_final(calificacion)
+        })
+    materias.sort(key=lambda materia: (materia["curso"] or "", str(materia["id_asignacion"])))
+
+    grupo = fila.get("grupo") or {}
+    return {
+        "alumno": {
+            "id_alumno": fila["id_alumno"],
+            "nombre_completo": nombre_completo(fila),
+            "id_grupo": fila.get("id_grupo"),
+            "grupo": grupo.get("nombre_grupo"),
+            "generacion": grupo.get("generacion"),
+            "facultad": grupo.get("facultad")
+        },
+        "materias": materias,
+        "promedios": {
+            "parcial_1": _promedio([materia["parcial_1"] for materia in materias]),
+            "parcial_2": _promedio([materia["parcial_2"] for materia in materias]),
+            "parcial_3": _promedio([materia["parcial_3"] for materia in materias]),
+            "general": _promedio([materia["calificacion_final"] for materia in materias])
+        },
+        "total_materias": len(materias),
+        "materias_con_final": sum(1 for materia in materias if materia["calificacion_final"] is not None)
+    }
+
+def _consultar(id_alumno: str) -> Optional[Kardex]:
+    """Consulta en una sola llamada al alumno con sus calificaciones, cursos y maestros."""
+    consulta = object()
+    with _lock:
+        _consultas[id_alumno] = consulta
+
+    try:
+        supabase = supabaseConnection.get_instance().get_client()
+        res = supabase.table("alumno").select(SELECT_KARDEX).eq("id_alumno", id_alumno).execute()
+        if not res.data:
+            return None
+
+        datos = _armar_kardex(res.data[0])
+        contenido = json.dumps(datos, sort_keys=True, default=str).encode("utf-8")
+        entrada = Kardex(
+            datos=datos,
+            etag=hashlib.sha1(contenido).hexdigest(),
+            expira=time.monotonic() + TTL_SEGUNDOS
+        )
+
+        # Si hubo una invalidación mientras se consultaba, no se guarda el resultado
+        with _lock:
+            if _consultas.get(id_alumno) is consulta:
+                _cache[id_alumno] = entrada
+                _cache.move_to_end(id_alumno)
+                while len(_cache) > CACHE_MAX:
+                    _cache.popitem(last=False)
+        return entrada
+    finally:
+        with _lock:
+            if _consultas.get(id_alumno) is consulta:
+                del _consultas[id_alumno]
+
+def _cargar(id_alumno: str) -> Optional[Kardex]:
+    return _recargas.hacer(id_alumno, lambda: _consultar(id_alumno), "alumno")
+
+def obtener_kardex(id_alumno: str) -> Optional[Kardex]:
+    """
+    Regresa el kardex del alumno (datos y su ETag), usando la caché si sigue vigente.
+    Regresa None si el alumno no existe.
+    """
+    with _lock:
+        entrada = _cache.get(id_alumno)
+        if entrada is not None:
+            _cache.move_to_end(id_alumno)
+    if entrada is None or entrada.expira <= time.monotonic():
+        entrada = _cargar(id_alumno)
+    return entrada
+
+def invalidar_kardex(ids_alumno: Iterable[str] = None) -> None:
+    """
+    Descarta el kardex en caché de los alumnos indicados, o de todos si no se indica ninguno.
+    Debe llamarse después de modificar calificaciones o los datos de alumnos.
+    """
+    with _lock:
+        if ids_alumno is None:
+            _consultas.clear()
+            _cache.clear()
+            # Las recargas en curso pueden traer datos de antes de la invalidación
+            _recargas.olvidar()
+            return
+        for id_alumno in ids_alumno:
+            id_alumno = str(id_alumno)
+            _consultas.pop(id_alumno, None)
+            _cache.pop(id_alumno, None)
+            _recargas.olvidar(id_alumno)
+
+def _al_cambiar_alumnos(cambios: List[Cambio]) -> None:
+    if any(cambio.llave is None for cambio in cambios):
+        invalidar_kardex()
+    else:
+        invalidar_kardex(cambio.llave for cambio in cambios)
+
+def _al_cambiar_calificaciones(cambios: List[Cambio]) -> None:
+    ids_alumno = [(cambio.fila or {}).get("id_alumno") for cambio in cambios]
+    # Sin la fila (p. ej. una eliminación detectada por polling) no se sabe de qué alumno era
+    invalidar_kardex(None if None in ids_alumno else ids_alumno)
+
+def _al_cambiar_catalogo(cambios: List[Cambio]) -> None:
+    invalidar_kardex()
+
+# Cambios hechos fuera de este proceso (otros workers, consola SQL, otros servicios)
+suscribir("alumno", _al_cambiar_alumnos)
+suscribir("calificaciones", _al_cambiar_calificaciones)
+for _tabla in ("grupo", "asignacion", "curso", "maestro"):
+    suscribir(_tabla, _al_cambiar_catalogo)
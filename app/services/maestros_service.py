@@ -0,0 +1,151 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Optional, Tuple
+import bcrypt
+from app.utils.importacion import en_lotes
+from app.utils.supabase_connection import supabaseConnection
+
+# Hilos para calcular hashes de contraseñas en paralelo. bcrypt libera el GIL mientras
+# calcula el hash, así que los hilos ocupan todos los núcleos sin crear procesos.
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", os.cpu_count() or 1))
+
+CAMPOS_REQUERIDOS = ['id_usuario', 'nombre', 'apellido_paterno', 'contrasena']
+ROLES_VALIDOS = ['admin', 'maestro']
+
+_pool: ThreadPoolExecutor = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+    return _pool
+
+def validar_datos_maestro(data: dict) -> Optional[str]:
+    """Regresa el mensaje de error de los datos de un maestro nuevo, o None si son válidos."""
+    missing_fields = [field for field in CAMPOS_REQUERIDOS if field not in data or not data[field]]
+    if missing_fields:
+        return f'Campos requeridos faltantes: {", ".join(missing_fields)}'
+
+    if len(str(data['id_usuario'])) != 6:
+        return 'El ID de usuario debe tener exactamente 6 caracteres'
+
+    if len(str(data['contrasena'])) < 6:
+        return 'La contraseña debe tener al menos 6 caracteres'
+
+    if data.get('role', 'maestro') not in ROLES_VALIDOS:
+        return f'Rol inválido. Debe ser uno de: {", ".join(ROLES_VALIDOS)}'
+
+    if data.get('fecha_nacimiento'):
+        try:
+            datetime.strptime(data['fecha_nacimiento'], '%Y-%m-%d')
+        except (TypeError, ValueError):
+            return 'Formato de fecha de nacimiento inválido. Use YYYY-MM-DD'
+    return None
+
+def hashear_contrasena(contrasena: str) -> str:
+    return bcrypt.hashpw(str(contrasena).encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+def hashear_contrasenas(contrasenas: List[str]) -> List[str]:
+    """Calcula los hashes en paralelo y los regresa en el mismo orden."""
+    if len(contrasenas) <= 1:
+        return [hashear_contrasena(c) for c in contrasenas]
+    return list(_get_pool().map(hashear_contrasena, contrasenas))
+
+def preparar_registros_maestro(data: dict, contrasena_hash: str) -> Tuple[dict, dict]:
+    """Construye las filas de `usuario` y `maestro` a partir de datos ya validados."""
+    usuario = {
+        'id_usuario': str(data['id_usuario']),
+        'contrasena': contrasena_hash,
+        'role': data.get('role', 'maestro'),
+        'fecha_creacion': datetime.now().isoformat()
+    }
+    maestro = {
+        'id_usuario': str(data['id_usuario']),
+        'nombre': data['nombre'],
+        'apellido_paterno': data['apellido_paterno'],
+        'apellido_materno': data.get('apellido_materno'),
+        'fecha_nacimiento': data.get('fecha_nacimiento'),
+        'especialidad': data.get('especialidad')
+    }
+    return usuario, maestro
+
+def _mensaje_error(id_usuario: str, error: Exception) -> str:
+    texto = str(error).lower()
+    if 'duplicate' in texto or 'unique' in texto:
+        return f'El ID de usuario {id_usuario} ya existe'
+    return str(error)
+
+def importar_maestros(filas: List[dict]) -> List[dict]:
+    """
+    Da de alta muchos maestros y regresa un resultado por fila, en el mismo orden:
+        {'fila': n, 'id_usuario': ..., 'estado': 'creado' | 'error'[, 'error': mensaje]}
+
+    1. Valida todas las filas (incluidos IDs repetidos dentro del mismo archivo).
+    2. Busca los IDs que ya existen con una consulta `in_` por lote.
+    3. Calcula los hashes de contraseña en paralelo.
+    4. Inserta por lotes con la función crear_maestros (una transacción por lote). Si un lote
+       falla, sus filas se reintentan una por una con crear_maestro para reportar cada error.
+    """
+    supabase = supabaseConnection.get_instance().get_client()
+    resultados: List[Optional[dict]] = [None] * len(filas)
+
+    def resultado(indice: int, estado: str, error: str = None) -> None:
+        id_usuario = filas[indice].get('id_usuario')
+        resultados[indice] = {'fila': indice + 1, 'id_usuario': id_usuario, 'estado': estado}
+        if error:
+            resultados[indice]['error'] = error
+
+    validas = []
+    primera_fila = {}
+    for indice, data in enumerate(filas):
+        error = validar_datos_maestro(data)
+        if error is None:
+            id_usuario = str(data['id_usuario'])
+            if id_usuario in primera_fila:
+                error = f'ID de usuario repetido en la importación (fila {primera_fila[id_usuario] + 1})'
+            else:
+                primera_fila[id_usuario] = indice
+        if error:
+            resultado(indice, 'error', error)
+        else:
+            validas.append(indice)
+
+    existentes = set()
+    for lote in en_lotes([str(filas[i]['id_usuario']) for i in validas]):
+        response = supabase.table('usuario').select('id_usuario').in_('id_usuario', lote).execute()
+        existentes.update(row['id_usuario'] for row in response.data)
+
+    pendientes = []
+    for indice in validas:
+        id_usuario = str(filas[indice]['id_usuario'])
+        if id_usuario in existentes:
+            resultado(indice, 'error', f'El ID de usuario {id_usuario} ya existe')
+        else:
+            pendientes.append(indice)
+
+    hashes = hashear_contrasenas([filas[i]['contrasena'] for i in pendientes])
+    registros = [(i, *preparar_registros_maestro(filas[i], h)) for i, h in zip(pendientes, hashes)]
+
+    for lote in en_lotes(registros):
+        try:
+            supabase.rpc('crear_maestros', {
+                'datos_usuarios': [usuario for _, usuario, _ in lote],
+                'datos_maestros': [maestro for _, _, maestro in lote]
+            }).execute()
+            for indice, _, _ in lote:
+                resultado(indice, 'creado')
+        except Exception:
+            # El lote se revirtió completo (p. ej. un ID creado en paralelo por otro administrador)
+            for indice, usuario, maestro in lote:
+                try:
+                    supabase.rpc('crear_maestro', {'datos_usuario': usuario, 'datos_maestro': maestro}).execute()
+                    resultado(indice, 'creado')
+                except Exception as e:
+                    resultado(indice, 'error', _mensaje_error(usuario['id_usuario'], e))
+
+    return resultados
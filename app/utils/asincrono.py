@@ -0,0 +1,32 @@
+import asyncio
+import threading
+from functools import wraps
+from flask import Flask
+
+_local = threading.local()
+
+def ejecutar_corrutina(corrutina):
+    """
+    Ejecuta una corrutina en el event loop persistente del hilo actual.
+
+    Se usa en modo WSGI: cada hilo del servidor conserva su loop, y con él su cliente
+    PostgREST asíncrono y sus conexiones abiertas, entre peticiones.
+    """
+    loop = getattr(_local, 'loop', None)
+    if loop is None or loop.is_closed():
+        loop = _local.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(corrutina)
+
+class FlaskAsync(Flask):
+    """
+    Flask que acepta vistas `async def` sin depender de asgiref.
+
+    - Bajo WSGI (run.py, gunicorn) la vista se ejecuta en el loop del hilo.
+    - Bajo ASGI (asgi.py) la vista se espera directamente en el loop del servidor, de modo
+      que un solo proceso atiende muchas peticiones en curso sin ocupar un hilo por cada una.
+    """
+    def async_to_sync(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return ejecutar_corrutina(func(*args, **kwargs))
+        return wrapper
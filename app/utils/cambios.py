@@ -0,0 +1,320 @@
+"""
+Feed de cambios de filas para invalidar cachés e índices.
+
+Los dueños de una caché se suscriben por tabla con `suscribir(tabla, callback)`. Los cambios
+llegan de una fuente intercambiable (CAMBIOS_FUENTE):
+
+- local: bus en el proceso; solo se entrega lo que se publica con `publicar()` (pruebas).
+- polling: pide cada CAMBIOS_POLL_INTERVAL segundos las filas con `actualizado_en` reciente y
+  las de `replica_eliminaciones` (ver supabase/migrations/20261019150000_feed_cambios.sql).
+- realtime: escucha los cambios de Postgres con el canal de Supabase Realtime.
+
+Así también se ven los cambios hechos fuera de este proceso: otros workers, la consola SQL u
+otros servicios. Los cambios se juntan durante CAMBIOS_VENTANA_MS (uno por fila, o uno para toda
+la tabla) y se entregan en un hilo propio, nunca en el de la petición.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional
+from realtime import AsyncRealtimeClient, RealtimeSubscribeStates
+from app.utils.concurrencia import es_proceso_principal
+from app.utils.metrics import Counter, registrar_metrica
+from app.utils.paginacion import leer_todas
+from app.utils.replica import (
+    ELIMINACIONES, REPLICA_TABLAS, formatear_marca, marca_con_solape, marca_mas_reciente
+)
+
+# local, polling o realtime
+CAMBIOS_FUENTE = os.environ.get('CAMBIOS_FUENTE', 'local')
+
+# Tiempo (ms) que se esperan más cambios antes de entregar un lote
+CAMBIOS_VENTANA = float(os.environ.get('CAMBIOS_VENTANA_MS', 250)) / 1000
+
+# Segundos entre revisiones de la fuente polling
+CAMBIOS_POLL_INTERVAL = float(os.environ.get('CAMBIOS_POLL_INTERVAL', 5))
+
+# Filas distintas de una tabla en un mismo lote a partir de las cuales se notifica la tabla completa
+CAMBIOS_MAX_POR_TABLA = int(os.environ.get('CAMBIOS_MAX_POR_TABLA', 1000))
+
+# Tablas con actualizado_en -> llave primaria
+LLAVES = {
+    **REPLICA_TABLAS,
+    'fechas_parciales': 'id_fecha_parcial',
+    'calificaciones': 'id_calif_alum_curso',
+}
+
+logger = logging.getLogger(__name__)
+
+class Cambio(NamedTuple):
+    """
+    Cambio de una fila. `llave` es None cuando pudo cambiar cualquier fila de la tabla
+    (p. ej. tras una reconexión); `fila` trae los valores si la fuente los conoce.
+    """
+    tabla: str
+    tipo: str
+    llave: Optional[str] = None
+    fila: Optional[dict] = None
+
+_suscriptores: Dict[str, List[Callable[[List[Cambio]], None]]] = defaultdict(list)
+# tabla -> llave -> último cambio
+_pendientes: Dict[str, Dict[Optional[str], Cambio]] = {}
+_condicion = threading.Condition()
+_despachador: threading.Thread = None
+_fuente: 'FuenteCambios' = None
+
+def suscribir(tabla: str, callback: Callable[[List[Cambio]], None]) -> None:
+    """
+    Registra `callback` para los cambios de `tabla`. Recibe la lista de cambios del lote,
+    como mucho uno por fila; si la lista trae un Cambio con llave None, cambió toda la tabla.
+    """
+    with _condicion:
+        if callback not in _suscriptores[tabla]:
+            _suscriptores[tabla].append(callback)
+
+def tablas_suscritas() -> List[str]:
+    with _condicion:
+        return [tabla for tabla, callbacks in _suscriptores.items() if callbacks]
+
+def publicar(cambio: Cambio) -> None:
+    """Encola un cambio para entregarlo a los suscriptores de su tabla."""
+    cambios_recibidos_total.inc((cambio.tabla,))
+    with _condicion:
+        if not _suscriptores.get(cambio.tabla):
+            return
+        por_llave = _pendientes.setdefault(cambio.tabla, {})
+        if None in por_llave:
+            # Ya se va a notificar la tabla completa
+            return
+        if cambio.llave is None or len(por_llave) >= CAMBIOS_MAX_POR_TABLA:
+            por_llave.clear()
+            por_llave[None] = Cambio(cambio.tabla, '*')
+        else:
+            por_llave[cambio.llave] = cambio
+        _iniciar_despachador()
+        _condicion.notify()
+
+def entregar_pendientes() -> None:
+    """Entrega en el hilo actual los cambios encolados. Lo usa el despachador; útil en pruebas."""
+    with _condicion:
+        lote = {tabla: list(por_llave.values()) for tabla, por_llave in _pendientes.items()}
+        _pendientes.clear()
+        callbacks = {tabla: list(_suscriptores.get(tabla, [])) for tabla in lote}
+
+    for tabla, cambios in lote.items():
+        cambios_entregados_total.inc((tabla,), len(cambios))
+        for callback in callbacks[tabla]:
+            try:
+                callback(cambios)
+            except Exception:
+                cambios_errores_total.inc((tabla,))
+                logger.warning('Falló un suscriptor de cambios de %s', tabla, exc_info=True)
+
+def _despachar() -> None:
+    while True:
+        with _condicion:
+            while not _pendientes:
+                _condicion.wait()
+        # Los cambios de una ráfaga (p. ej. una importación) se entregan juntos
+        time.sleep(CAMBIOS_VENTANA)
+        entregar_pendientes()
+
+def _iniciar_despachador() -> None:
+    # Se llama con _condicion tomada
+    global _despachador
+    if _despachador is None:
+        _despachador = threading.Thread(target=_despachar, name='cambios', daemon=True)
+        _despachador.start()
+
+# --- Fuentes ---
+
+class FuenteCambios:
+    """
+    Origen de los cambios: `iniciar()` arranca la escucha (en un hilo propio) y cada cambio
+    se entrega con `publicar()`. La fuente base es el bus local: no escucha nada externo.
+    """
+    nombre = 'local'
+
+    def iniciar(self) -> None:
+        pass
+
+class FuentePolling(FuenteCambios):
+    """
+    Revisa periódicamente `actualizado_en` de las tablas suscritas y `replica_eliminaciones`.
+    Cada ciclo vuelve a pedir REPLICA_SYNC_OVERLAP segundos hacia atrás y descarta lo ya
+    notificado, para no perder transacciones que confirman tarde.
+    """
+    nombre = 'polling'
+
+    def __init__(self, intervalo: float = CAMBIOS_POLL_INTERVAL):
+        self.intervalo = intervalo
+        self._marcas: Dict[str, str] = {}
+        # (tabla, llave) o id de eliminación -> marca ya notificada
+        self._vistos: Dict[object, str] = {}
+
+    def iniciar(self) -> None:
+        threading.Thread(target=self._ciclo, name='cambios-polling', daemon=True).start()
+
+    def _ciclo(self) -> None:
+        while True:
+            try:
+                self.revisar()
+            except Exception:
+                logger.warning('No se pudieron revisar los cambios', exc_info=True)
+            time.sleep(self.intervalo)
+
+    def _nuevas(self, filas: List[dict], columna: str, clave: Callable[[dict], object]) -> List[dict]:
+        nuevas = []
+        for fila in filas:
+            if self._vistos.get(clave(fila)) != fila[columna]:
+                self._vistos[clave(fila)] = fila[columna]
+                nuevas.append(fila)
+        return nuevas
+
+    def _ultima_marca(self, supabase, tabla: str, columna: str) -> Optional[str]:
+        # Con el reloj de la base, no el del servidor
+        ultima = supabase.table(tabla).select(columna).order(columna, desc=True).limit(1).execute().data
+        return marca_mas_reciente(None, ultima, columna)
+
+    def revisar(self) -> None:
+        """Publica los cambios desde la revisión anterior. La primera solo toma las marcas actuales."""
+        from app.utils.supabase_connection import supabaseConnection
+
+        supabase = supabaseConnection.get_instance().get_client()
+        ahora = formatear_marca(datetime.now(timezone.utc))
+        tablas = [tabla for tabla in tablas_suscritas() if tabla in LLAVES]
+
+        # Eliminaciones antes que filas, igual que en la réplica
+        marca = self._marcas.get(ELIMINACIONES)
+        if marca is None:
+            marca = self._ultima_marca(supabase, ELIMINACIONES, 'eliminado_en') or ahora
+        elif tablas:
+            eliminaciones = self._nuevas(
+                leer_todas(lambda: supabase.table(ELIMINACIONES)
+                           .select('id_eliminacion, tabla, llave, eliminado_en')
+                           .gte('eliminado_en', marca_con_solape(marca))
+                           .in_('tabla', tablas)
+                           .order('id_eliminacion')),
+                'eliminado_en', lambda fila: fila['id_eliminacion']
+            )
+            for fila in eliminaciones:
+                publicar(Cambio(fila['tabla'], 'DELETE', str(fila['llave'])))
+            marca = marca_mas_reciente(marca, eliminaciones, 'eliminado_en')
+        self._marcas[ELIMINACIONES] = marca
+
+        for tabla in tablas:
+            llave = LLAVES[tabla]
+            marca = self._marcas.get(tabla)
+            if marca is None:
+                self._marcas[tabla] = self._ultima_marca(supabase, tabla, 'actualizado_en') or ahora
+                continue
+            filas = self._nuevas(
+                leer_todas(lambda: supabase.table(tabla).select('*')
+                           .gte('actualizado_en', marca_con_solape(marca)).order(llave)),
+                'actualizado_en', lambda fila: (tabla, str(fila[llave]))
+            )
+            for fila in filas:
+                publicar(Cambio(tabla, 'UPDATE', str(fila[llave]), fila))
+            self._marcas[tabla] = marca_mas_reciente(marca, filas, 'actualizado_en')
+
+        self._olvidar_vistos()
+
+    def _olvidar_vistos(self) -> None:
+        # Lo anterior a la ventana de solape ya no se vuelve a pedir
+        limite = datetime.fromisoformat(marca_con_solape(min(self._marcas.values())))
+        self._vistos = {
+            clave: marca for clave, marca in self._vistos.items() if datetime.fromisoformat(marca) >= limite
+        }
+
+class FuenteRealtime(FuenteCambios):
+    """
+    Escucha los cambios de Postgres de las tablas suscritas con Supabase Realtime, en un
+    event loop propio. Al (re)suscribirse notifica las tablas completas, porque mientras no
+    había conexión pudieron perderse cambios.
+    """
+    nombre = 'realtime'
+
+    def iniciar(self) -> None:
+        threading.Thread(target=lambda: asyncio.run(self._escuchar()), name='cambios-realtime', daemon=True).start()
+
+    def _recibir(self, payload: dict) -> None:
+        datos = payload.get('data', payload)
+        tabla = datos.get('table')
+        tipo = (datos.get('type') or datos.get('eventType') or '*').upper()
+        fila = (datos.get('old_record') if tipo == 'DELETE' else datos.get('record')) or None
+        valor = (fila or {}).get(LLAVES.get(tabla))
+        publicar(Cambio(tabla, tipo, str(valor) if valor is not None else None, fila))
+
+    def _al_suscribir(self, tablas: List[str]) -> Callable:
+        def callback(estado, error=None):
+            if estado == RealtimeSubscribeStates.SUBSCRIBED:
+                for tabla in tablas:
+                    publicar(Cambio(tabla, '*'))
+            elif error is not None:
+                logger.warning('Error en la suscripción a Realtime: %s', error)
+        return callback
+
+    async def _escuchar(self) -> None:
+        from app.utils.supabase_connection import supabaseConnection
+
+        conexion = supabaseConnection.get_instance()
+        espera = 1
+        while True:
+            cliente = AsyncRealtimeClient(f'{conexion.url}/realtime/v1', conexion.key)
+            try:
+                tablas = tablas_suscritas()
+                canal = cliente.channel('cambios')
+                for tabla in tablas:
+                    canal.on_postgres_changes('*', callback=self._recibir, table=tabla, schema='public')
+                await canal.subscribe(self._al_suscribir(tablas))
+                espera = 1
+                # El cliente reconecta solo; si se rinde, se crea uno nuevo
+                while cliente.is_connected:
+                    await asyncio.sleep(30)
+            except Exception:
+                logger.warning('Se perdió la conexión a Realtime', exc_info=True)
+            finally:
+                try:
+                    await cliente.close()
+                except Exception:
+                    pass
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, 60)
+
+FUENTES = {fuente.nombre: fuente for fuente in (FuenteCambios, FuentePolling, FuenteRealtime)}
+
+def iniciar_cambios(fuente: FuenteCambios = None) -> FuenteCambios:
+    """
+    Arranca la fuente de cambios indicada o la de CAMBIOS_FUENTE, una sola vez por proceso.
+    Debe llamarse después de importar los módulos que se suscriben (Realtime solo escucha las
+    tablas suscritas al iniciar). En los procesos hijos (ver es_proceso_principal) no arranca.
+    """
+    global _fuente
+    if _fuente is not None or not es_proceso_principal():
+        return _fuente
+
+    if fuente is None:
+        from app.utils.supabase_connection import supabaseConnection
+
+        clase = FUENTES.get(CAMBIOS_FUENTE)
+        if clase is None:
+            raise ValueError(f'CAMBIOS_FUENTE inválida: {CAMBIOS_FUENTE}. Opciones: {", ".join(FUENTES)}')
+        if clase is FuenteRealtime and supabaseConnection.get_instance().fake is not None:
+            logger.warning('El backend en memoria no tiene Realtime; se usa el bus local')
+            clase = FuenteCambios
+        fuente = clase()
+
+    _fuente = fuente
+    fuente.iniciar()
+    return fuente
+
+cambios_recibidos_total = registrar_metrica(Counter(
+    'change_feed_events_total', 'Cambios recibidos de la fuente por tabla', ('table',)))
+cambios_entregados_total = registrar_metrica(Counter(
+    'change_feed_delivered_total', 'Cambios entregados a los suscriptores por tabla, ya agrupados', ('table',)))
+cambios_errores_total = registrar_metrica(Counter(
+    'change_feed_subscriber_errors_total', 'Suscriptores que fallaron al procesar un lote por tabla', ('table',)))
@@ -0,0 +1,99 @@
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+# Hilos compartidos por todas las peticiones para consultas en paralelo
+FANOUT_MAX_WORKERS = int(os.environ.get('FANOUT_MAX_WORKERS', 16))
+
+# Tiempo máximo (s) para que terminen todas las consultas de un mismo fan-out
+FANOUT_TIMEOUT = float(os.environ.get('FANOUT_TIMEOUT', 10))
+
+_pool: ThreadPoolExecutor = None
+_pool_lock = threading.Lock()
+_en_fanout = contextvars.ContextVar('en_fanout', default=False)
+
+class FanOutTimeout(TimeoutError):
+    """Las consultas en paralelo no terminaron antes del deadline compartido."""
+    pass
+
+def es_proceso_principal() -> bool:
+    """
+    False en los procesos que crea multiprocessing (p. ej. el pool de boletas). Con spawn, esos
+    procesos vuelven a importar el script principal y con él create_app(); los hilos de fondo
+    solo deben arrancar en el proceso que atiende peticiones.
+    """
+    # parent_process() aún es None mientras el hijo importa el script; el nombre ya está asignado
+    return multiprocessing.current_process().name == 'MainProcess'
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=FANOUT_MAX_WORKERS, thread_name_prefix='fanout')
+    return _pool
+
+def _ejecutar(tarea):
+    _en_fanout.set(True)
+    return tarea()
+
+def en_paralelo(*tareas, timeout: float = None) -> list:
+    """
+    Ejecuta funciones sin argumentos en paralelo y regresa sus resultados en el mismo orden.
+
+    Cada tarea corre con una copia del contexto de la petición, por lo que `g`, `session` y
+    la instrumentación de consultas funcionan igual que en el hilo de la vista.
+    Todas comparten un mismo deadline (`timeout`, por defecto FANOUT_TIMEOUT); si se excede
+    se lanza FanOutTimeout. Si alguna tarea falla se propaga la primera excepción.
+
+    Ejemplo:
+        maestro, asignaciones = en_paralelo(
+            lambda: supabase.table('maestro').select('*').eq('id_usuario', user_id).execute(),
+            lambda: supabase.table('asignacion').select('*').eq('id_maestro', user_id).execute()
+        )
+    """
+    # Con una sola tarea, o si ya estamos dentro de un fan-out (evita agotar el pool), se ejecuta en línea
+    if len(tareas) <= 1 or _en_fanout.get():
+        return [tarea() for tarea in tareas]
+
+    limite = FANOUT_TIMEOUT if timeout is None else timeout
+    pool = _get_pool()
+    futuros = [pool.submit(contextvars.copy_context().run, _ejecutar, tarea) for tarea in tareas]
+    terminados, pendientes = wait(futuros, timeout=limite, return_when=FIRST_EXCEPTION)
+
+    for futuro in futuros:
+        if futuro in terminados and futuro.exception() is not None:
+            for pendiente in pendientes:
+                pendiente.cancel()
+            raise futuro.exception()
+
+    if pendientes:
+        for pendiente in pendientes:
+            pendiente.cancel()
+        raise FanOutTimeout(
+            f'Timeout: {len(pendientes)} de {len(tareas)} consultas no terminaron en {limite} s'
+        )
+
+    return [futuro.result() for futuro in futuros]
+
+async def en_paralelo_async(*corrutinas, timeout: float = None) -> list:
+    """
+    Versión para vistas `async def`: espera las corrutinas en paralelo con el mismo deadline
+    compartido y regresa sus resultados en orden. Si una falla o se excede el deadline,
+    se cancelan las demás.
+    """
+    limite = FANOUT_TIMEOUT if timeout is None else timeout
+    tareas = [asyncio.ensure_future(corrutina) for corrutina in corrutinas]
+    try:
+        return list(await asyncio.wait_for(asyncio.gather(*tareas), limite))
+    except asyncio.TimeoutError:
+        raise FanOutTimeout(
+            f'Timeout: {sum(t.cancelled() or not t.done() for t in tareas)} de {len(tareas)} consultas no terminaron en {limite} s'
+        ) from None
+    finally:
+        for tarea in tareas:
+            if not tarea.done():
+                tarea.cancel()
@@ -0,0 +1,850 @@
+"""
+Backend en memoria que emula PostgREST y Storage de Supabase como transporte httpx.
+
+Se activa con SUPABASE_BACKEND=memory. El cliente de supabase-py se usa sin cambios,
+por lo que las rutas, la instrumentación y las pruebas ejercen el mismo código que en producción.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from io import BytesIO
+from typing import Callable, Dict, List, Optional
+import httpx
+from werkzeug.formparser import parse_form_data
+
+# Columnas por tabla con su valor por defecto, y llave primaria / serial / restricciones únicas
+ESQUEMA = {
+    'usuario': {
+        'columnas': {'id_usuario': None, 'contrasena': None, 'role': 'maestro', 'fecha_creacion': None},
+        'pk': ('id_usuario',)
+    },
+    'maestro': {
+        'columnas': {'id_usuario': None, 'nombre': None, 'apellido_paterno': None, 'apellido_materno': None,
+                     'fecha_nacimiento': None, 'especialidad': None, 'actualizado_en': None},
+        'pk': ('id_usuario',)
+    },
+    'grupo': {
+        'columnas': {'id_grupo': None, 'nombre_grupo': None, 'generacion': None, 'facultad': None,
+                     'actualizado_en': None},
+        'pk': ('id_grupo',)
+    },
+    'alumno': {
+        'columnas': {'id_alumno': None, 'id_grupo': None, 'nombre': None, 'apellido_paterno': None,
+                     'apellido_materno': None, 'fecha_nacimiento': None, 'sexo': None, 'actualizado_en': None},
+        'pk': ('id_alumno',)
+    },
+    'curso': {
+        'columnas': {'id_curso': None, 'nombre': None, 'codigo': None, 'descripcion': None,
+                     'actualizado_en': None},
+        'pk': ('id_curso',),
+        'unique': [('codigo',)]
+    },
+    'asignacion': {
+        'columnas': {'id_asignacion': None, 'id_curso': None, 'id_grupo': None, 'id_maestro': None,
+                     'planeacion_pdf_url': None, 'actualizado_en': None},
+        'pk': ('id_asignacion',),
+        'serial': 'id_asignacion'
+    },
+    'horario_asignacion': {
+        'columnas': {'id_horario': None, 'id_asignacion': None, 'dia_semana': None, 'hora_inicio': None,
+                     'hora_fin': None, 'actualizado_en': None},
+        'pk': ('id_horario',),
+        'serial': 'id_horario'
+    },
+    'disponibilidad': {
+        'columnas': {'id_disponibilidad': None, 'id_maestro': None, 'dia_semana': None, 'hora_inicio': None,
+                     'hora_fin': None, 'actualizado_en': None},
+        'pk': ('id_disponibilidad',),
+        'serial': 'id_disponibilidad'
+    },
+    'fechas_parciales': {
+        'columnas': {'id_fecha_parcial': None, 'id_asignacion': None, 'numero_parcial': None,
+                     'fecha_inicio': None, 'fecha_fin': None, 'activo': True, 'actualizado_en': None},
+        'pk': ('id_fecha_parcial',),
+        'serial': 'id_fecha_parcial',
+        'unique': [('id_asignacion', 'numero_parcial')]
+    },
+    'calificaciones': {
+        'columnas': {'id_calif_alum_curso': None, 'id_alumno': None, 'id_asignacion': None, 'parcial_1': None,
+                     'parcial_2': None, 'parcial_3': None, 'calificacion_final': None, 'actualizado_en': None},
+        'pk': ('id_calif_alum_curso',),
+        'serial': 'id_calif_alum_curso',
+        'unique': [('id_alumno', 'id_asignacion')]
+    },
+    # Filas borradas de las tablas con actualizado_en (ver 20261019140000_replica_local.sql)
+    'replica_eliminaciones': {
+        'columnas': {'id_eliminacion': None, 'tabla': None, 'llave': None, 'eliminado_en': None},
+        'pk': ('id_eliminacion',),
+        'serial': 'id_eliminacion'
+    },
+}
+
+# Llaves foráneas: (tabla, columna, tabla referenciada, columna referenciada)
+RELACIONES = [
+    ('maestro', 'id_usuario', 'usuario', 'id_usuario'),
+    ('alumno', 'id_grupo', 'grupo', 'id_grupo'),
+    ('asignacion', 'id_curso', 'curso', 'id_curso'),
+    ('asignacion', 'id_grupo', 'grupo', 'id_grupo'),
+    ('asignacion', 'id_maestro', 'maestro', 'id_usuario'),
+    ('horario_asignacion', 'id_asignacion', 'asignacion', 'id_asignacion'),
+    ('disponibilidad', 'id_maestro', 'maestro', 'id_usuario'),
+    ('fechas_parciales', 'id_asignacion', 'asignacion', 'id_asignacion'),
+    ('calificaciones', 'id_alumno', 'alumno', 'id_alumno'),
+    ('calificaciones', 'id_asignacion', 'asignacion', 'id_asignacion'),
+]
+
+PARAMS_RESERVADOS = {'select', 'order', 'limit', 'offset', 'on_conflict', 'columns'}
+OPERADORES = {'eq', 'neq', 'gt', 'gte', 'lt', 'lte', 'like', 'ilike', 'is', 'in'}
+_NUMERO = re.compile(r'^-?\d+(\.\d+)?$')
+
+class ErrorPostgrest(Exception):
+    """Error con el formato JSON de PostgREST."""
+    def __init__(self, status: int, code: str, message: str, details: str = None, hint: str = None):
+        super().__init__(message)
+        self.status = status
+        self.body = {'code': code, 'message': message, 'details': details, 'hint': hint}
+
+# --- Parsing de la sintaxis de PostgREST ---
+
+def _dividir(texto: str, separador: str = ',') -> List[str]:
+    """Divide por el separador ignorando los que están dentro de paréntesis o comillas."""
+    partes, actual, nivel, comillas = [], [], 0, False
+    for char in texto:
+        if char == '"':
+            comillas = not comillas
+        elif not comillas and char == '(':
+            nivel += 1
+        elif not comillas and char == ')':
+            nivel -= 1
+        if char == separador and nivel == 0 and not comillas:
+            partes.append(''.join(actual))
+            actual = []
+        else:
+            actual.append(char)
+    partes.append(''.join(actual))
+    return [p for p in partes if p != '']
+
+def _sin_comillas(valor: str) -> str:
+    if len(valor) >= 2 and valor[0] == '"' and valor[-1] == '"':
+        return valor[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+    return valor
+
+class _Nodo:
+    """Elemento de un `select`: '*', una columna o un recurso embebido."""
+    def __init__(self, tipo: str, nombre: str, alias: str = None, hint: str = None, hijos=None):
+        self.tipo = tipo
+        self.nombre = nombre
+        self.alias = alias or nombre
+        self.hint = hint
+        self.hijos = hijos or []
+
+def _parse_select(texto: str) -> List[_Nodo]:
+    nodos = []
+    for item in _dividir(texto or '*'):
+        item = item.strip()
+        if item == '*':
+            nodos.append(_Nodo('*', '*'))
+            continue
+
+        alias = None
+        if '(' in item:
+            cabeza, resto = item.split('(', 1)
+            hijos = resto[:-1]
+        else:
+            cabeza, hijos = item, None
+
+        if ':' in cabeza and '::' not in cabeza.split(':', 1)[0] + ':':
+            posible_alias, nombre = cabeza.split(':', 1)
+            if not nombre.startswith(':'):
+                alias, cabeza = posible_alias, nombre
+        cabeza = cabeza.split('::', 1)[0]
+
+        hint = None
+        if '!' in cabeza:
+            cabeza, hint = cabeza.split('!', 1)
+            hint = None if hint == 'inner' or hint == 'left' else hint.split('!', 1)[0]
+
+        if hijos is None:
+            nodos.append(_Nodo('col', cabeza, alias))
+        else:
+            nodos.append(_Nodo('rel', cabeza, alias, hint, _parse_select(hijos)))
+    return nodos
+
+def _parse_condicion(expresion: str):
+    """
+    Convierte 'col.op.valor', 'or(...)' o 'and(...)' en una tupla evaluable.
+    """
+    negado = False
+    if expresion.startswith('not.') and expresion[4:].split('(', 1)[0] in ('or', 'and'):
+        negado, expresion = True, expresion[4:]
+    for logico in ('or', 'and'):
+        if expresion.startswith(logico + '('):
+            hijos = [_parse_condicion(parte) for parte in _dividir(expresion[len(logico) + 1:-1])]
+            return (logico, negado, hijos)
+    columna, filtro = expresion.split('.', 1)
+    return ('col', columna) + _parse_filtro(filtro)
+
+def _parse_filtro(filtro: str):
+    """Convierte 'eq.5' o 'not.is.null' en (negado, operador, valor)."""
+    negado = False
+    if filtro.startswith('not.'):
+        negado, filtro = True, filtro[4:]
+    operador, _, valor = filtro.partition('.')
+    if operador not in OPERADORES:
+        raise ErrorPostgrest(400, 'PGRST100', f'Operador no soportado: {operador}')
+    if operador == 'in':
+        valor = [_sin_comillas(v) for v in _dividir(valor.strip()[1:-1])]
+    else:
+        valor = _sin_comillas(valor)
+    return (negado, operador, valor)
+
+def _coercionar(valor_fila, texto: str):
+    if isinstance(valor_fila, bool):
+        return texto.lower() == 'true'
+    if isinstance(valor_fila, (int, float)) and _NUMERO.match(texto):
+        return float(texto)
+    return texto
+
+def _patron(texto: str, ignorar_mayusculas: bool):
+    regex = ''.join(
+        '.*' if c in '*%' else '.' if c == '_' else re.escape(c)
+        for c in texto
+    )
+    return re.compile(regex, re.IGNORECASE | re.DOTALL if ignorar_mayusculas else re.DOTALL)
+
+def _cumple(operador: str, valor, criterio) -> bool:
+    if operador == 'is':
+        criterio = criterio.lower()
+        if criterio == 'null':
+            return valor is None
+        if criterio in ('true', 'false'):
+            return valor is (criterio == 'true')
+        return valor is None
+    if valor is None:
+        return False
+    if operador == 'in':
+        return any(_cumple('eq', valor, c) for c in criterio)
+    if operador in ('like', 'ilike'):
+        return bool(_patron(criterio, operador == 'ilike').fullmatch(str(valor)))
+
+    esperado = _coercionar(valor, criterio)
+    if isinstance(esperado, str) and not isinstance(valor, str):
+        valor = str(valor)
+    if operador == 'eq':
+        return valor == esperado
+    if operador == 'neq':
+        return valor != esperado
+    try:
+        if operador == 'gt':
+            return valor > esperado
+        if operador == 'gte':
+            return valor >= esperado
+        if operador == 'lt':
+            return valor < esperado
+        if operador == 'lte':
+            return valor <= esperado
+    except TypeError:
+        return str(valor) > str(esperado) if operador in ('gt', 'gte') else str(valor) < str(esperado)
+    return False
+
+def _evaluar(condicion, fila: dict) -> bool:
+    if condicion[0] in ('or', 'and'):
+        _, negado, hijos = condicion
+        resultado = any(_evaluar(h, fila) for h in hijos) if condicion[0] == 'or' else all(_evaluar(h, fila) for h in hijos)
+        return not resultado if negado else resultado
+    _, columna, negado, operador, criterio = condicion
+    resultado = _cumple(operador, fila.get(columna), criterio)
+    return not resultado if negado else resultado
+
+def _clave_indice(valor) -> str:
+    if isinstance(valor, bool):
+        return 'true' if valor else 'false'
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+def _ahora() -> str:
+    # Mismo formato que timestamptz en PostgREST, con microsegundos fijos para que compare como texto
+    return datetime.now(timezone.utc).isoformat(timespec='microseconds')
+
+def _clave_orden(valor):
+    # Ordena None al final, y números antes que texto para evitar comparar tipos distintos
+    if valor is None:
+        return (2, 0)
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return (0, valor)
+    return (1, str(valor))
+
+class FakeSupabase(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Transporte httpx que responde como PostgREST y Storage usando tablas en memoria.
+
+    Args:
+        latencia_ms: latencia base inyectada en cada llamada, para simular el viaje de red.
+        jitter_ms: variación aleatoria adicional (0..jitter_ms) por llamada.
+        latencia_por_fila_us: costo adicional por fila regresada, para simular transferencia.
+        directorio_storage: carpeta local donde se guardan los archivos de Storage.
+        disparadores: emula los triggers de supabase/migrations: actualizado_en = now() al
+            escribir y el registro de filas borradas en replica_eliminaciones.
+    """
+    def __init__(self, latencia_ms: float = 0, jitter_ms: float = 0, latencia_por_fila_us: float = 0,
+                 directorio_storage: str = None, disparadores: bool = True):
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.latencia_por_fila_us = latencia_por_fila_us
+        self.directorio_storage = directorio_storage or os.path.join(tempfile.gettempdir(), 'fake_supabase_storage')
+        self.disparadores = disparadores
+        self.total_llamadas = 0
+        self._tablas: Dict[str, dict] = {}
+        self._seriales: Dict[str, int] = {}
+        # tabla -> columna -> valor -> {pk: None}; se mantienen al escribir
+        self._indices: Dict[str, Dict[str, dict]] = {}
+        # Funciones de supabase/migrations ya disponibles, como en la base real
+        self._rpcs: Dict[str, Callable] = dict(FUNCIONES)
+        self._lock = threading.RLock()
+
+    @classmethod
+    def desde_entorno(cls) -> 'FakeSupabase':
+        """Crea el backend con FAKE_SUPABASE_LATENCY_MS, FAKE_SUPABASE_JITTER_MS, etc."""
+        return cls(
+            latencia_ms=float(os.environ.get('FAKE_SUPABASE_LATENCY_MS', 0)),
+            jitter_ms=float(os.environ.get('FAKE_SUPABASE_JITTER_MS', 0)),
+            latencia_por_fila_us=float(os.environ.get('FAKE_SUPABASE_ROW_LATENCY_US', 0)),
+            directorio_storage=os.environ.get('FAKE_SUPABASE_STORAGE_DIR')
+        )
+
+    # --- API para preparar datos en pruebas y benchmarks ---
+
+    def cargar(self, tabla: str, filas: List[dict]) -> None:
+        """Inserta filas directamente, sin validar llaves foráneas ni unicidad."""
+        with self._lock:
+            for fila in filas:
+                self._guardar(tabla, self._completar(tabla, fila))
+
+    def filas(self, tabla: str) -> List[dict]:
+        """Regresa una copia de las filas de una tabla."""
+        with self._lock:
+            return [dict(fila) for fila in self._tabla(tabla).values()]
+
+    def eliminar(self, tabla: str, fila: dict) -> None:
+        """Elimina la fila con la llave primaria de `fila` si existe, sin validar dependientes."""
+        with self._lock:
+            existente = self._tabla(tabla).get(self._pk(tabla, fila))
+            if existente is not None:
+                self._eliminar(tabla, existente)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._tablas.clear()
+            self._seriales.clear()
+            self._indices.clear()
+            self.total_llamadas = 0
+
+    def registrar_rpc(self, nombre: str, funcion: Callable) -> None:
+        """
+        Registra una función de base de datos para `supabase.rpc(nombre, params)`.
+        La función recibe (backend, params) y regresa el JSON de respuesta.
+        """
+        self._rpcs[nombre] = funcion
+
+    # --- Transporte httpx ---
+
+    def _esperar(self, filas: int) -> float:
+        segundos = (self.latencia_ms + random.uniform(0, self.jitter_ms)) / 1000
+        return segundos + filas * self.latencia_por_fila_us / 1_000_000
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        response, filas = self._responder(request)
+        espera = self._esperar(filas)
+        if espera > 0:
+            time.sleep(espera)
+        return response
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        response, filas = self._responder(request)
+        espera = self._esperar(filas)
+        if espera > 0:
+            await asyncio.sleep(espera)
+        return response
+
+    def _responder(self, request: httpx.Request):
+        path = request.url.path
+        try:
+            with self._lock:
+                self.total_llamadas += 1
+                if '/storage/v1/' in path:
+                    return self._storage(request, path.split('/storage/v1/', 1)[1]), 0
+                recurso = path.split('/rest/v1/', 1)[1] if '/rest/v1/' in path else path.strip('/')
+                if recurso.startswith('rpc/'):
+                    return self._rpc(request, recurso[4:])
+                return self._tabla_http(request, recurso)
+        except ErrorPostgrest as e:
+            return httpx.Response(e.status, json=e.body), 0
+
+    # --- Tablas ---
+
+    def _tabla(self, tabla: str) -> dict:
+        if tabla not in self._tablas:
+            if tabla not in ESQUEMA:
+                raise ErrorPostgrest(404, '42P01', f'relation "public.{tabla}" does not exist')
+            self._tablas[tabla] = {}
+        return self._tablas[tabla]
+
+    def _completar(self, tabla: str, fila: dict, columnas: Optional[List[str]] = None) -> dict:
+        esquema = ESQUEMA.get(tabla, {})
+        completa = dict(esquema.get('columnas', {}))
+        if columnas is not None:
+            completa.update({columna: None for columna in columnas})
+        completa.update(fila)
+        serial = esquema.get('serial')
+        if serial and completa.get(serial) is None:
+            self._seriales[tabla] = self._seriales.get(tabla, 0) + 1
+            completa[serial] = self._seriales[tabla]
+        elif serial and isinstance(completa[serial], int):
+            self._seriales[tabla] = max(self._seriales.get(tabla, 0), completa[serial])
+        return completa
+
+    def _pk(self, tabla: str, fila: dict) -> tuple:
+        return tuple(_clave_indice(fila.get(columna)) for columna in ESQUEMA[tabla]['pk'])
+
+    def _guardar(self, tabla: str, fila: dict) -> None:
+        """Inserta o reemplaza la fila con la misma llave primaria, actualizando los índices."""
+        filas = self._tabla(tabla)
+        if self.disparadores and 'actualizado_en' in ESQUEMA[tabla]['columnas']:
+            fila['actualizado_en'] = _ahora()
+        pk = self._pk(tabla, fila)
+        anterior = filas.get(pk)
+        if anterior is not None:
+            self._desindexar(tabla, pk, anterior)
+        filas[pk] = fila
+        for columna, indice in self._indices.get(tabla, {}).items():
+            valor = fila.get(columna)
+            if valor is not None:
+                indice.setdefault(_clave_indice(valor), {})[pk] = None
+
+    def _eliminar(self, tabla: str, fila: dict) -> None:
+        pk = self._pk(tabla, fila)
+        del self._tabla(tabla)[pk]
+        self._desindexar(tabla, pk, fila)
+        if self.disparadores and 'actualizado_en' in ESQUEMA[tabla]['columnas']:
+            self._guardar('replica_eliminaciones', self._completar('replica_eliminaciones', {
+                'tabla': tabla, 'llave': _clave_indice(fila[ESQUEMA[tabla]['pk'][0]]), 'eliminado_en': _ahora()
+            }))
+
+    def _desindexar(self, tabla: str, pk: tuple, fila: dict) -> None:
+        for columna, indice in self._indices.get(tabla, {}).items():
+            valor = fila.get(columna)
+            if valor is None:
+                continue
+            clave = _clave_indice(valor)
+            pks = indice.get(clave)
+            if pks is not None:
+                pks.pop(pk, None)
+                if not pks:
+                    del indice[clave]
+
+    def _indice(self, tabla: str, columna: str) -> dict:
+        """Índice hash de la columna; se construye la primera vez que se consulta."""
+        indices = self._indices.setdefault(tabla, {})
+        indice = indices.get(columna)
+        if indice is None:
+            indice = {}
+            for pk, fila in self._tabla(tabla).items():
+                valor = fila.get(columna)
+                if valor is not None:
+                    indice.setdefault(_clave_indice(valor), {})[pk] = None
+            indices[columna] = indice
+        return indice
+
+    def _buscar(self, tabla: str, columna: str, valor) -> List[dict]:
+        """Filas con columna == valor usando el índice hash."""
+        filas = self._tabla(tabla)
+        return [filas[pk] for pk in self._indice(tabla, columna).get(_clave_indice(valor), {})]
+
+    def _candidatas(self, tabla: str, condiciones: list) -> List[dict]:
+        """Reduce el recorrido usando el índice de un filtro `eq` o `in` si existe."""
+        for condicion in condiciones:
+            if condicion[0] == 'col' and not condicion[2] and condicion[3] in ('eq', 'in'):
+                valores = condicion[4] if condicion[3] == 'in' else [condicion[4]]
+                indice = self._indice(tabla, condicion[1])
+                filas = self._tabla(tabla)
+                pks = []
+                for valor in valores:
+                    claves = {valor}
+                    if _NUMERO.match(valor):
+                        claves.add(_clave_indice(float(valor)))
+                    for clave in claves:
+                        pks.extend(indice.get(clave, {}))
+                vistos = set()
+                return [filas[pk] for pk in pks if not (pk in vistos or vistos.add(pk))]
+        return list(self._tabla(tabla).values())
+
+    def _condiciones(self, params: httpx.QueryParams) -> list:
+        condiciones = []
+        for key, value in params.multi_items():
+            if key in PARAMS_RESERVADOS or '.' in key:
+                continue
+            if key in ('or', 'and'):
+                condiciones.append(_parse_condicion(f'{key}{value}'))
+            elif key in ('not.or', 'not.and'):
+                condiciones.append(_parse_condicion(f'not.{key[4:]}{value}'))
+            else:
+                condiciones.append(('col', key) + _parse_filtro(value))
+        return condiciones
+
+    def _filtrar(self, tabla: str, params: httpx.QueryParams) -> List[dict]:
+        condiciones = self._condiciones(params)
+        return [
+            fila for fila in self._candidatas(tabla, condiciones)
+            if all(_evaluar(condicion, fila) for condicion in condiciones)
+        ]
+
+    def _ordenar(self, filas: List[dict], orden: str) -> List[dict]:
+        for termino in reversed(_dividir(orden)):
+            partes = termino.split('.')
+            columna = partes[0]
+            descendente = 'desc' in partes[1:]
+            nulls_first = 'nullsfirst' in partes[1:] or ('nullslast' not in partes[1:] and descendente)
+            no_nulos = [f for f in filas if f.get(columna) is not None]
+            nulos = [f for f in filas if f.get(columna) is None]
+            no_nulos.sort(key=lambda f: _clave_orden(f.get(columna)), reverse=descendente)
+            filas = nulos + no_nulos if nulls_first else no_nulos + nulos
+        return filas
+
+    # --- Embebidos ---
+
+    def _relacion(self, tabla: str, nodo: _Nodo):
+        for origen, columna, destino, columna_destino in RELACIONES:
+            if nodo.hint and nodo.hint not in (columna, destino):
+                continue
+            if origen == tabla and destino == nodo.nombre:
+                return ('uno', columna, columna_destino)
+        for origen, columna, destino, columna_destino in RELACIONES:
+            if nodo.hint and nodo.hint not in (columna, origen):
+                continue
+            if origen == nodo.nombre and destino == tabla:
+                return ('muchos', columna_destino, columna)
+        raise ErrorPostgrest(
+            400, 'PGRST200',
+            f"Could not find a relationship between '{tabla}' and '{nodo.nombre}' in the schema cache"
+        )
+
+    def _proyectar(self, tabla: str, fila: dict, nodos: List[_Nodo]) -> dict:
+        resultado = {}
+        for nodo in nodos:
+            if nodo.tipo == '*':
+                resultado.update(fila)
+            elif nodo.tipo == 'col':
+                resultado[nodo.alias] = fila.get(nodo.nombre)
+            else:
+                tipo, columna_local, columna_remota = self._relacion(tabla, nodo)
+                valor = fila.get(columna_local)
+                relacionadas = self._buscar(nodo.nombre, columna_remota, valor) if valor is not None else []
+                if len(nodo.hijos) == 1 and nodo.hijos[0].tipo == 'col' and nodo.hijos[0].nombre == 'count':
+                    resultado[nodo.alias] = [{'count': len(relacionadas)}]
+                elif tipo == 'uno':
+                    resultado[nodo.alias] = self._proyectar(nodo.nombre, relacionadas[0], nodo.hijos) if relacionadas else None
+                else:
+                    resultado[nodo.alias] = [self._proyectar(nodo.nombre, r, nodo.hijos) for r in relacionadas]
+        return resultado
+
+    # --- Restricciones ---
+
+    def _restricciones_unicas(self, tabla: str) -> List[tuple]:
+        esquema = ESQUEMA[tabla]
+        return [esquema['pk']] + esquema.get('unique', [])
+
+    def _conflicto(self, tabla: str, fila: dict, columnas: tuple) -> Optional[dict]:
+        if any(fila.get(c) is None for c in columnas):
+            return None
+        for existente in self._buscar(tabla, columnas[0], fila[columnas[0]]):
+            if all(_clave_indice(existente.get(c)) == _clave_indice(fila.get(c)) for c in columnas):
+                return existente
+        return None
+
+    def _validar_referencias(self, tabla: str, fila: dict) -> None:
+        for origen, columna, destino, columna_destino in RELACIONES:
+            if origen == tabla and fila.get(columna) is not None:
+                if not self._buscar(destino, columna_destino, fila[columna]):
+                    raise ErrorPostgrest(
+                        409, '23503',
+                        f'insert or update on table "{tabla}" violates foreign key constraint "{tabla}_{columna}_fkey"',
+                        f'Key ({columna})=({fila[columna]}) is not present in table "{destino}".'
+                    )
+
+    def _validar_dependientes(self, tabla: str, fila: dict) -> None:
+        for origen, columna, destino, columna_destino in RELACIONES:
+            if destino == tabla and fila.get(columna_destino) is not None:
+                if self._buscar(origen, columna, fila[columna_destino]):
+                    raise ErrorPostgrest(
+                        409, '23503',
+                        f'update or delete on table "{tabla}" violates foreign key constraint '
+                        f'"{origen}_{columna}_fkey" on table "{origen}"',
+                        f'Key ({columna_destino})=({fila[columna_destino]}) is still referenced from table "{origen}".'
+                    )
+
+    def _validar_insercion(self, tabla: str, fila: dict) -> None:
+        """Restricciones únicas y llaves foráneas de una fila nueva."""
+        for restriccion in self._restricciones_unicas(tabla):
+            if self._conflicto(tabla, fila, restriccion) is not None:
+                raise ErrorPostgrest(
+                    409, '23505',
+                    f'duplicate key value violates unique constraint "{tabla}_{"_".join(restriccion)}_key"',
+                    f'Key ({", ".join(restriccion)}) already exists.'
+                )
+        self._validar_referencias(tabla, fila)
+
+    # --- Operaciones HTTP ---
+
+    def _respuesta_filas(self, request: httpx.Request, filas: List[dict], total: int, offset: int = 0):
+        headers = {}
+        prefer = request.headers.get('prefer', '')
+        conteo = f'{offset}-{offset + len(filas) - 1}' if filas else '*'
+        headers['Content-Range'] = f'{conteo}/{total}' if 'count=' in prefer else f'{conteo}/*'
+
+        if request.method == 'HEAD' or 'return=minimal' in prefer:
+            return httpx.Response(200 if request.method == 'HEAD' else 201, headers=headers), 0
+
+        if request.headers.get('accept') == 'application/vnd.pgrst.object+json':
+            if len(filas) != 1:
+                raise ErrorPostgrest(406, 'PGRST116', 'JSON object requested, multiple (or no) rows returned',
+                                     f'The result contains {len(filas)} rows')
+            return httpx.Response(200, json=filas[0], headers=headers), 1
+
+        status = 201 if request.method == 'POST' else 200
+        return httpx.Response(status, json=filas, headers=headers), len(filas)
+
+    def _tabla_http(self, request: httpx.Request, tabla: str):
+        params = request.url.params
+        self._tabla(tabla)
+        nodos = _parse_select(params.get('select', '*'))
+
+        if request.method in ('GET', 'HEAD'):
+            filas = self._filtrar(tabla, params)
+            total = len(filas)
+            if params.get('order'):
+                filas = self._ordenar(filas, params['order'])
+            offset = int(params.get('offset', 0))
+            limit = params.get('limit')
+            filas = filas[offset:offset + int(limit)] if limit is not None else filas[offset:]
+            resultado = [self._proyectar(tabla, fila, nodos) for fila in filas]
+            return self._respuesta_filas(request, resultado, total, offset)
+
+        if request.method == 'POST':
+            return self._insertar(request, tabla, nodos)
+
+        if request.method == 'PATCH':
+            cambios = json.loads(request.content or b'{}')
+            filas = self._filtrar(tabla, params)
+            actualizadas = []
+            for fila in filas:
+                nueva = {**fila, **cambios}
+                self._validar_referencias(tabla, nueva)
+                if self._pk(tabla, nueva) != self._pk(tabla, fila):
+                    self._eliminar(tabla, fila)
+                self._guardar(tabla, nueva)
+                actualizadas.append(nueva)
+            resultado = [self._proyectar(tabla, fila, nodos) for fila in actualizadas]
+            return self._respuesta_filas(request, resultado, len(resultado))
+
+        if request.method == 'DELETE':
+            filas = self._filtrar(tabla, params)
+            for fila in filas:
+                self._validar_dependientes(tabla, fila)
+            for fila in filas:
+                self._eliminar(tabla, fila)
+            resultado = [self._proyectar(tabla, fila, nodos) for fila in filas]
+            return self._respuesta_filas(request, resultado, len(resultado))
+
+        raise ErrorPostgrest(405, 'PGRST117', f'Unsupported HTTP method: {request.method}')
+
+    def _insertar(self, request: httpx.Request, tabla: str, nodos: List[_Nodo]):
+        params = request.url.params
+        prefer = request.headers.get('prefer', '')
+        payload = json.loads(request.content or b'[]')
+        filas = payload if isinstance(payload, list) else [payload]
+        columnas = [c.strip('"') for c in _dividir(params['columns'])] if params.get('columns') else None
+        on_conflict = tuple(c.strip() for c in params['on_conflict'].split(',')) if params.get('on_conflict') else None
+        merge = 'resolution=merge-duplicates' in prefer
+        ignorar = 'resolution=ignore-duplicates' in prefer
+
+        # Validar todo el lote antes de escribir para que la operación sea atómica
+        pendientes = []
+        vistos = set()
+        for fila in filas:
+            if columnas is not None:
+                fila = {c: fila.get(c) for c in columnas}
+            existente = None
+            if merge or ignorar:
+                restriccion = on_conflict or ESQUEMA[tabla]['pk']
+                existente = self._conflicto(tabla, fila, restriccion)
+            if existente is not None:
+                if ignorar:
+                    continue
+                nueva = {**existente, **fila}
+            else:
+                nueva = self._completar(tabla, fila)
+                for restriccion in self._restricciones_unicas(tabla):
+                    clave = (restriccion, tuple(_clave_indice(nueva.get(c)) for c in restriccion))
+                    if self._conflicto(tabla, nueva, restriccion) is not None or \
+                            (all(nueva.get(c) is not None for c in restriccion) and clave in vistos):
+                        raise ErrorPostgrest(
+                            409, '23505',
+                            f'duplicate key value violates unique constraint "{tabla}_{"_".join(restriccion)}_key"',
+                            f'Key ({", ".join(restriccion)}) already exists.'
+                        )
+                    vistos.add(clave)
+            self._validar_referencias(tabla, nueva)
+            pendientes.append((existente, nueva))
+
+        for existente, nueva in pendientes:
+            if existente is not None and self._pk(tabla, existente) != self._pk(tabla, nueva):
+                self._eliminar(tabla, existente)
+            self._guardar(tabla, nueva)
+
+        resultado = [self._proyectar(tabla, nueva, nodos) for _, nueva in pendientes]
+        return self._respuesta_filas(request, resultado, len(resultado))
+
+    def _rpc(self, request: httpx.Request, nombre: str):
+        funcion = self._rpcs.get(nombre)
+        if funcion is None:
+            raise ErrorPostgrest(404, 'PGRST202', f'Could not find the function public.{nombre} in the schema cache')
+        if request.method == 'GET':
+            params = dict(request.url.params)
+        else:
+            params = json.loads(request.content or b'{}')
+        data = funcion(self, params)
+        filas = len(data) if isinstance(data, list) else 1
+        return httpx.Response(200, json=data), filas
+
+    # --- Storage ---
+
+    def _ruta_archivo(self, bucket_y_ruta: str) -> str:
+        destino = os.path.normpath(os.path.join(self.directorio_storage, bucket_y_ruta))
+        if not destino.startswith(os.path.normpath(self.directorio_storage) + os.sep):
+            raise ErrorPostgrest(400, 'InvalidKey', 'Ruta de archivo inválida')
+        return destino
+
+    def _storage(self, request: httpx.Request, ruta: str) -> httpx.Response:
+        if not ruta.startswith('object/'):
+            return httpx.Response(404, json={'statusCode': '404', 'error': 'not_found', 'message': 'Not found'})
+        ruta = ruta[len('object/'):]
+        if ruta.startswith('public/'):
+            ruta = ruta[len('public/'):]
+
+        if request.method in ('POST', 'PUT'):
+            destino = self._ruta_archivo(ruta)
+            if request.method == 'POST' and os.path.exists(destino) and request.headers.get('x-upsert') != 'true':
+                return httpx.Response(400, json={'statusCode': '409', 'error': 'Duplicate',
+                                                 'message': 'The resource already exists'})
+            environ = {
+                'wsgi.input': BytesIO(request.content),
+                'CONTENT_LENGTH': str(len(request.content)),
+                'CONTENT_TYPE': request.headers.get('content-type', ''),
+                'REQUEST_METHOD': 'POST'
+            }
+            _, _, archivos = parse_form_data(environ)
+            archivo = archivos.get('file')
+            contenido = archivo.read() if archivo is not None else request.content
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            with open(destino, 'wb') as f:
+                f.write(contenido)
+            return httpx.Response(200, json={'Key': ruta})
+
+        if request.method == 'GET':
+            destino = self._ruta_archivo(ruta)
+            if not os.path.exists(destino):
+                return httpx.Response(400, json={'statusCode': '404', 'error': 'not_found',
+                                                 'message': 'Object not found'})
+            with open(destino, 'rb') as f:
+                return httpx.Response(200, content=f.read())
+
+        if request.method == 'DELETE':
+            eliminados = []
+            for prefijo in json.loads(request.content or b'{}').get('prefixes', []):
+                destino = self._ruta_archivo(f'{ruta}/{prefijo}')
+                if os.path.exists(destino):
+                    os.remove(destino)
+                    eliminados.append({'name': prefijo})
+            return httpx.Response(200, json=eliminados)
+
+        return httpx.Response(405, json={'statusCode': '405', 'error': 'method_not_allowed',
+                                         'message': 'Method not allowed'})
+
+
+# --- Funciones de base de datos (equivalentes a supabase/migrations) ---
+
+def _registro(tabla: str, datos: dict) -> dict:
+    """Como jsonb_populate_record: solo las columnas de la tabla."""
+    return {columna: datos.get(columna) for columna in ESQUEMA[tabla]['columnas']}
+
+def _sin_contrasena(usuario: dict) -> dict:
+    return {k: v for k, v in usuario.items() if k != 'contrasena'}
+
+def _crear_maestro(backend: FakeSupabase, params: dict) -> dict:
+    usuario = _registro('usuario', params.get('datos_usuario') or {})
+    maestro = _registro('maestro', {**(params.get('datos_maestro') or {}), 'id_usuario': usuario['id_usuario']})
+
+    backend._validar_insercion('usuario', usuario)
+    backend._guardar('usuario', usuario)
+    try:
+        backend._validar_insercion('maestro', maestro)
+    except ErrorPostgrest:
+        # La función es una sola transacción: si falla el maestro no queda el usuario
+        backend._eliminar('usuario', usuario)
+        raise
+    backend._guardar('maestro', maestro)
+    return {'usuario': _sin_contrasena(usuario), 'maestro': maestro}
+
+def _eliminar_maestro(backend: FakeSupabase, params: dict) -> dict:
+    maestro_id = params.get('maestro_id')
+    maestros = backend._buscar('maestro', 'id_usuario', maestro_id) if maestro_id is not None else []
+    if not maestros:
+        raise ErrorPostgrest(400, 'P0002', f'Maestro {maestro_id} no encontrado')
+    maestro = maestros[0]
+    usuarios = backend._buscar('usuario', 'id_usuario', maestro_id)
+
+    backend._validar_dependientes('maestro', maestro)
+    backend._eliminar('maestro', maestro)
+    usuario = None
+    if usuarios:
+        usuario = usuarios[0]
+        try:
+            backend._validar_dependientes('usuario', usuario)
+        except ErrorPostgrest:
+            backend._guardar('maestro', maestro)
+            raise
+        backend._eliminar('usuario', usuario)
+    return {'usuario': _sin_contrasena(usuario) if usuario else None, 'maestro': maestro}
+
+def _crear_maestros(backend: FakeSupabase, params: dict) -> list:
+    usuarios = [_registro('usuario', datos) for datos in params.get('datos_usuarios') or []]
+    maestros = [_registro('maestro', datos) for datos in params.get('datos_maestros') or []]
+
+    # Todo el lote es una transacción: ante cualquier error se deshacen las filas ya guardadas
+    guardadas = []
+    try:
+        for tabla, filas in (('usuario', usuarios), ('maestro', maestros)):
+            for fila in filas:
+                backend._validar_insercion(tabla, fila)
+                backend._guardar(tabla, fila)
+                guardadas.append((tabla, fila))
+    except ErrorPostgrest:
+        for tabla, fila in reversed(guardadas):
+            backend._eliminar(tabla, fila)
+        raise
+    return [maestro['id_usuario'] for maestro in maestros]
+
+FUNCIONES = {
+    'crear_maestro': _crear_maestro,
+    'crear_maestros': _crear_maestros,
+    'eliminar_maestro': _eliminar_maestro,
+}
@@ -0,0 +1,101 @@
+from typing import List
+from flask import current_app, jsonify, request
+
+try:
+    import msgpack
+except ImportError:
+    # Sin msgpack instalado solo se ofrece JSON
+    msgpack = None
+
+MIMETYPES_MSGPACK = ('application/msgpack', 'application/x-msgpack')
+
+def _tipo(valor) -> str:
+    if valor is None:
+        return 'null'
+    if isinstance(valor, bool):
+        return 'boolean'
+    if isinstance(valor, int):
+        return 'integer'
+    if isinstance(valor, float):
+        return 'number'
+    if isinstance(valor, str):
+        return 'string'
+    if isinstance(valor, dict):
+        return 'object'
+    if isinstance(valor, (list, tuple)):
+        return 'array'
+    return 'string'
+
+def _tipo_columna(valores: list) -> str:
+    tipos = {_tipo(valor) for valor in valores} - {'null'}
+    if not tipos:
+        return 'null'
+    if tipos == {'integer', 'number'}:
+        return 'number'
+    return tipos.pop() if len(tipos) == 1 else 'mixto'
+
+def columnar(filas: List[dict]) -> dict:
+    """
+    Convierte una lista de objetos en columnas: cada llave aparece una sola vez.
+        [{'id': 1, 'nombre': 'A'}, {'id': 2, 'nombre': 'B'}]
+        ->  {'filas': 2,
+             'esquema': [{'nombre': 'id', 'tipo': 'integer', 'nulos': False}, ...],
+             'columnas': {'id': [1, 2], 'nombre': ['A', 'B']}}
+    Las llaves ausentes en una fila quedan como None en su columna.
+    """
+    nombres = list(dict.fromkeys(llave for fila in filas for llave in fila))
+    columnas = {nombre: [fila.get(nombre) for fila in filas] for nombre in nombres}
+    return {
+        'filas': len(filas),
+        'esquema': [
+            {'nombre': nombre, 'tipo': _tipo_columna(valores), 'nulos': any(valor is None for valor in valores)}
+            for nombre, valores in columnas.items()
+        ],
+        'columnas': columnas
+    }
+
+def _reemplazar(cuerpo: dict, ruta: List[str]) -> dict:
+    """Copia de `cuerpo` con la lista en `ruta` convertida a columnas (no modifica el original)."""
+    if len(ruta) == 1:
+        return {**cuerpo, ruta[0]: columnar(cuerpo[ruta[0]])}
+    return {**cuerpo, ruta[0]: _reemplazar(cuerpo[ruta[0]], ruta[1:])}
+
+def formato_solicitado() -> str:
+    """
+    'msgpack' si el cliente lo prefiere en Accept (y msgpack está instalado),
+    'columnar' con ?format=columnar, o 'json' (el formato por defecto).
+    """
+    if msgpack is not None:
+        preferido = request.accept_mimetypes.best_match(('application/json',) + MIMETYPES_MSGPACK)
+        if preferido in MIMETYPES_MSGPACK:
+            return 'msgpack'
+    if request.args.get('format', '').lower() == 'columnar':
+        return 'columnar'
+    return 'json'
+
+def respuesta_lista(cuerpo: dict, clave: str = 'data'):
+    """
+    Respuesta de un endpoint de listado con negociación de contenido.
+
+    `cuerpo` es el JSON de siempre (p. ej. {'success': True, 'data': [...], 'total': n}) y `clave`
+    la ruta de la lista dentro de él, con puntos si está anidada (p. ej. 'data.calificaciones').
+    - Por defecto se regresa igual.
+    - Con ?format=columnar, la lista se reemplaza por columnar(...).
+    - Con Accept: application/msgpack, lo mismo pero codificado en MessagePack.
+    """
+    formato = formato_solicitado()
+    if formato == 'json':
+        response = jsonify(cuerpo)
+    else:
+        cuerpo = _reemplazar(cuerpo, clave.split('.'))
+        cuerpo['formato'] = 'columnar'
+        if formato == 'msgpack':
+            # default=str: fechas y otros tipos que MessagePack no soporta se envían como texto
+            response = current_app.response_class(
+                msgpack.packb(cuerpo, default=str), mimetype='application/msgpack'
+            )
+        else:
+            response = jsonify(cuerpo)
+    # La misma URL regresa contenido distinto según Accept
+    response.vary.add('Accept')
+    return response
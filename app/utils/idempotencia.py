@@ -0,0 +1,325 @@
+"""
+Soporte para el header `Idempotency-Key` en endpoints de escritura.
+
+Un cliente con conexión inestable puede reintentar un POST mandando la misma llave; el
+endpoint se ejecuta una sola vez y los reintentos reciben la respuesta guardada.
+
+- Los endpoints se marcan con @idempotente(); solo aplica a POST y solo si la petición trae el header.
+- La llave se aplica por usuario de la sesión; la huella (método, ruta y cuerpo) se guarda con ella.
+  Reusar la llave con otra petición regresa 422.
+- Si la misma llave ya está en curso, la petición espera a que termine (hasta
+  IDEMPOTENCY_WAIT_TIMEOUT segundos, después 409) en lugar de ejecutarla otra vez.
+- Solo se guardan las respuestas 2xx y los errores de validación (400, 422), que se repetirían
+  igual. Con cualquier otra (401/403 por sesión, 404/409 por el estado de los datos, 429, 5xx)
+  la llave se libera para que el reintento vuelva a ejecutarse.
+- El hook corre antes de la vista y de sus decoradores, así que un reintento no consulta Supabase.
+
+El almacén se elige con IDEMPOTENCY_BACKEND: 'sqlite' (por defecto, compartido por los workers
+del host) o 'memory' (solo un worker).
+"""
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+from flask import Response, g, jsonify, request, session
+from app.utils.metrics import Counter, registrar_metrica
+
+# Segundos que se conserva la respuesta de una llave
+IDEMPOTENCY_TTL = float(os.environ.get('IDEMPOTENCY_TTL', 24 * 3600))
+
+# Segundos que se respeta una llave en curso; después otra petición puede tomarla
+# (p. ej. si el worker que la tenía murió)
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', 300))
+
+# Segundos que un duplicado espera a la petición en curso antes de regresar 409
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.environ.get('IDEMPOTENCY_WAIT_TIMEOUT', 60))
+
+# Llaves que se conservan como máximo
+IDEMPOTENCY_MAX_KEYS = int(os.environ.get('IDEMPOTENCY_MAX_KEYS', 10000))
+
+LONGITUD_MAXIMA_LLAVE = 255
+
+# Errores que no dependen de la sesión ni del estado de los datos; además de los 2xx, son los
+# únicos que se guardan
+STATUS_4XX_GUARDADOS = frozenset((400, 422))
+
+# Headers de la respuesta que se repiten al reproducirla (las cookies no)
+HEADERS_GUARDADOS = ('Content-Type', 'Location')
+
+class RespuestaGuardada(NamedTuple):
+    status: int
+    headers: tuple
+    cuerpo: bytes
+
+# Resultados de reservar()
+NUEVA = 'nueva'
+EN_CURSO = 'en_curso'
+GUARDADA = 'guardada'
+DISTINTA = 'distinta'
+
+class MemoryIdempotenciaStore:
+    """
+    Almacén LRU en memoria del proceso. Solo es útil con un único worker.
+    """
+    def __init__(self, max_llaves: int = IDEMPOTENCY_MAX_KEYS):
+        self.max_llaves = max_llaves
+        # llave -> [huella, RespuestaGuardada o None si está en curso, expira]
+        self._llaves = OrderedDict()
+        self._condicion = threading.Condition()
+
+    def _vigente(self, llave: str, ahora: float):
+        entrada = self._llaves.get(llave)
+        if entrada is not None and entrada[2] <= ahora:
+            del self._llaves[llave]
+            return None
+        return entrada
+
+    def reservar(self, llave: str, huella: str) -> Tuple[str, Optional[RespuestaGuardada]]:
+        """Toma la llave si está libre. Regresa (resultado, respuesta guardada)."""
+        ahora = time.time()
+        with self._condicion:
+            entrada = self._vigente(llave, ahora)
+            if entrada is None:
+                self._llaves[llave] = [huella, None, ahora + IDEMPOTENCY_LOCK_TIMEOUT]
+                while len(self._llaves) > self.max_llaves:
+                    self._llaves.popitem(last=False)
+                return NUEVA, None
+            self._llaves.move_to_end(llave)
+            if entrada[0] != huella:
+                return DISTINTA, None
+            if entrada[1] is None:
+                return EN_CURSO, None
+            return GUARDADA, entrada[1]
+
+    def completar(self, llave: str, respuesta: RespuestaGuardada) -> None:
+        with self._condicion:
+            entrada = self._llaves.get(llave)
+            if entrada is not None:
+                entrada[1] = respuesta
+                entrada[2] = time.time() + IDEMPOTENCY_TTL
+            self._condicion.notify_all()
+
+    def liberar(self, llave: str) -> None:
+        with self._condicion:
+            entrada = self._llaves.get(llave)
+            if entrada is not None and entrada[1] is None:
+                del self._llaves[llave]
+            self._condicion.notify_all()
+
+    def esperar(self, llave: str, timeout: float) -> None:
+        """Espera a que la llave deje de estar en curso o pase `timeout`."""
+        with self._condicion:
+            entrada = self._vigente(llave, time.time())
+            if entrada is not None and entrada[1] is None:
+                self._condicion.wait(timeout)
+
+class SQLiteIdempotenciaStore:
+    """
+    Almacén en un archivo SQLite en modo WAL, compartido por todos los workers del host.
+    """
+    # Probabilidad de purgar llaves expiradas (y las que sobran) en cada respuesta guardada
+    PROBABILIDAD_PURGA = 0.01
+    # Segundos entre revisiones mientras se espera una llave en curso
+    INTERVALO_ESPERA = 0.05
+
+    def __init__(self, path: str, max_llaves: int = IDEMPOTENCY_MAX_KEYS):
+        self.path = path
+        self.max_llaves = max_llaves
+        self._local = threading.local()
+        self._conn().execute(
+            'CREATE TABLE IF NOT EXISTS idempotencia ('
+            'llave TEXT PRIMARY KEY, huella TEXT NOT NULL, status INTEGER, '
+            'headers TEXT, cuerpo BLOB, expira REAL NOT NULL)'
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def reservar(self, llave: str, huella: str) -> Tuple[str, Optional[RespuestaGuardada]]:
+        conn = self._conn()
+        ahora = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT huella, status, headers, cuerpo FROM idempotencia WHERE llave = ? AND expira > ?',
+                (llave, ahora)
+            ).fetchone()
+            if row is None:
+                conn.execute(
+                    'INSERT OR REPLACE INTO idempotencia (llave, huella, expira) VALUES (?, ?, ?)',
+                    (llave, huella, ahora + IDEMPOTENCY_LOCK_TIMEOUT)
+                )
+                resultado = NUEVA, None
+            elif row[0] != huella:
+                resultado = DISTINTA, None
+            elif row[1] is None:
+                resultado = EN_CURSO, None
+            else:
+                headers = tuple(tuple(header) for header in json.loads(row[2]))
+                resultado = GUARDADA, RespuestaGuardada(row[1], headers, row[3])
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return resultado
+
+    def completar(self, llave: str, respuesta: RespuestaGuardada) -> None:
+        conn = self._conn()
+        ahora = time.time()
+        conn.execute(
+            'UPDATE idempotencia SET status = ?, headers = ?, cuerpo = ?, expira = ? WHERE llave = ?',
+            (respuesta.status, json.dumps(respuesta.headers), respuesta.cuerpo, ahora + IDEMPOTENCY_TTL, llave)
+        )
+        if random.random() < self.PROBABILIDAD_PURGA:
+            conn.execute('DELETE FROM idempotencia WHERE expira <= ?', (ahora,))
+            conn.execute(
+                'DELETE FROM idempotencia WHERE llave IN ('
+                'SELECT llave FROM idempotencia ORDER BY expira DESC LIMIT -1 OFFSET ?)',
+                (self.max_llaves,)
+            )
+
+    def liberar(self, llave: str) -> None:
+        self._conn().execute('DELETE FROM idempotencia WHERE llave = ? AND status IS NULL', (llave,))
+
+    def esperar(self, llave: str, timeout: float) -> None:
+        limite = time.monotonic() + timeout
+        conn = self._conn()
+        while time.monotonic() < limite:
+            row = conn.execute(
+                'SELECT status FROM idempotencia WHERE llave = ? AND expira > ?', (llave, time.time())
+            ).fetchone()
+            if row is None or row[0] is not None:
+                return
+            time.sleep(min(self.INTERVALO_ESPERA, max(limite - time.monotonic(), 0)))
+
+def idempotente():
+    """
+    Decorador para que un endpoint acepte el header `Idempotency-Key` en POST.
+    Debe colocarse debajo de `@route`.
+    """
+    def decorator(f):
+        f._idempotente = True
+        return f
+    return decorator
+
+def _huella() -> str:
+    """Hash del método, la ruta y el cuerpo; los multipart se comparan por campos y archivos."""
+    digest = hashlib.sha256(f'{request.method} {request.full_path}'.encode('utf-8'))
+    if request.mimetype.startswith('multipart/'):
+        # El boundary cambia en cada reintento del navegador; se comparan los valores
+        for nombre, valor in sorted(request.form.items(multi=True)):
+            digest.update(f'\0{nombre}={valor}'.encode('utf-8'))
+        for nombre, archivo in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+            digest.update(f'\0{nombre}:{archivo.filename}:'.encode('utf-8'))
+            for bloque in iter(lambda: archivo.stream.read(65536), b''):
+                digest.update(bloque)
+            archivo.stream.seek(0)
+    else:
+        digest.update(b'\0')
+        digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+def _reproducir(respuesta: RespuestaGuardada) -> Response:
+    response = Response(respuesta.cuerpo, status=respuesta.status, headers=list(respuesta.headers))
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+_store = None
+
+def configurar_idempotencia(app) -> None:
+    """
+    Configura el almacén según IDEMPOTENCY_BACKEND ('sqlite' o 'memory') y registra los hooks
+    que atienden @idempotente.
+    """
+    global _store
+    backend = os.environ.get('IDEMPOTENCY_BACKEND', 'sqlite').lower()
+    if backend == 'memory':
+        _store = MemoryIdempotenciaStore()
+    elif backend == 'sqlite':
+        path = os.environ.get('IDEMPOTENCY_SQLITE_PATH')
+        if not path:
+            os.makedirs(app.instance_path, exist_ok=True)
+            path = os.path.join(app.instance_path, 'idempotency.db')
+        _store = SQLiteIdempotenciaStore(path)
+    else:
+        raise ValueError(f'IDEMPOTENCY_BACKEND inválido: {backend}')
+
+    @app.before_request
+    def _verificar_llave():
+        view = app.view_functions.get(request.endpoint)
+        if request.method != 'POST' or not getattr(view, '_idempotente', False):
+            return None
+        llave = request.headers.get('Idempotency-Key')
+        if llave is None:
+            return None
+        if not llave or len(llave) > LONGITUD_MAXIMA_LLAVE:
+            return jsonify({
+                'success': False,
+                'error': f'Idempotency-Key debe tener entre 1 y {LONGITUD_MAXIMA_LLAVE} caracteres'
+            }), 400
+
+        ruta = request.url_rule.rule
+        llave = f"{session.get('role', '')}:{session.get('user_id', '')}:{llave}"
+        huella = _huella()
+        limite = time.monotonic() + IDEMPOTENCY_WAIT_TIMEOUT
+        espero = False
+        while True:
+            resultado, respuesta = _store.reservar(llave, huella)
+            if resultado == NUEVA:
+                g.llave_idempotencia = llave
+                idempotency_requests_total.inc((ruta, 'executed'))
+                return None
+            if resultado == GUARDADA:
+                idempotency_requests_total.inc((ruta, 'waited' if espero else 'replayed'))
+                return _reproducir(respuesta)
+            if resultado == DISTINTA:
+                idempotency_requests_total.inc((ruta, 'mismatch'))
+                return jsonify({
+                    'success': False,
+                    'error': 'La Idempotency-Key ya se usó con una petición distinta'
+                }), 422
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                idempotency_requests_total.inc((ruta, 'in_progress'))
+                return jsonify({
+                    'success': False,
+                    'error': 'Una petición con la misma Idempotency-Key sigue en curso'
+                }), 409
+            espero = True
+            _store.esperar(llave, restante)
+
+    @app.after_request
+    def _guardar_respuesta(response):
+        llave = g.pop('llave_idempotencia', None)
+        if llave is None:
+            return response
+        guardable = 200 <= response.status_code < 300 or response.status_code in STATUS_4XX_GUARDADOS
+        if not guardable or response.is_streamed:
+            _store.liberar(llave)
+            return response
+        headers = tuple((nombre, response.headers[nombre]) for nombre in HEADERS_GUARDADOS
+                        if nombre in response.headers)
+        _store.completar(llave, RespuestaGuardada(response.status_code, headers, response.get_data()))
+        return response
+
+    @app.teardown_request
+    def _liberar_llave(error=None):
+        # La vista falló sin llegar a after_request
+        llave = g.pop('llave_idempotencia', None)
+        if llave is not None:
+            _store.liberar(llave)
+
+idempotency_requests_total = registrar_metrica(Counter(
+    'idempotency_requests_total', 'Peticiones con Idempotency-Key por ruta y resultado '
+    '(executed, replayed, waited, mismatch, in_progress)', ('route', 'result')))
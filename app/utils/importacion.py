@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+import os
+from typing import Iterator, List, Optional, Tuple
+from flask import request
+
+# Máximo de filas aceptadas en una sola importación
+IMPORT_MAX_ROWS = int(os.environ.get('IMPORT_MAX_ROWS', 5000))
+
+# Máximo de filas en una importación por streaming (CSV / NDJSON)
+IMPORT_MAX_STREAM_ROWS = int(os.environ.get('IMPORT_MAX_STREAM_ROWS', 200000))
+
+# Filas por inserción en lote
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 500))
+
+class ErrorImportacion(ValueError):
+    """El archivo o el cuerpo de la importación no se puede leer."""
+    pass
+
+def _limpiar_fila_csv(fila: dict) -> dict:
+    # Celdas vacías como None, igual que un campo ausente en JSON
+    return {
+        (clave or '').strip(): (valor.strip() or None) if isinstance(valor, str) else valor
+        for clave, valor in fila.items() if clave
+    }
+
+def _leer_csv(texto: str) -> List[dict]:
+    lector = csv.DictReader(io.StringIO(texto))
+    if not lector.fieldnames:
+        raise ErrorImportacion('El CSV no tiene encabezados')
+    return [_limpiar_fila_csv(fila) for fila in lector]
+
+def leer_filas(clave: str) -> List[dict]:
+    """
+    Lee las filas a importar de la petición actual. Acepta:
+    - JSON: un arreglo de objetos, o un objeto con el arreglo en `clave` (p. ej. {"maestros": [...]}).
+    - Un archivo CSV en el campo `file` (multipart/form-data).
+    - Un cuerpo `text/csv`.
+
+    Lanza ErrorImportacion si el formato no es válido o excede IMPORT_MAX_ROWS.
+    """
+    archivo = request.files.get('file')
+    if archivo is not None:
+        filas = _leer_csv(archivo.read().decode('utf-8-sig'))
+    elif request.mimetype == 'text/csv':
+        filas = _leer_csv(request.get_data().decode('utf-8-sig'))
+    else:
+        datos = request.get_json(silent=True)
+        if isinstance(datos, dict):
+            datos = datos.get(clave)
+        if not isinstance(datos, list):
+            raise ErrorImportacion(
+                f'Se esperaba un arreglo JSON, un objeto con "{clave}" o un archivo CSV en el campo "file"'
+            )
+        if not all(isinstance(fila, dict) for fila in datos):
+            raise ErrorImportacion('Cada elemento del arreglo debe ser un objeto')
+        filas = datos
+
+    if not filas:
+        raise ErrorImportacion('No se proporcionaron filas para importar')
+    if len(filas) > IMPORT_MAX_ROWS:
+        raise ErrorImportacion(f'Máximo {IMPORT_MAX_ROWS} filas por importación; se recibieron {len(filas)}')
+    return filas
+
+def _formato_stream(nombre_archivo: Optional[str]) -> str:
+    if nombre_archivo:
+        return 'ndjson' if nombre_archivo.lower().endswith(('.ndjson', '.jsonl')) else 'csv'
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl', 'application/ndjson'):
+        return 'ndjson'
+    if request.mimetype == 'text/csv':
+        return 'csv'
+    raise ErrorImportacion('Se esperaba un cuerpo text/csv o application/x-ndjson, o un archivo en el campo "file"')
+
+def _filas_ndjson(texto) -> Iterator[Tuple[Optional[dict], Optional[str]]]:
+    for linea in texto:
+        if not linea.strip():
+            continue
+        try:
+            fila = json.loads(linea)
+        except ValueError:
+            yield None, 'Línea con JSON inválido'
+            continue
+        yield (fila, None) if isinstance(fila, dict) else (None, 'Cada línea debe ser un objeto JSON')
+
+def _numerar(filas) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    for numero, (fila, error) in enumerate(filas, start=1):
+        if numero > IMPORT_MAX_STREAM_ROWS:
+            raise ErrorImportacion(f'Máximo {IMPORT_MAX_STREAM_ROWS} filas por importación')
+        yield numero, fila, error
+
+def iterar_filas() -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Lee las filas de la petición actual una por una, sin cargar el cuerpo completo en memoria.
+    Acepta CSV o NDJSON (un objeto JSON por línea) en el cuerpo o en un archivo en el campo `file`.
+
+    Regresa un iterador de (numero_fila, fila, error): si una línea no se puede leer, `fila` es None
+    y `error` trae el motivo, de modo que el resto del archivo se sigue procesando.
+    Lanza ErrorImportacion de inmediato si el formato no es soportado, y durante la iteración
+    si se excede IMPORT_MAX_STREAM_ROWS.
+    """
+    archivo = request.files.get('file')
+    formato = _formato_stream(archivo.filename if archivo is not None else None)
+    stream = archivo.stream if archivo is not None else request.stream
+    texto = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='' if formato == 'csv' else None)
+
+    if formato == 'ndjson':
+        return _numerar(_filas_ndjson(texto))
+
+    lector = csv.DictReader(texto)
+    if not lector.fieldnames:
+        raise ErrorImportacion('El CSV no tiene encabezados')
+    return _numerar((_limpiar_fila_csv(fila), None) for fila in lector)
+
+def en_lotes(elementos: list, tamano: int = None) -> Iterator[list]:
+    """Divide una lista en lotes de a lo más `tamano` elementos (por defecto IMPORT_CHUNK_SIZE)."""
+    tamano = tamano or IMPORT_CHUNK_SIZE
+    for inicio in range(0, len(elementos), tamano):
+        yield elementos[inicio:inicio + tamano]
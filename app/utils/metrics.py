@@ -0,0 +1,171 @@
+import bisect
+import threading
+import time
+from flask import g, has_request_context, request
+from app.utils.supabase_transport import ConsultaUpstream, registrar_listener
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _formatear_labels(nombres: tuple, valores: tuple, extra: str = '') -> str:
+    partes = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return '{' + ','.join(partes) + '}' if partes else ''
+
+def _formatear_valor(valor: float) -> str:
+    return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+class Counter:
+    """Contador monotónico con labels, en formato Prometheus."""
+    tipo = 'counter'
+
+    def __init__(self, nombre: str, ayuda: str, labels: tuple = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.labels = labels
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, valores: tuple = (), cantidad: float = 1) -> None:
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def valores(self) -> dict:
+        """Copia de {labels: valor}."""
+        with self._lock:
+            return dict(self._valores)
+
+    def render(self) -> list:
+        with self._lock:
+            items = list(self._valores.items())
+        return [f'{self.nombre}{_formatear_labels(self.labels, valores)} {_formatear_valor(valor)}'
+                for valores, valor in items]
+
+class Gauge(Counter):
+    """Valor instantáneo con labels."""
+    tipo = 'gauge'
+
+    def set(self, valores: tuple = (), valor: float = 0) -> None:
+        with self._lock:
+            self._valores[valores] = valor
+
+class GaugeCalculado(Gauge):
+    """Gauge cuyos valores se calculan al exponer las métricas; `funcion` regresa {labels: valor}."""
+
+    def __init__(self, nombre: str, ayuda: str, labels: tuple, funcion):
+        super().__init__(nombre, ayuda, labels)
+        self._funcion = funcion
+
+    def render(self) -> list:
+        valores = self._funcion()
+        with self._lock:
+            self._valores = dict(valores)
+        return super().render()
+
+class Histogram:
+    """Histograma con buckets fijos, en formato Prometheus."""
+    tipo = 'histogram'
+
+    def __init__(self, nombre: str, ayuda: str, labels: tuple = (), buckets: tuple = BUCKETS_LATENCIA):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, valores: tuple, valor: float) -> None:
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                # [conteos por bucket (+Inf al final), suma, total]
+                serie = self._series[valores] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            series = [(valores, list(serie[0]), serie[1], serie[2]) for valores, serie in self._series.items()]
+
+        lineas = []
+        for valores, conteos, suma, total in series:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, conteos):
+                acumulado += conteo
+                le = _formatear_labels(self.labels, valores, f'le="{_formatear_valor(limite)}"')
+                lineas.append(f'{self.nombre}_bucket{le} {acumulado}')
+            le = _formatear_labels(self.labels, valores, 'le="+Inf"')
+            lineas.append(f'{self.nombre}_bucket{le} {total}')
+            lineas.append(f'{self.nombre}_sum{_formatear_labels(self.labels, valores)} {_formatear_valor(suma)}')
+            lineas.append(f'{self.nombre}_count{_formatear_labels(self.labels, valores)} {total}')
+        return lineas
+
+_registro = []
+
+def registrar_metrica(metrica):
+    """Agrega una métrica al registro que se expone en /metrics."""
+    _registro.append(metrica)
+    return metrica
+
+def render_metricas() -> str:
+    """Genera el texto de todas las métricas en formato de exposición de Prometheus."""
+    lineas = []
+    for metrica in _registro:
+        lineas.append(f'# HELP {metrica.nombre} {metrica.ayuda}')
+        lineas.append(f'# TYPE {metrica.nombre} {metrica.tipo}')
+        lineas.extend(metrica.render())
+    return '\n'.join(lineas) + '\n'
+
+# --- Métricas de la aplicación ---
+http_requests_total = registrar_metrica(Counter(
+    'http_requests_total', 'Peticiones HTTP atendidas', ('route', 'method', 'status')))
+http_request_duration = registrar_metrica(Histogram(
+    'http_request_duration_seconds', 'Latencia de las peticiones HTTP por ruta', ('route', 'method')))
+http_request_upstream_calls = registrar_metrica(Histogram(
+    'http_request_upstream_calls', 'Llamadas a Supabase por petición HTTP', ('route',), BUCKETS_CONSULTAS))
+upstream_request_duration = registrar_metrica(Histogram(
+    'upstream_request_duration_seconds', 'Latencia de las llamadas a PostgREST por tabla', ('table', 'method')))
+upstream_errors_total = registrar_metrica(Counter(
+    'upstream_errors_total', 'Llamadas a PostgREST que fallaron o regresaron error', ('table', 'method')))
+
+def _registrar_consulta(consulta: ConsultaUpstream) -> None:
+    upstream_request_duration.observe((consulta.tabla, consulta.metodo), consulta.duracion)
+    if consulta.error:
+        upstream_errors_total.inc((consulta.tabla, consulta.metodo))
+    if has_request_context():
+        consultas = g.get('consultas_upstream')
+        if consultas is not None:
+            consultas.append(consulta)
+
+def _ruta_actual() -> str:
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+def instrumentar_app(app) -> None:
+    """
+    Registra los hooks que miden latencia por ruta y llamadas a Supabase por petición.
+    """
+    registrar_listener(_registrar_consulta)
+
+    @app.before_request
+    def _iniciar_medicion():
+        g.inicio_peticion = time.perf_counter()
+        g.consultas_upstream = []
+
+    @app.after_request
+    def _finalizar_medicion(response):
+        inicio = g.get('inicio_peticion')
+        if inicio is None:
+            return response
+
+        ruta = _ruta_actual()
+        duracion = time.perf_counter() - inicio
+        http_requests_total.inc((ruta, request.method, response.status_code))
+        http_request_duration.observe((ruta, request.method), duracion)
+        http_request_upstream_calls.observe((ruta,), len(g.consultas_upstream))
+        return response
@@ -0,0 +1,7 @@
+from typing import Optional
+
+def nombre_completo(persona: Optional[dict]) -> str:
+    """Nombre y apellidos de un alumno o maestro, omitiendo los vacíos; "N/A" si no hay ninguno."""
+    persona = persona or {}
+    partes = (persona.get("nombre"), persona.get("apellido_paterno"), persona.get("apellido_materno"))
+    return " ".join(parte for parte in partes if parte) or "N/A"
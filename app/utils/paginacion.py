@@ -0,0 +1,41 @@
+import os
+from typing import Callable, Iterator, List
+
+# Filas por página al leer conjuntos grandes (PostgREST limita las filas por respuesta)
+TAMANO_PAGINA = int(os.environ.get("SUPABASE_PAGE_SIZE", 1000))
+
+def iterar_paginas(construir_query: Callable) -> Iterator[List[dict]]:
+    """
+    Lee una consulta por páginas de TAMANO_PAGINA y regresa cada página conforme llega.
+    `construir_query` debe regresar un query nuevo en cada llamada y con un orden estable.
+    """
+    inicio = 0
+    while True:
+        pagina = construir_query().range(inicio, inicio + TAMANO_PAGINA - 1).execute().data
+        if pagina:
+            yield pagina
+        if len(pagina) < TAMANO_PAGINA:
+            return
+        inicio += len(pagina)
+
+def leer_todas(construir_query: Callable) -> List[dict]:
+    """Lee todas las filas de una consulta por páginas de TAMANO_PAGINA."""
+    return [fila for pagina in iterar_paginas(construir_query) for fila in pagina]
+
+def iterar_por_llave(construir_query: Callable, llave: str) -> Iterator[List[dict]]:
+    """
+    Lee una tabla completa por páginas de TAMANO_PAGINA ordenadas por `llave` (única).
+    Usa paginación por llave (llave > última vista) en lugar de offsets, así que cada página
+    cuesta lo mismo sin importar qué tan adentro de la tabla esté.
+    """
+    ultima = None
+    while True:
+        query = construir_query().order(llave)
+        if ultima is not None:
+            query = query.gt(llave, ultima)
+        pagina = query.limit(TAMANO_PAGINA).execute().data
+        if pagina:
+            yield pagina
+            ultima = pagina[-1][llave]
+        if len(pagina) < TAMANO_PAGINA:
+            return
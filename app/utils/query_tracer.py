@@ -0,0 +1,128 @@
+import os
+import time
+from collections import defaultdict
+from flask import current_app, g, request
+
+# Parámetros cuyo valor forma parte de la "forma" de la consulta y no es un dato
+PARAMS_ESTRUCTURALES = ('select', 'order', 'columns', 'on_conflict')
+
+# Repeticiones de una misma forma con distintos parámetros para considerarla N+1
+UMBRAL_N_MAS_1 = int(os.environ.get('QUERY_N_PLUS_ONE_THRESHOLD', 3))
+
+# Peticiones más lentas que esto (ms) se registran con el desglose de consultas
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 500))
+
+class PresupuestoConsultasExcedido(AssertionError):
+    """Se lanza en modo estricto cuando un endpoint excede su presupuesto de consultas."""
+    pass
+
+def presupuesto_consultas(maximo: int):
+    """
+    Decorador para declarar el número máximo de consultas a Supabase de un endpoint.
+    Debe colocarse debajo de `@route`.
+    """
+    def decorator(f):
+        f._presupuesto_consultas = maximo
+        return f
+    return decorator
+
+def forma_consulta(consulta) -> tuple:
+    """
+    Normaliza una consulta quitando los valores de los filtros, p. ej.
+    `alumno?id_grupo=eq.G1` y `alumno?id_grupo=eq.G2` tienen la misma forma.
+    """
+    partes = []
+    for key, value in consulta.params:
+        if key in PARAMS_ESTRUCTURALES:
+            partes.append((key, value))
+        else:
+            operador = value.split('.', 1)[0]
+            if operador == 'not':
+                operador = '.'.join(value.split('.', 2)[:2])
+            partes.append((key, operador))
+    return (consulta.metodo, consulta.tabla, tuple(sorted(partes)))
+
+def detectar_n_mas_1(consultas: list) -> list:
+    """
+    Regresa [(forma, repeticiones)] de las formas repetidas con parámetros distintos.
+    """
+    por_forma = defaultdict(set)
+    conteo = defaultdict(int)
+    for consulta in consultas:
+        forma = forma_consulta(consulta)
+        por_forma[forma].add(consulta.params)
+        conteo[forma] += 1
+
+    return [
+        (forma, conteo[forma])
+        for forma, variantes in por_forma.items()
+        if conteo[forma] >= UMBRAL_N_MAS_1 and len(variantes) > 1
+    ]
+
+def desglose_consultas(consultas: list) -> str:
+    """Texto con el número de consultas y tiempo acumulado por tabla."""
+    por_tabla = defaultdict(lambda: [0, 0.0])
+    for consulta in consultas:
+        entrada = por_tabla[(consulta.metodo, consulta.tabla)]
+        entrada[0] += 1
+        entrada[1] += consulta.duracion
+
+    lineas = [
+        f'  {metodo} {tabla}: {total} consulta(s), {duracion * 1000:.1f} ms'
+        for (metodo, tabla), (total, duracion) in sorted(por_tabla.items(), key=lambda x: -x[1][1])
+    ]
+    return '\n'.join(lineas)
+
+def _trazado_activo(app) -> bool:
+    return bool(app.config.get('QUERY_TRACE')) or app.debug or app.testing
+
+def configurar_trazado(app) -> None:
+    """
+    Registra el análisis de consultas por petición. Requiere `instrumentar_app`, que
+    acumula las consultas de cada petición en `g.consultas_upstream`.
+
+    - En modo de desarrollo/pruebas (QUERY_TRACE=1, debug o testing) se marcan patrones N+1
+      y se valida el presupuesto de consultas de cada endpoint.
+    - Siempre se registran las peticiones lentas con su desglose de consultas.
+    """
+    app.config.setdefault('QUERY_TRACE', os.environ.get('QUERY_TRACE') == '1')
+    app.config.setdefault('QUERY_BUDGET_STRICT', os.environ.get('QUERY_BUDGET_STRICT') == '1')
+
+    @app.after_request
+    def _analizar_consultas(response):
+        consultas = g.get('consultas_upstream')
+        inicio = g.get('inicio_peticion')
+        if consultas is None or inicio is None:
+            return response
+
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        if duracion_ms > SLOW_REQUEST_MS:
+            current_app.logger.warning(
+                'Petición lenta %s %s: %.1f ms, %d consulta(s)\n%s',
+                request.method, request.path, duracion_ms, len(consultas), desglose_consultas(consultas)
+            )
+
+        if not _trazado_activo(current_app):
+            return response
+
+        response.headers['X-Upstream-Queries'] = str(len(consultas))
+
+        for (metodo, tabla, _), repeticiones in detectar_n_mas_1(consultas):
+            current_app.logger.warning(
+                'Posible N+1 en %s %s: %s %s se ejecutó %d veces con distintos parámetros',
+                request.method, request.path, metodo, tabla, repeticiones
+            )
+            response.headers.add('X-N-Plus-One', f'{metodo} {tabla} x{repeticiones}')
+
+        view = current_app.view_functions.get(request.endpoint)
+        presupuesto = getattr(view, '_presupuesto_consultas', None)
+        if presupuesto is not None and len(consultas) > presupuesto:
+            mensaje = (
+                f'{request.endpoint} ejecutó {len(consultas)} consultas '
+                f'(presupuesto: {presupuesto})\n{desglose_consultas(consultas)}'
+            )
+            if current_app.testing or current_app.config.get('QUERY_BUDGET_STRICT'):
+                raise PresupuestoConsultasExcedido(mensaje)
+            current_app.logger.warning('Presupuesto de consultas excedido: %s', mensaje)
+
+        return response
@@ -0,0 +1,692 @@
+"""
+Réplica local de lectura en SQLite.
+
+Con SUPABASE_REPLICA_PATH definido, cada host guarda en ese archivo una copia de las tablas de
+REPLICA_TABLAS y la mantiene al día pidiendo a Supabase, cada REPLICA_SYNC_INTERVAL segundos,
+las filas con `actualizado_en` reciente y las de `replica_eliminaciones`
+(ver supabase/migrations/20261019140000_replica_local.sql).
+
+- En cada ciclo solo un worker del host consulta Supabase: el que toma el candado de escritura
+  del archivo. Los demás solo leen del archivo los cambios que aún no tienen.
+- Las peticiones GET a endpoints marcados con @lectura_replica se resuelven con SQL sobre el
+  archivo si la consulta es de las formas de la lista blanca (ver ConsultaReplica: filtros,
+  búsquedas, orden y recursos embebidos permitidos por tabla) y el atraso de sus tablas no pasa
+  del permitido. Cualquier otra consulta va a Supabase, igual que si este proceso escribió en la
+  tabla después de la última sincronización, si la lectura local falla y las hechas dentro de
+  lecturas_autoritativas() (autorización y pertenencia).
+- El atraso por tabla se expone en /metrics como replica_lag_seconds.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set
+import httpx
+from flask import g, has_request_context, request
+from app.utils.concurrencia import es_proceso_principal
+from app.utils.metrics import Counter, GaugeCalculado, registrar_metrica
+from app.utils.paginacion import iterar_por_llave, leer_todas
+from app.utils.supabase_transport import es_lectura_autoritativa, tabla_de_url
+
+# Archivo SQLite de la réplica; sin definir, todas las lecturas van a Supabase
+REPLICA_PATH = os.environ.get('SUPABASE_REPLICA_PATH')
+
+# Segundos entre sincronizaciones
+REPLICA_INTERVALO = float(os.environ.get('REPLICA_SYNC_INTERVAL', 15))
+
+# Atraso máximo (s) por defecto de @lectura_replica
+REPLICA_MAX_ATRASO = float(os.environ.get('REPLICA_MAX_STALENESS', 60))
+
+# Segundos antes de la última marca que se vuelven a pedir en cada ciclo: cubren las
+# transacciones que confirman después de que se leyó un `actualizado_en` posterior
+REPLICA_SOLAPE = float(os.environ.get('REPLICA_SYNC_OVERLAP', 5))
+
+# Sin sincronizar por más tiempo que esto, la tabla se recarga completa (las eliminaciones
+# anteriores pueden ya no estar en replica_eliminaciones)
+RETENCION_ELIMINACIONES = timedelta(days=7)
+
+# Tablas replicadas -> llave primaria. No se replican usuario (contraseñas) ni calificaciones
+# (cambian durante los cierres de parcial y se leen con filtros propios)
+REPLICA_TABLAS = {
+    'grupo': 'id_grupo',
+    'curso': 'id_curso',
+    'maestro': 'id_usuario',
+    'alumno': 'id_alumno',
+    'asignacion': 'id_asignacion',
+    'horario_asignacion': 'id_horario',
+    'disponibilidad': 'id_disponibilidad',
+}
+
+ELIMINACIONES = 'replica_eliminaciones'
+
+ACCEPT_SOPORTADOS = (None, '*/*', 'application/json', 'application/vnd.pgrst.object+json')
+
+# --- Formas de consulta que la réplica responde; cualquier otra va a Supabase ---
+
+# Columnas que admiten eq e in, por tabla
+FILTROS_REPLICA = {
+    'grupo': {'id_grupo', 'generacion', 'facultad'},
+    'curso': {'id_curso', 'codigo'},
+    'maestro': {'id_usuario', 'especialidad'},
+    'alumno': {'id_alumno', 'id_grupo'},
+    'asignacion': {'id_asignacion', 'id_curso', 'id_grupo', 'id_maestro'},
+    'horario_asignacion': {'id_horario', 'id_asignacion'},
+    'disponibilidad': {'id_disponibilidad', 'id_maestro'},
+}
+
+# Columnas date que admiten lt, lte, gt y gte (las fechas ISO se comparan igual como texto)
+FECHAS_REPLICA = {
+    'maestro': {'fecha_nacimiento'},
+    'alumno': {'fecha_nacimiento'},
+}
+
+# Columnas de texto para búsquedas or=(columna.ilike.patrón,...)
+BUSQUEDAS_REPLICA = {
+    'grupo': {'nombre_grupo'},
+    'curso': {'nombre', 'codigo'},
+    'maestro': {'nombre', 'apellido_paterno', 'apellido_materno'},
+    'alumno': {'nombre', 'apellido_paterno', 'apellido_materno'},
+}
+
+# Columnas por las que se puede ordenar además de la llave primaria: su orden en SQLite es el
+# mismo que en PostgreSQL. Las de texto libre o enums (dia_semana) no, por la collation
+ORDEN_REPLICA = {
+    'maestro': {'fecha_nacimiento'},
+    'alumno': {'fecha_nacimiento'},
+    'horario_asignacion': {'id_asignacion', 'hora_inicio', 'hora_fin'},
+    'disponibilidad': {'hora_inicio', 'hora_fin'},
+}
+
+# Recursos embebidos: (tabla, recurso) -> (columna de la tabla, columna del recurso, es lista)
+EMBEBIDOS_REPLICA = {
+    ('alumno', 'grupo'): ('id_grupo', 'id_grupo', False),
+    ('asignacion', 'curso'): ('id_curso', 'id_curso', False),
+    ('asignacion', 'grupo'): ('id_grupo', 'id_grupo', False),
+    ('asignacion', 'maestro'): ('id_maestro', 'id_usuario', False),
+    ('asignacion', 'horario_asignacion'): ('id_asignacion', 'id_asignacion', True),
+    ('grupo', 'alumno'): ('id_grupo', 'id_grupo', True),
+}
+
+_IDENTIFICADOR = re.compile(r'^[a-z_][a-z0-9_]*$')
+_FECHA = re.compile(r'^\d{4}-\d{2}-\d{2}')
+# Un número con ceros a la izquierda ('01') es igual a 1 en una columna numérica, pero no como texto
+_NUMERO_NO_CANONICO = re.compile(r'^-?0\d|^-0$')
+_OPERADORES_FECHA = {'lt': '<', 'lte': '<=', 'gt': '>', 'gte': '>='}
+# Variables por consulta IN al leer recursos embebidos
+LOTE_SQL = 500
+
+ESQUEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS filas (
+    tabla TEXT NOT NULL,
+    llave TEXT NOT NULL,
+    datos TEXT,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (tabla, llave)
+);
+CREATE INDEX IF NOT EXISTS filas_version ON filas (version);
+CREATE TABLE IF NOT EXISTS estado (
+    tabla TEXT PRIMARY KEY,
+    marca TEXT,
+    sincronizado_en REAL NOT NULL
+);
+""" + ''.join(
+    # Índices de expresión para los filtros eq/in de las lecturas (ver _texto)
+    f"CREATE INDEX IF NOT EXISTS filas_{columna} ON filas (tabla, CAST(json_extract(datos, '$.{columna}') AS TEXT));\n"
+    for columna in sorted(set().union(*FILTROS_REPLICA.values()))
+)
+
+logger = logging.getLogger(__name__)
+
+def formatear_marca(valor: datetime) -> str:
+    """Marca de tiempo en el formato que regresa PostgREST para timestamptz."""
+    return valor.astimezone(timezone.utc).isoformat(timespec='microseconds')
+
+def marca_mas_reciente(actual: Optional[str], filas: list, columna: str) -> Optional[str]:
+    """La marca más reciente entre `actual` y la columna de las filas."""
+    valores = [datetime.fromisoformat(fila[columna]) for fila in filas if fila.get(columna)]
+    if actual:
+        valores.append(datetime.fromisoformat(actual))
+    return formatear_marca(max(valores)) if valores else None
+
+def marca_con_solape(marca: str, segundos: float = REPLICA_SOLAPE) -> str:
+    """La marca menos `segundos`, desde donde se piden los cambios en el siguiente ciclo."""
+    return formatear_marca(datetime.fromisoformat(marca) - timedelta(seconds=segundos))
+
+class ConsultaNoSoportada(Exception):
+    """La consulta no es de las formas que la réplica responde; se manda a Supabase."""
+    pass
+
+def _minusculas(valor):
+    return valor.lower() if isinstance(valor, str) else valor
+
+def _parse_select(texto: str) -> list:
+    """
+    'a,b,rel(c,d)' -> ['a', 'b', ('rel', ['c', 'd'])]. Solo columnas, '*' y recursos embebidos
+    sin alias, casts, hints ni filtros; un recurso embebido de varias filas puede ser rel(count).
+    """
+    elementos, actual, nivel = [], '', 0
+    for char in texto + ',':
+        if char == ',' and nivel == 0:
+            elementos.append(actual.strip())
+            actual = ''
+            continue
+        nivel += {'(': 1, ')': -1}.get(char, 0)
+        if nivel < 0:
+            raise ConsultaNoSoportada(texto)
+        actual += char
+    if nivel != 0:
+        raise ConsultaNoSoportada(texto)
+
+    select = []
+    for elemento in elementos:
+        if '(' in elemento:
+            nombre, resto = elemento.split('(', 1)
+            if not _IDENTIFICADOR.match(nombre) or not resto.endswith(')'):
+                raise ConsultaNoSoportada(elemento)
+            select.append((nombre, _parse_select(resto[:-1])))
+        elif elemento == '*' or _IDENTIFICADOR.match(elemento):
+            select.append(elemento)
+        else:
+            raise ConsultaNoSoportada(elemento)
+    return select
+
+def _texto(tabla: str, columna: str) -> str:
+    """Expresión SQL con el valor de la columna como texto, el formato de los filtros de la URL."""
+    if columna == REPLICA_TABLAS[tabla]:
+        return 'llave'
+    return f"CAST(json_extract(datos, '$.{columna}') AS TEXT)"
+
+class ConsultaReplica:
+    """
+    Lectura a PostgREST traducida a SQL sobre el archivo de la réplica. Lanza
+    ConsultaNoSoportada si la petición usa algo fuera de la lista blanca: otra tabla u
+    operador, headers como Prefer o Range, columnas no permitidas o recursos no declarados.
+    """
+    def __init__(self, request: httpx.Request):
+        self.tabla = tabla_de_url(request.url)
+        if request.method != 'GET' or self.tabla not in REPLICA_TABLAS:
+            raise ConsultaNoSoportada(self.tabla)
+        self.accept = request.headers.get('accept')
+        if self.accept not in ACCEPT_SOPORTADOS or 'prefer' in request.headers or 'range' in request.headers:
+            raise ConsultaNoSoportada(self.tabla)
+
+        self.select = _parse_select(request.url.params.get('select', '*'))
+        self.tablas = {self.tabla} | self._recursos(self.tabla, self.select)
+        self.condiciones: List[str] = []
+        self.parametros: list = []
+        self.orden: List[str] = []
+        self.limite: Optional[int] = None
+        self.offset = 0
+        for llave, valor in request.url.params.multi_items():
+            if llave == 'select':
+                continue
+            if llave == 'order':
+                self._ordenar(valor)
+            elif llave in ('limit', 'offset'):
+                if not valor.isdigit():
+                    raise ConsultaNoSoportada(llave)
+                if llave == 'limit':
+                    self.limite = int(valor)
+                else:
+                    self.offset = int(valor)
+            elif llave == 'or':
+                self._buscar(valor)
+            else:
+                self._filtrar(llave, valor)
+
+    def _recursos(self, tabla: str, select: list) -> Set[str]:
+        tablas = set()
+        for elemento in select:
+            if isinstance(elemento, tuple):
+                recurso, hijos = elemento
+                if (tabla, recurso) not in EMBEBIDOS_REPLICA:
+                    raise ConsultaNoSoportada(recurso)
+                tablas |= {recurso} | self._recursos(recurso, hijos)
+        return tablas
+
+    def _filtrar(self, columna: str, expresion: str) -> None:
+        operador, _, valor = expresion.partition('.')
+        if operador in ('eq', 'in') and columna in FILTROS_REPLICA[self.tabla]:
+            if operador == 'eq':
+                lista = [valor]
+            elif valor.startswith('(') and valor.endswith(')') and '"' not in valor:
+                lista = valor[1:-1].split(',') if valor != '()' else []
+            else:
+                raise ConsultaNoSoportada(expresion)
+            if any(_NUMERO_NO_CANONICO.match(elemento) for elemento in lista):
+                raise ConsultaNoSoportada(expresion)
+            self.condiciones.append(f'{_texto(self.tabla, columna)} IN ({", ".join("?" * len(lista))})')
+            self.parametros.extend(lista)
+        elif operador in _OPERADORES_FECHA and columna in FECHAS_REPLICA.get(self.tabla, ()):
+            if not _FECHA.match(valor):
+                raise ConsultaNoSoportada(expresion)
+            # Como PostgreSQL al convertir a date, se ignora la hora del valor
+            self.condiciones.append(f"json_extract(datos, '$.{columna}') {_OPERADORES_FECHA[operador]} ?")
+            self.parametros.append(valor[:10])
+        else:
+            raise ConsultaNoSoportada(columna)
+
+    def _buscar(self, expresion: str) -> None:
+        if not (expresion.startswith('(') and expresion.endswith(')')):
+            raise ConsultaNoSoportada(expresion)
+        terminos = []
+        for termino in expresion[1:-1].split(','):
+            columna, operador, patron = (termino.split('.', 2) + ['', ''])[:3]
+            if operador != 'ilike' or columna not in BUSQUEDAS_REPLICA.get(self.tabla, ()) \
+                    or any(char in patron for char in '()"\\'):
+                raise ConsultaNoSoportada(termino)
+            terminos.append(f"minusculas(json_extract(datos, '$.{columna}')) LIKE ?")
+            self.parametros.append(patron.replace('*', '%').lower())
+        self.condiciones.append('(' + ' OR '.join(terminos) + ')')
+
+    def _ordenar(self, expresion: str) -> None:
+        for termino in expresion.split(','):
+            columna, _, direccion = termino.partition('.')
+            permitidas = ORDEN_REPLICA.get(self.tabla, set()) | {REPLICA_TABLAS[self.tabla]}
+            if columna not in permitidas or direccion not in ('', 'asc', 'desc'):
+                raise ConsultaNoSoportada(termino)
+            # Los nulos van al final en ASC y al inicio en DESC, como en PostgreSQL
+            self.orden.append(f"json_extract(datos, '$.{columna}') "
+                              + ('DESC NULLS FIRST' if direccion == 'desc' else 'ASC NULLS LAST'))
+
+class ReplicaLocal:
+    """
+    Archivo SQLite con las filas replicadas (JSON por fila) y el estado de sincronización por
+    tabla. Las lecturas se hacen con SQL directamente sobre el archivo, con una conexión por hilo.
+
+    Una fila borrada queda con datos NULL y una versión nueva; las lecturas solo ven filas con datos.
+    """
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        # tabla -> time.time() del inicio de la última sincronización confirmada en el archivo
+        self._sincronizado: Dict[str, float] = {}
+        # tabla -> time.time() de la última escritura de este proceso en ella
+        self._escrito: Dict[str, float] = {}
+        # tabla -> columnas, tomadas de una fila cualquiera (se sincronizan con select=*)
+        self._columnas: Dict[str, Set[str]] = {}
+        self._ultimo_refresco = 0.0
+        self._hilos = threading.local()
+        self._lectura().executescript(ESQUEMA_SQLITE)
+
+    def _conectar(self, timeout: float) -> sqlite3.Connection:
+        # isolation_level=None: las transacciones se abren explícitamente con BEGIN
+        conexion = sqlite3.connect(self.ruta, timeout=timeout, isolation_level=None, check_same_thread=False)
+        conexion.execute('PRAGMA journal_mode=WAL')
+        conexion.execute('PRAGMA synchronous=NORMAL')
+        conexion.create_function('minusculas', 1, _minusculas, deterministic=True)
+        return conexion
+
+    def _lectura(self) -> sqlite3.Connection:
+        """Conexión de lectura de este hilo: con WAL, las lecturas de varios hilos no se bloquean."""
+        conexion = getattr(self._hilos, 'conexion', None)
+        if conexion is None:
+            conexion = self._hilos.conexion = self._conectar(timeout=5)
+        return conexion
+
+    # --- Sincronización (hilo de fondo) ---
+
+    def iniciar(self) -> None:
+        threading.Thread(target=self._ciclo, name='replica-sync', daemon=True).start()
+
+    def _ciclo(self) -> None:
+        # timeout=0: si otro worker tiene el candado de escritura, este ciclo no sincroniza
+        escritura = self._conectar(timeout=0)
+        while True:
+            try:
+                self.sincronizar(escritura)
+            except Exception:
+                replica_sync_errors_total.inc()
+                logger.warning('No se pudo sincronizar la réplica local %s', self.ruta, exc_info=True)
+            try:
+                self.refrescar()
+            except sqlite3.Error:
+                logger.warning('No se pudo leer la réplica local %s', self.ruta, exc_info=True)
+            time.sleep(REPLICA_INTERVALO)
+
+    def sincronizar(self, conexion: sqlite3.Connection) -> bool:
+        """
+        Trae de Supabase los cambios desde el último ciclo y los guarda en el archivo en una
+        sola transacción. Regresa False si otro worker está sincronizando o lo acaba de hacer.
+        """
+        from app.utils.supabase_connection import supabaseConnection
+
+        try:
+            conexion.execute('BEGIN IMMEDIATE')
+        except sqlite3.OperationalError:
+            return False
+        try:
+            estado = {
+                tabla: (marca, sincronizado_en)
+                for tabla, marca, sincronizado_en in conexion.execute('SELECT tabla, marca, sincronizado_en FROM estado')
+            }
+            inicio = time.time()
+            if all(inicio - estado.get(tabla, (None, 0))[1] < REPLICA_INTERVALO / 2 for tabla in REPLICA_TABLAS):
+                conexion.execute('ROLLBACK')
+                return False
+
+            supabase = supabaseConnection.get_instance().get_client()
+            version = conexion.execute('SELECT COALESCE(MAX(version), 0) FROM filas').fetchone()[0] + 1
+            limite_retencion = inicio - RETENCION_ELIMINACIONES.total_seconds()
+            completas = [
+                tabla for tabla in REPLICA_TABLAS
+                if not estado.get(tabla, (None, 0))[0] or estado[tabla][1] < limite_retencion
+            ]
+
+            # Eliminaciones antes que filas: una fila borrada y vuelta a crear termina presente
+            marca_eliminaciones = estado.get(ELIMINACIONES, (None, 0))[0]
+            if marca_eliminaciones and len(completas) < len(REPLICA_TABLAS):
+                eliminaciones = leer_todas(lambda: supabase.table(ELIMINACIONES)
+                                           .select('id_eliminacion, tabla, llave, eliminado_en')
+                                           .gte('eliminado_en', marca_con_solape(marca_eliminaciones))
+                                           .in_('tabla', list(REPLICA_TABLAS))
+                                           .order('id_eliminacion'))
+                conexion.executemany(
+                    'UPDATE filas SET datos = NULL, version = ? WHERE tabla = ? AND llave = ? AND datos IS NOT NULL',
+                    [(version, fila['tabla'], str(fila['llave'])) for fila in eliminaciones
+                     if fila['tabla'] not in completas]
+                )
+                marca_eliminaciones = marca_mas_reciente(marca_eliminaciones, eliminaciones, 'eliminado_en')
+            self._guardar_estado(conexion, ELIMINACIONES, marca_eliminaciones or formatear_marca(datetime.fromtimestamp(inicio, timezone.utc)), inicio)
+
+            for tabla, llave in REPLICA_TABLAS.items():
+                marca = estado.get(tabla, (None, 0))[0]
+                if tabla in completas:
+                    conexion.execute(
+                        'UPDATE filas SET datos = NULL, version = ? WHERE tabla = ? AND datos IS NOT NULL',
+                        (version, tabla)
+                    )
+                    paginas = iterar_por_llave(lambda: supabase.table(tabla).select('*'), llave)
+                    marca = None
+                else:
+                    desde = marca_con_solape(marca)
+                    paginas = [leer_todas(lambda: supabase.table(tabla).select('*')
+                                          .gte('actualizado_en', desde).order(llave))]
+                for pagina in paginas:
+                    conexion.executemany(
+                        'INSERT INTO filas (tabla, llave, datos, version) VALUES (?, ?, ?, ?) '
+                        'ON CONFLICT (tabla, llave) DO UPDATE SET datos = excluded.datos, version = excluded.version '
+                        'WHERE filas.datos IS NOT excluded.datos',
+                        [(tabla, str(fila[llave]), json.dumps(fila, sort_keys=True), version) for fila in pagina]
+                    )
+                    marca = marca_mas_reciente(marca, pagina, 'actualizado_en')
+                # Tabla vacía: se toma el reloj local como punto de partida
+                self._guardar_estado(conexion, tabla, marca or formatear_marca(datetime.fromtimestamp(inicio, timezone.utc)), inicio)
+
+            conexion.execute('COMMIT')
+            return True
+        except BaseException:
+            conexion.execute('ROLLBACK')
+            raise
+
+    def _guardar_estado(self, conexion: sqlite3.Connection, tabla: str, marca: str, sincronizado_en: float) -> None:
+        conexion.execute(
+            'INSERT INTO estado (tabla, marca, sincronizado_en) VALUES (?, ?, ?) '
+            'ON CONFLICT (tabla) DO UPDATE SET marca = excluded.marca, sincronizado_en = excluded.sincronizado_en',
+            (tabla, marca, sincronizado_en)
+        )
+
+    # --- Lectura ---
+
+    def refrescar(self) -> None:
+        """
+        Lee cuándo se sincronizó cada tabla. Las lecturas ven siempre lo último confirmado en el
+        archivo, así que el atraso calculado con este estado es mayor o igual al real.
+        """
+        self._ultimo_refresco = time.monotonic()
+        self._sincronizado.update(self._lectura().execute('SELECT tabla, sincronizado_en FROM estado'))
+
+    def atraso(self, tabla: str) -> float:
+        """Segundos desde que empezó la sincronización que tiene cargada este proceso."""
+        sincronizado = self._sincronizado.get(tabla)
+        return float('inf') if sincronizado is None else max(0.0, time.time() - sincronizado)
+
+    def _al_dia(self, tablas: Set[str], max_atraso: float) -> bool:
+        return all(
+            self.atraso(tabla) <= max_atraso and self._sincronizado.get(tabla, 0) > self._escrito.get(tabla, 0)
+            for tabla in tablas
+        )
+
+    def marcar_escritura(self, request: httpx.Request) -> None:
+        """Las lecturas siguientes de la tabla van a Supabase hasta que una sincronización la incluya."""
+        recurso = tabla_de_url(request.url)
+        # Las funciones (rpc/...) pueden escribir en cualquier tabla
+        tablas = REPLICA_TABLAS if recurso.startswith('rpc/') else [recurso]
+        ahora = time.time()
+        for tabla in tablas:
+            if tabla in REPLICA_TABLAS:
+                self._escrito[tabla] = ahora
+
+    def consulta(self, request: httpx.Request, max_atraso: float) -> Optional[ConsultaReplica]:
+        """La consulta traducida si la réplica puede responderla con ese atraso, o None."""
+        tabla = tabla_de_url(request.url)
+        try:
+            consulta = ConsultaReplica(request)
+        except ConsultaNoSoportada:
+            replica_reads_total.inc((tabla, 'no_soportada'))
+            return None
+        if not self._al_dia(consulta.tablas, max_atraso) and time.monotonic() - self._ultimo_refresco >= 1:
+            # Otro worker pudo haber sincronizado después del último refresco de este proceso
+            self.refrescar()
+        if not self._al_dia(consulta.tablas, max_atraso):
+            replica_reads_total.inc((tabla, 'atrasada'))
+            return None
+        return consulta
+
+    def _columnas_tabla(self, tabla: str) -> Set[str]:
+        """
+        Columnas de la tabla. Sin filas no se conocen, y PostgREST respondería 400 a una columna
+        que no existe, así que la consulta va a Supabase.
+        """
+        columnas = self._columnas.get(tabla)
+        if columnas is None:
+            fila = self._lectura().execute(
+                'SELECT datos FROM filas WHERE tabla = ? AND datos IS NOT NULL LIMIT 1', (tabla,)
+            ).fetchone()
+            if fila is None:
+                raise ConsultaNoSoportada(tabla)
+            columnas = self._columnas[tabla] = set(json.loads(fila[0]))
+        return columnas
+
+    def _filas(self, tabla: str, condiciones: List[str], parametros: list, orden: List[str] = (),
+               limite: Optional[int] = None, offset: int = 0) -> List[dict]:
+        sql = 'SELECT datos FROM filas WHERE tabla = ? AND datos IS NOT NULL' + ''.join(
+            f' AND {condicion}' for condicion in condiciones)
+        # Sin orden pedido, por llave primaria (numérica si lo es): estable entre páginas
+        sql += ' ORDER BY ' + ', '.join([*orden, f"json_extract(datos, '$.{REPLICA_TABLAS[tabla]}')"])
+        if limite is not None or offset:
+            sql += ' LIMIT ? OFFSET ?'
+            parametros = [*parametros, -1 if limite is None else limite, offset]
+        return [json.loads(datos) for (datos,) in self._lectura().execute(sql, (tabla, *parametros))]
+
+    def _proyectar(self, tabla: str, filas: List[dict], select: list) -> List[dict]:
+        """Las columnas del select de cada fila, con sus recursos embebidos leídos por lotes."""
+        columnas = self._columnas_tabla(tabla)
+        salida = []
+        for fila in filas:
+            proyectada = {}
+            for elemento in select:
+                if elemento == '*':
+                    proyectada.update(fila)
+                elif isinstance(elemento, str):
+                    if elemento not in columnas:
+                        raise ConsultaNoSoportada(elemento)
+                    proyectada[elemento] = fila.get(elemento)
+            salida.append(proyectada)
+
+        for elemento in select:
+            if not isinstance(elemento, tuple):
+                continue
+            recurso, hijos = elemento
+            local, remota, es_lista = EMBEBIDOS_REPLICA[(tabla, recurso)]
+            claves = sorted({str(fila[local]) for fila in filas if fila.get(local) is not None})
+            if es_lista and hijos == ['count']:
+                conteos = self._contar(recurso, remota, claves)
+                for fila, proyectada in zip(filas, salida):
+                    proyectada[recurso] = [{'count': conteos.get(str(fila.get(local)), 0)}]
+                continue
+            relacionadas = []
+            for inicio in range(0, len(claves), LOTE_SQL):
+                lote = claves[inicio:inicio + LOTE_SQL]
+                relacionadas.extend(self._filas(
+                    recurso, [f'{_texto(recurso, remota)} IN ({", ".join("?" * len(lote))})'], lote))
+            agrupadas: Dict[str, list] = {}
+            for relacionada, proyectada in zip(relacionadas, self._proyectar(recurso, relacionadas, hijos)):
+                agrupadas.setdefault(str(relacionada[remota]), []).append(proyectada)
+            for fila, proyectada in zip(filas, salida):
+                encontradas = agrupadas.get(str(fila.get(local)), [])
+                proyectada[recurso] = encontradas if es_lista else (encontradas[0] if encontradas else None)
+        return salida
+
+    def _contar(self, tabla: str, columna: str, claves: List[str]) -> Dict[str, int]:
+        """Filas de la tabla por valor de la columna, para los recursos embebidos rel(count)."""
+        texto = _texto(tabla, columna)
+        conteos: Dict[str, int] = {}
+        for inicio in range(0, len(claves), LOTE_SQL):
+            lote = claves[inicio:inicio + LOTE_SQL]
+            conteos.update(self._lectura().execute(
+                f'SELECT {texto}, COUNT(*) FROM filas WHERE tabla = ? AND datos IS NOT NULL '
+                f'AND {texto} IN ({", ".join("?" * len(lote))}) GROUP BY {texto}', (tabla, *lote)
+            ))
+        return conteos
+
+    def responder(self, consulta: ConsultaReplica, request: httpx.Request) -> httpx.Response:
+        """Ejecuta la consulta y arma la respuesta como la daría PostgREST."""
+        filas = self._filas(consulta.tabla, consulta.condiciones, consulta.parametros,
+                            consulta.orden, consulta.limite, consulta.offset)
+        filas = self._proyectar(consulta.tabla, filas, consulta.select)
+
+        rango = f'{consulta.offset}-{consulta.offset + len(filas) - 1}' if filas else '*'
+        headers = {'Content-Range': f'{rango}/*'}
+        if consulta.accept == 'application/vnd.pgrst.object+json':
+            # PostgREST responde 406 si no es exactamente una fila; ese error lo da Supabase
+            if len(filas) != 1:
+                raise ConsultaNoSoportada(consulta.tabla)
+            return httpx.Response(200, json=filas[0], headers=headers, request=request)
+        return httpx.Response(200, json=filas, headers=headers, request=request)
+
+_replica: Optional[ReplicaLocal] = None
+
+def _max_atraso_peticion() -> Optional[float]:
+    if not has_request_context():
+        return None
+    return g.get('replica_max_atraso')
+
+def _responder_local(consulta: ConsultaReplica, request: httpx.Request) -> Optional[httpx.Response]:
+    """
+    Respuesta desde la réplica, o None si hay que repetir la consulta en Supabase: la lectura
+    falló o el resultado cae fuera de lo que la réplica responde (p. ej. .single() sin una fila).
+    """
+    tabla = tabla_de_url(request.url)
+    try:
+        response = _replica.responder(consulta, request)
+    except ConsultaNoSoportada:
+        replica_fallbacks_total.inc((tabla, 'no_soportada'))
+        return None
+    except (sqlite3.Error, ValueError):
+        logger.warning('No se pudo leer la réplica local para %s', request.url, exc_info=True)
+        replica_fallbacks_total.inc((tabla, 'error'))
+        return None
+    replica_reads_total.inc((tabla, 'replica'))
+    return response
+
+class TransporteReplica(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Transporte httpx que responde desde la réplica local las lecturas permitidas por
+    @lectura_replica y manda todo lo demás al transporte que envuelve.
+    """
+    def __init__(self, transport):
+        self._transport = transport
+
+    def _consulta_local(self, request: httpx.Request) -> Optional[ConsultaReplica]:
+        replica = _replica
+        if replica is None:
+            return None
+        if request.method not in ('GET', 'HEAD'):
+            replica.marcar_escritura(request)
+            return None
+        if es_lectura_autoritativa():
+            return None
+        max_atraso = _max_atraso_peticion()
+        return None if max_atraso is None else replica.consulta(request, max_atraso)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        consulta = self._consulta_local(request)
+        if consulta is not None:
+            response = _responder_local(consulta, request)
+            if response is not None:
+                return response
+        return self._transport.handle_request(request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        consulta = self._consulta_local(request)
+        if consulta is not None:
+            # La lectura de SQLite corre fuera del event loop
+            response = await asyncio.to_thread(_responder_local, consulta, request)
+            if response is not None:
+                return response
+        return await self._transport.handle_async_request(request)
+
+    def close(self) -> None:
+        self._transport.close()
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+def con_replica(transport):
+    """Envuelve el transporte con TransporteReplica si la réplica está configurada."""
+    return TransporteReplica(transport) if REPLICA_PATH else transport
+
+def lectura_replica(max_atraso: float = None):
+    """
+    Decorador para que las lecturas de un endpoint puedan resolverse en la réplica local si
+    tiene como mucho `max_atraso` segundos de atraso (por defecto REPLICA_MAX_STALENESS).
+    Solo aplica a peticiones GET. Debe colocarse debajo de `@route`.
+    """
+    def decorator(f):
+        f._replica_max_atraso = REPLICA_MAX_ATRASO if max_atraso is None else max_atraso
+        return f
+    return decorator
+
+def configurar_replica(app) -> None:
+    """
+    Abre la réplica local e inicia su sincronización si SUPABASE_REPLICA_PATH está definido,
+    y registra el hook que habilita @lectura_replica en cada petición.
+    """
+    global _replica
+    if not REPLICA_PATH:
+        return
+    # Los procesos del pool de boletas no atienden peticiones ni deben sincronizar
+    if _replica is None and es_proceso_principal():
+        _replica = ReplicaLocal(REPLICA_PATH)
+        _replica.refrescar()
+        _replica.iniciar()
+
+    @app.before_request
+    def _habilitar_replica():
+        view = app.view_functions.get(request.endpoint)
+        # Las escrituras validan contra Supabase aunque el endpoint también atienda GET
+        permitido = request.method in ('GET', 'HEAD')
+        g.replica_max_atraso = getattr(view, '_replica_max_atraso', None) if permitido else None
+
+def _atrasos() -> dict:
+    replica = _replica
+    if replica is None:
+        return {}
+    return {(tabla,): round(replica.atraso(tabla), 3) for tabla in REPLICA_TABLAS}
+
+replica_lag_seconds = registrar_metrica(GaugeCalculado(
+    'replica_lag_seconds', 'Segundos de atraso de la réplica local cargada en este proceso, por tabla',
+    ('table',), _atrasos))
+replica_reads_total = registrar_metrica(Counter(
+    'replica_reads_total', 'Lecturas de endpoints con @lectura_replica por tabla y resultado '
+    '(replica, atrasada, no_soportada)', ('table', 'result')))
+replica_fallbacks_total = registrar_metrica(Counter(
+    'replica_fallbacks_total', 'Lecturas que la réplica no pudo responder y se repitieron en Supabase, '
+    'por tabla y motivo (error, no_soportada)', ('table', 'reason')))
+replica_sync_errors_total = registrar_metrica(Counter(
+    'replica_sync_errors_total', 'Ciclos de sincronización de la réplica local que fallaron'))
@@ -0,0 +1,388 @@
+"""
+Capa de resiliencia entre la aplicación y PostgREST.
+
+Todas las llamadas de `.execute()` pasan por TransporteResiliente:
+
+- Deadline por llamada: RESILIENCE_READ_DEADLINE segundos para lecturas (con sus reintentos)
+  y RESILIENCE_WRITE_DEADLINE para escrituras. Al excederlo se lanza DeadlineExcedido.
+- Las lecturas (GET/HEAD) se reintentan hasta RESILIENCE_RETRIES veces ante errores de red,
+  timeouts y respuestas 502/503/504, esperando un tiempo aleatorio (full jitter) que crece
+  con cada intento. Las escrituras no se reintentan.
+- Un circuit breaker por recurso de PostgREST (tabla o rpc/<función>): después de
+  RESILIENCE_BREAKER_FAILURES fallas seguidas se abre y rechaza las llamadas durante
+  RESILIENCE_BREAKER_COOLDOWN segundos con CircuitoAbierto; luego deja pasar una llamada de
+  prueba y se cierra si tiene éxito.
+- Con RESILIENCE_SERVE_STALE=true, una lectura que no se puede resolver (circuito abierto o
+  fallas agotadas) regresa la última respuesta buena de la misma consulta si no tiene más de
+  RESILIENCE_STALE_MAX_AGE segundos. Solo aplica a peticiones GET cuyo cliente lo acepta con
+  `Cache-Control: max-stale` (o `max-stale=<segundos>` para acotar la antigüedad); la
+  sincronización de la réplica, el feed de cambios y las lecturas de autorización
+  (lecturas_autoritativas) siempre reciben el error. La respuesta HTTP lleva el header `Warning: 110`.
+
+Las respuestas 500 de una petición que falló por CircuitoAbierto o DeadlineExcedido se
+convierten en 503 con Retry-After, para que el cliente sepa que puede reintentar.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+import httpx
+from flask import g, has_request_context, request as peticion
+from app.utils.metrics import Counter, GaugeCalculado, registrar_metrica
+from app.utils.singleflight import RespuestaLeida, llave_consulta
+from app.utils.supabase_transport import max_obsolescencia_peticion, tabla_de_url
+
+RESILIENCE_ENABLED = os.environ.get('RESILIENCE_ENABLED', 'true').lower() in ('true', '1', 'si', 'sí')
+
+# Segundos máximos por llamada, incluidos los reintentos
+RESILIENCE_READ_DEADLINE = float(os.environ.get('RESILIENCE_READ_DEADLINE', 5))
+RESILIENCE_WRITE_DEADLINE = float(os.environ.get('RESILIENCE_WRITE_DEADLINE', 30))
+
+# Reintentos de una lectura y espera base / máxima (s) entre ellos
+RESILIENCE_RETRIES = int(os.environ.get('RESILIENCE_RETRIES', 2))
+RESILIENCE_BACKOFF_BASE = float(os.environ.get('RESILIENCE_BACKOFF_BASE', 0.05))
+RESILIENCE_BACKOFF_MAX = float(os.environ.get('RESILIENCE_BACKOFF_MAX', 1.0))
+
+# Fallas seguidas que abren el circuito de un recurso, y segundos que permanece abierto
+RESILIENCE_BREAKER_FAILURES = int(os.environ.get('RESILIENCE_BREAKER_FAILURES', 5))
+RESILIENCE_BREAKER_COOLDOWN = float(os.environ.get('RESILIENCE_BREAKER_COOLDOWN', 30))
+
+# Respuestas viejas: si se usan, su antigüedad máxima (s), cuántas consultas se recuerdan y
+# el tamaño máximo (bytes) de una respuesta para guardarla
+RESILIENCE_SERVE_STALE = os.environ.get('RESILIENCE_SERVE_STALE', 'false').lower() in ('true', '1', 'si', 'sí')
+RESILIENCE_STALE_MAX_AGE = float(os.environ.get('RESILIENCE_STALE_MAX_AGE', 300))
+RESILIENCE_STALE_MAX_ENTRIES = int(os.environ.get('RESILIENCE_STALE_MAX_ENTRIES', 1000))
+RESILIENCE_STALE_MAX_BYTES = int(os.environ.get('RESILIENCE_STALE_MAX_BYTES', 256 * 1024))
+
+# Respuestas de PostgREST (o de su proxy) que indican que el servicio no está disponible
+STATUS_REINTENTABLES = (502, 503, 504)
+
+METODOS_LECTURA = ('GET', 'HEAD')
+
+class UpstreamNoDisponible(httpx.TransportError):
+    """PostgREST no respondió a tiempo o su circuito está abierto."""
+    reintentar_en: float = 1
+
+class CircuitoAbierto(UpstreamNoDisponible):
+    """El circuito del recurso está abierto: la llamada se rechazó sin hacerse."""
+    pass
+
+class DeadlineExcedido(UpstreamNoDisponible):
+    """La llamada (con sus reintentos) no terminó antes de su deadline."""
+    pass
+
+CERRADO = 0
+SEMIABIERTO = 1
+ABIERTO = 2
+
+class Circuito:
+    """Circuit breaker de un recurso de PostgREST."""
+    def __init__(self, recurso: str):
+        self.recurso = recurso
+        self.estado = CERRADO
+        self._fallas = 0
+        self._abierto_hasta = 0.0
+        self._probando = False
+        self._lock = threading.Lock()
+
+    def permitir(self) -> bool:
+        """True si la llamada puede hacerse; en semiabierto solo pasa una llamada de prueba a la vez."""
+        with self._lock:
+            if self.estado == CERRADO:
+                return True
+            if self.estado == ABIERTO and time.monotonic() >= self._abierto_hasta:
+                self.estado = SEMIABIERTO
+                self._probando = False
+            if self.estado == SEMIABIERTO and not self._probando:
+                self._probando = True
+                return True
+            return False
+
+    def exito(self) -> None:
+        with self._lock:
+            self.estado = CERRADO
+            self._fallas = 0
+            self._probando = False
+
+    def falla(self) -> None:
+        with self._lock:
+            self._fallas += 1
+            if self.estado == SEMIABIERTO or self._fallas >= RESILIENCE_BREAKER_FAILURES:
+                self.estado = ABIERTO
+                self._abierto_hasta = time.monotonic() + RESILIENCE_BREAKER_COOLDOWN
+                self._probando = False
+
+    def abandonar(self) -> None:
+        """La llamada terminó sin resultado (p. ej. se canceló): otra puede hacer la prueba."""
+        with self._lock:
+            self._probando = False
+
+    def segundos_para_probar(self) -> float:
+        with self._lock:
+            return max(self._abierto_hasta - time.monotonic(), 0)
+
+_circuitos: Dict[str, Circuito] = {}
+_circuitos_lock = threading.Lock()
+
+def circuito(recurso: str) -> Circuito:
+    """Circuito del recurso (tabla o rpc/<función>), creado la primera vez que se usa."""
+    actual = _circuitos.get(recurso)
+    if actual is None:
+        with _circuitos_lock:
+            actual = _circuitos.setdefault(recurso, Circuito(recurso))
+    return actual
+
+class _UltimasRespuestas:
+    """Última respuesta buena de cada consulta de lectura (LRU acotado)."""
+    def __init__(self, max_entradas: int):
+        self.max_entradas = max_entradas
+        self._respuestas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def guardar(self, llave, respuesta: RespuestaLeida) -> None:
+        with self._lock:
+            self._respuestas[llave] = (respuesta, time.monotonic())
+            self._respuestas.move_to_end(llave)
+            while len(self._respuestas) > self.max_entradas:
+                self._respuestas.popitem(last=False)
+
+    def obtener(self, llave, max_edad: float) -> Optional[RespuestaLeida]:
+        with self._lock:
+            entrada = self._respuestas.get(llave)
+        if entrada is None or time.monotonic() - entrada[1] > max_edad:
+            return None
+        return entrada[0]
+
+_ultimas = _UltimasRespuestas(RESILIENCE_STALE_MAX_ENTRIES)
+
+def _espera_reintento(intento: int) -> float:
+    """Full jitter: aleatorio entre 0 y base * 2^intento, acotado a RESILIENCE_BACKOFF_MAX."""
+    return random.uniform(0, min(RESILIENCE_BACKOFF_MAX, RESILIENCE_BACKOFF_BASE * (2 ** intento)))
+
+def _limitar_timeout(request: httpx.Request, restante: float) -> None:
+    """Recorta los timeouts de httpx de este intento a lo que queda del deadline."""
+    timeouts = dict(request.extensions.get('timeout') or {})
+    for tipo in ('connect', 'read', 'write', 'pool'):
+        actual = timeouts.get(tipo)
+        timeouts[tipo] = restante if actual is None else min(actual, restante)
+    request.extensions['timeout'] = timeouts
+
+def _marcar_peticion(**valores) -> None:
+    if has_request_context():
+        for nombre, valor in valores.items():
+            setattr(g, nombre, valor)
+
+class _Llamada:
+    """Estado de una llamada: deadline, intentos y el resultado de cada uno."""
+    def __init__(self, request: httpx.Request):
+        self.request = request
+        self.recurso = tabla_de_url(request.url)
+        self.lectura = request.method in METODOS_LECTURA
+        self.circuito = circuito(self.recurso)
+        deadline = RESILIENCE_READ_DEADLINE if self.lectura else RESILIENCE_WRITE_DEADLINE
+        self.deadline = deadline
+        self.limite = time.monotonic() + deadline
+        self.intentos = 1 + RESILIENCE_RETRIES if self.lectura else 1
+        self.llave = llave_consulta(request) if self.lectura and RESILIENCE_SERVE_STALE else None
+        self.max_obsolescencia = max_obsolescencia_peticion() if self.llave is not None else None
+
+    def restante(self) -> float:
+        return self.limite - time.monotonic()
+
+    def rechazar(self) -> Optional[httpx.Response]:
+        """Respuesta vieja para una llamada que no se puede hacer, o lanza CircuitoAbierto."""
+        resilience_breaker_rejections_total.inc((self.recurso,))
+        obsoleta = self.obsoleta()
+        if obsoleta is not None:
+            return obsoleta
+        error = CircuitoAbierto(
+            f'Servicio de datos no disponible temporalmente ({self.recurso}); intente más tarde',
+            request=self.request
+        )
+        error.reintentar_en = max(self.circuito.segundos_para_probar(), 1)
+        _marcar_peticion(upstream_no_disponible=error.reintentar_en)
+        raise error
+
+    def exitosa(self, response: httpx.Response) -> bool:
+        """Registra el resultado de un intento. False si conviene reintentarlo."""
+        if response.status_code in STATUS_REINTENTABLES:
+            return False
+        self.circuito.exito()
+        if self.llave is not None and response.status_code < 300 and len(response.content) <= RESILIENCE_STALE_MAX_BYTES:
+            _ultimas.guardar(self.llave, RespuestaLeida(response))
+        return True
+
+    def obsoleta(self) -> Optional[httpx.Response]:
+        if self.max_obsolescencia is None:
+            return None
+        respuesta = _ultimas.obtener(self.llave, self.max_obsolescencia)
+        if respuesta is None:
+            return None
+        resilience_stale_served_total.inc((self.recurso,))
+        _marcar_peticion(respuesta_obsoleta=True)
+        return respuesta.respuesta(self.request)
+
+    def fallida(self, response: Optional[httpx.Response], error: Optional[Exception]) -> httpx.Response:
+        """Resultado final cuando se agotaron los intentos o el deadline."""
+        self.circuito.falla()
+        obsoleta = self.obsoleta()
+        if obsoleta is not None:
+            if response is not None:
+                response.close()
+            return obsoleta
+        if response is not None:
+            # El cliente convierte el 5xx en su error habitual (APIError)
+            return response
+        if isinstance(error, httpx.TimeoutException) or self.restante() <= 0:
+            resilience_deadline_exceeded_total.inc((self.recurso,))
+            excedido = DeadlineExcedido(
+                f'La consulta a {self.recurso} no respondió a tiempo (deadline de {self.deadline:g} s)',
+                request=self.request
+            )
+            _marcar_peticion(upstream_no_disponible=excedido.reintentar_en)
+            raise excedido from error
+        raise error
+
+class TransporteResiliente(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Transporte httpx que aplica deadline, reintentos, circuit breaker y respuestas viejas
+    a las llamadas del transporte que envuelve.
+    """
+    def __init__(self, transport):
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        llamada = _Llamada(request)
+        if not llamada.circuito.permitir():
+            return llamada.rechazar()
+        try:
+            return self._intentar(request, llamada)
+        except BaseException:
+            llamada.circuito.abandonar()
+            raise
+
+    def _intentar(self, request: httpx.Request, llamada: _Llamada) -> httpx.Response:
+        response, error = None, None
+        for intento in range(llamada.intentos):
+            if intento:
+                resilience_retries_total.inc((llamada.recurso,))
+            restante = llamada.restante()
+            if restante <= 0:
+                break
+            _limitar_timeout(request, restante)
+            try:
+                response = self._transport.handle_request(request)
+                if llamada.lectura:
+                    response.read()
+                error = None
+            except httpx.TransportError as e:
+                response, error = None, e
+            if response is not None and llamada.exitosa(response):
+                return response
+            if intento + 1 < llamada.intentos:
+                espera = _espera_reintento(intento)
+                if espera >= llamada.restante():
+                    break
+                if response is not None:
+                    response.close()
+                    response = None
+                time.sleep(espera)
+        return llamada.fallida(response, error)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        llamada = _Llamada(request)
+        if not llamada.circuito.permitir():
+            return llamada.rechazar()
+        try:
+            return await self._intentar_async(request, llamada)
+        except BaseException:
+            llamada.circuito.abandonar()
+            raise
+
+    async def _intentar_async(self, request: httpx.Request, llamada: _Llamada) -> httpx.Response:
+        response, error = None, None
+        for intento in range(llamada.intentos):
+            if intento:
+                resilience_retries_total.inc((llamada.recurso,))
+            restante = llamada.restante()
+            if restante <= 0:
+                break
+            _limitar_timeout(request, restante)
+            try:
+                # wait_for además corta la llamada aunque el transporte no respete los timeouts
+                response = await asyncio.wait_for(self._intento_async(request, llamada.lectura), restante)
+                error = None
+            except asyncio.TimeoutError:
+                response, error = None, httpx.TimeoutException('Deadline excedido', request=request)
+            except httpx.TransportError as e:
+                response, error = None, e
+            if response is not None and llamada.exitosa(response):
+                return response
+            if intento + 1 < llamada.intentos:
+                espera = _espera_reintento(intento)
+                if espera >= llamada.restante():
+                    break
+                if response is not None:
+                    await response.aclose()
+                    response = None
+                await asyncio.sleep(espera)
+        return llamada.fallida(response, error)
+
+    async def _intento_async(self, request: httpx.Request, leer: bool) -> httpx.Response:
+        response = await self._transport.handle_async_request(request)
+        if leer:
+            await response.aread()
+        return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+def con_resiliencia(transport):
+    """Envuelve el transporte con TransporteResiliente salvo que RESILIENCE_ENABLED sea false."""
+    return TransporteResiliente(transport) if RESILIENCE_ENABLED else transport
+
+def configurar_resiliencia(app) -> None:
+    """
+    Registra los hooks que leen `Cache-Control: max-stale` de la petición, marcan las respuestas
+    viejas y convierten en 503 los errores 500 causados por un circuito abierto o un deadline excedido.
+    """
+    @app.before_request
+    def _aceptar_obsoletas():
+        if not RESILIENCE_SERVE_STALE or peticion.method not in METODOS_LECTURA:
+            return
+        max_stale = peticion.cache_control.max_stale
+        if max_stale is True:
+            g.max_obsolescencia = RESILIENCE_STALE_MAX_AGE
+        elif max_stale is not None:
+            g.max_obsolescencia = min(float(max_stale), RESILIENCE_STALE_MAX_AGE)
+
+    @app.after_request
+    def _ajustar_respuesta(response):
+        if g.get('respuesta_obsoleta'):
+            response.headers['Warning'] = '110 - "Response is Stale"'
+        reintentar_en = g.get('upstream_no_disponible')
+        if reintentar_en is not None and response.status_code == 500:
+            response.status_code = 503
+            response.headers['Retry-After'] = str(int(reintentar_en + 0.999))
+        return response
+
+def _estados() -> dict:
+    return {(recurso,): actual.estado for recurso, actual in list(_circuitos.items())}
+
+resilience_breaker_state = registrar_metrica(GaugeCalculado(
+    'resilience_breaker_state', 'Estado del circuit breaker por recurso de PostgREST '
+    '(0 cerrado, 1 semiabierto, 2 abierto)', ('table',), _estados))
+resilience_breaker_rejections_total = registrar_metrica(Counter(
+    'resilience_breaker_rejections_total', 'Llamadas rechazadas por un circuito abierto', ('table',)))
+resilience_retries_total = registrar_metrica(Counter(
+    'resilience_retries_total', 'Reintentos de lecturas a PostgREST', ('table',)))
+resilience_deadline_exceeded_total = registrar_metrica(Counter(
+    'resilience_deadline_exceeded_total', 'Llamadas a PostgREST que excedieron su deadline', ('table',)))
+resilience_stale_served_total = registrar_metrica(Counter(
+    'resilience_stale_served_total', 'Lecturas respondidas con la última respuesta buena guardada', ('table',)))
@@ -0,0 +1,216 @@
+import os
+import random
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+class SesionServidor(CallbackDict, SessionMixin):
+    """
+    Sesión cuyo contenido vive en el servidor; la cookie solo guarda el ID.
+    """
+    def __init__(self, initial=None, sid=None, new=False, expira=None):
+        def on_update(self):
+            self.modified = True
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expira = expira
+        self.modified = False
+        # Usuario con el que se cargó la sesión, para rotar el ID al cambiar
+        self.user_id_inicial = (initial or {}).get('user_id')
+
+class MemorySessionStore:
+    """
+    Almacén LRU en memoria del proceso. Solo es útil con un único worker.
+    """
+    def __init__(self, max_sesiones: int = 10000):
+        self.max_sesiones = max_sesiones
+        self._sesiones = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sid: str):
+        """Regresa (data, expira) o None si no existe o ya expiró."""
+        with self._lock:
+            entrada = self._sesiones.get(sid)
+            if entrada is None:
+                return None
+            _, data, expira = entrada
+            if expira <= time.time():
+                del self._sesiones[sid]
+                return None
+            self._sesiones.move_to_end(sid)
+            return data, expira
+
+    def set(self, sid: str, user_id, data: str, expira: float) -> None:
+        with self._lock:
+            self._sesiones[sid] = (user_id, data, expira)
+            self._sesiones.move_to_end(sid)
+            while len(self._sesiones) > self.max_sesiones:
+                self._sesiones.popitem(last=False)
+
+    def delete(self, sid: str) -> None:
+        with self._lock:
+            self._sesiones.pop(sid, None)
+
+    def delete_user(self, user_id) -> int:
+        """Revoca todas las sesiones de un usuario. Regresa cuántas se eliminaron."""
+        with self._lock:
+            sids = [sid for sid, (uid, _, _) in self._sesiones.items() if uid == user_id]
+            for sid in sids:
+                del self._sesiones[sid]
+            return len(sids)
+
+class SQLiteSessionStore:
+    """
+    Almacén en un archivo SQLite en modo WAL, compartido por todos los workers del host.
+    """
+    # Probabilidad de purgar sesiones expiradas en cada escritura
+    PROBABILIDAD_PURGA = 0.01
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS sesion ('
+            'sid TEXT PRIMARY KEY, user_id TEXT, data TEXT NOT NULL, expira REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS sesion_user_id ON sesion (user_id)')
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, sid: str):
+        row = self._conn().execute(
+            'SELECT data, expira FROM sesion WHERE sid = ?', (sid,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= time.time():
+            self.delete(sid)
+            return None
+        return row[0], row[1]
+
+    def set(self, sid: str, user_id, data: str, expira: float) -> None:
+        conn = self._conn()
+        conn.execute(
+            'INSERT INTO sesion (sid, user_id, data, expira) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(sid) DO UPDATE SET user_id = excluded.user_id, '
+            'data = excluded.data, expira = excluded.expira',
+            (sid, user_id, data, expira)
+        )
+        if random.random() < self.PROBABILIDAD_PURGA:
+            conn.execute('DELETE FROM sesion WHERE expira <= ?', (time.time(),))
+
+    def delete(self, sid: str) -> None:
+        self._conn().execute('DELETE FROM sesion WHERE sid = ?', (sid,))
+
+    def delete_user(self, user_id) -> int:
+        cursor = self._conn().execute('DELETE FROM sesion WHERE user_id = ?', (user_id,))
+        return cursor.rowcount
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Interfaz de sesiones de Flask respaldada por un almacén del lado del servidor.
+    """
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store):
+        self.store = store
+
+    def _nuevo_sid(self) -> str:
+        return secrets.token_urlsafe(32)
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            entrada = self.store.get(sid)
+            if entrada is not None:
+                data, expira = entrada
+                return SesionServidor(self.serializer.loads(data), sid=sid, expira=expira)
+        return SesionServidor(sid=self._nuevo_sid(), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        user_id = session.get('user_id')
+        ahora = time.time()
+        lifetime = app.permanent_session_lifetime.total_seconds()
+
+        # Rotar el ID cuando cambia el usuario (login) para evitar fijación de sesión
+        if not session.new and user_id != session.user_id_inicial:
+            self.store.delete(session.sid)
+            session.sid = self._nuevo_sid()
+            session.new = True
+
+        # Extender la expiración solo si ya se consumió la mitad, para no escribir en cada petición
+        renovar = session.expira is None or session.expira - ahora < lifetime / 2
+        if not (session.modified or session.new or renovar):
+            return
+
+        session.expira = ahora + lifetime
+        self.store.set(session.sid, user_id, self.serializer.dumps(dict(session)), session.expira)
+
+        if session.new or session.modified or self.should_set_cookie(app, session):
+            response.set_cookie(
+                name,
+                session.sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app)
+            )
+
+def configurar_sesiones(app) -> None:
+    """
+    Configura el almacén de sesiones según SESSION_BACKEND:
+    'sqlite' (por defecto), 'memory' o 'cookie' (sesiones firmadas de Flask).
+    """
+    backend = os.environ.get('SESSION_BACKEND', 'sqlite').lower()
+
+    if backend == 'cookie':
+        return
+    if backend == 'memory':
+        store = MemorySessionStore(int(os.environ.get('SESSION_MEMORY_MAX', 10000)))
+    elif backend == 'sqlite':
+        path = os.environ.get('SESSION_SQLITE_PATH')
+        if not path:
+            os.makedirs(app.instance_path, exist_ok=True)
+            path = os.path.join(app.instance_path, 'sessions.db')
+        store = SQLiteSessionStore(path)
+    else:
+        raise ValueError(f'SESSION_BACKEND inválido: {backend}')
+
+    app.session_interface = ServerSideSessionInterface(store)
+
+def revocar_sesiones_usuario(user_id) -> int:
+    """
+    Elimina todas las sesiones activas de un usuario en todos los workers que comparten el almacén.
+    Con sesiones en cookie no es posible revocarlas y regresa 0.
+    """
+    interface = current_app.session_interface
+    if not isinstance(interface, ServerSideSessionInterface):
+        return 0
+    return interface.store.delete_user(user_id)
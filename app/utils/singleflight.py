@@ -0,0 +1,262 @@
+"""
+Agrupación de llamadas concurrentes idénticas (single-flight).
+
+Cuando varias peticiones piden lo mismo al mismo tiempo (p. ej. todos los maestros de un grupo
+al abrir el periodo), solo la primera ejecuta la llamada y las demás esperan su resultado.
+
+- SingleFlight agrupa por una llave arbitraria; las cachés lo usan para que un fallo de caché
+  concurrente se recargue una sola vez.
+- TransporteCoalescido agrupa las lecturas (GET/HEAD) a PostgREST con la misma consulta
+  normalizada, en clientes síncronos y asíncronos. Cualquier escritura, al enviarse y al
+  terminar, hace que las lecturas siguientes ya no se unan a las que estaban en curso, para
+  que vean lo que se escribió.
+- singleflight_calls_total y singleflight_coalescing_ratio en /metrics muestran qué fracción
+  de las llamadas se resolvió esperando a otra.
+
+SINGLEFLIGHT_ENABLED=false desactiva la agrupación de consultas a PostgREST.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import CancelledError, Future
+from typing import Callable, Dict
+import httpx
+from app.utils.metrics import Counter, GaugeCalculado, registrar_metrica
+from app.utils.supabase_transport import max_obsolescencia_peticion, tabla_de_url
+
+SINGLEFLIGHT_ENABLED = os.environ.get('SINGLEFLIGHT_ENABLED', 'true').lower() in ('true', '1', 'si', 'sí')
+
+# Headers de la petición que cambian la respuesta de PostgREST y forman parte de la llave
+HEADERS_LLAVE = ('accept', 'accept-profile', 'prefer', 'range', 'range-unit', 'authorization', 'apikey')
+
+# Headers de la respuesta que ya no aplican al cuerpo leído (descomprimido) que se comparte
+HEADERS_DESCARTADOS = ('content-encoding', 'content-length', 'transfer-encoding')
+
+class _Vuelo:
+    __slots__ = ('futuro', 'hilo')
+
+    def __init__(self):
+        self.futuro = Future()
+        self.hilo = threading.get_ident()
+
+class SingleFlight:
+    """
+    Ejecuta una sola vez las llamadas concurrentes con la misma llave; las demás reciben el
+    mismo resultado (o la misma excepción). Funciona entre hilos y entre event loops.
+    """
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self._vuelos: Dict[object, _Vuelo] = {}
+        self._lock = threading.Lock()
+
+    def _tomar(self, llave, esperar_bloqueando: bool):
+        """Regresa (vuelo, es_lider). Con vuelo None la llamada se ejecuta sin agruparse."""
+        with self._lock:
+            vuelo = self._vuelos.get(llave)
+            if vuelo is None:
+                vuelo = self._vuelos[llave] = _Vuelo()
+                return vuelo, True
+        # Esperar bloqueando al líder del mismo hilo sería un deadlock (una vista async que
+        # llama al cliente síncrono mientras otra corrutina del mismo loop hace la consulta)
+        if esperar_bloqueando and vuelo.hilo == threading.get_ident():
+            return None, True
+        return vuelo, False
+
+    def _terminar(self, llave, vuelo: _Vuelo) -> None:
+        with self._lock:
+            if self._vuelos.get(llave) is vuelo:
+                del self._vuelos[llave]
+
+    def hacer(self, llave, funcion: Callable, tabla: str = ''):
+        """Ejecuta `funcion()` o espera a la llamada en curso con la misma llave."""
+        while True:
+            vuelo, lider = self._tomar(llave, esperar_bloqueando=True)
+            if vuelo is None:
+                singleflight_calls_total.inc((self.nombre, tabla, 'leader'))
+                return funcion()
+            if lider:
+                return self._liderar(llave, vuelo, funcion, tabla)
+            singleflight_calls_total.inc((self.nombre, tabla, 'follower'))
+            try:
+                return vuelo.futuro.result()
+            except CancelledError:
+                if not vuelo.futuro.cancelled():
+                    raise
+                # El líder se canceló: se vuelve a intentar, quizá ahora como líder
+
+    def _liderar(self, llave, vuelo: _Vuelo, funcion: Callable, tabla: str):
+        singleflight_calls_total.inc((self.nombre, tabla, 'leader'))
+        try:
+            resultado = funcion()
+        except Exception as e:
+            self._terminar(llave, vuelo)
+            vuelo.futuro.set_exception(e)
+            raise
+        except BaseException:
+            self._abandonar(llave, vuelo)
+            raise
+        self._terminar(llave, vuelo)
+        vuelo.futuro.set_result(resultado)
+        return resultado
+
+    async def hacer_async(self, llave, funcion: Callable, tabla: str = ''):
+        """Versión async de hacer(): `funcion()` regresa la corrutina a esperar."""
+        while True:
+            vuelo, lider = self._tomar(llave, esperar_bloqueando=False)
+            if lider:
+                return await self._liderar_async(llave, vuelo, funcion, tabla)
+            singleflight_calls_total.inc((self.nombre, tabla, 'follower'))
+            try:
+                # shield: si se cancela esta petición, el resultado sigue llegando a las demás
+                return await asyncio.shield(asyncio.wrap_future(vuelo.futuro))
+            except asyncio.CancelledError:
+                if not vuelo.futuro.cancelled():
+                    raise
+                # El líder se canceló: se vuelve a intentar, quizá ahora como líder
+
+    async def _liderar_async(self, llave, vuelo: _Vuelo, funcion: Callable, tabla: str):
+        singleflight_calls_total.inc((self.nombre, tabla, 'leader'))
+        try:
+            resultado = await funcion()
+        except Exception as e:
+            self._terminar(llave, vuelo)
+            vuelo.futuro.set_exception(e)
+            raise
+        except BaseException:
+            self._abandonar(llave, vuelo)
+            raise
+        self._terminar(llave, vuelo)
+        vuelo.futuro.set_result(resultado)
+        return resultado
+
+    def _abandonar(self, llave, vuelo: _Vuelo) -> None:
+        """
+        El líder se canceló (p. ej. en_paralelo_async canceló su tarea): la cancelación no es de
+        los que esperan, así que se cancela el vuelo para que repitan la llamada por su cuenta.
+        """
+        self._terminar(llave, vuelo)
+        vuelo.futuro.cancel()
+
+    def olvidar(self, llave=None) -> None:
+        """
+        Hace que las llamadas siguientes con la llave (o con cualquiera si no se indica) ya no
+        se unan a la que está en curso. Se usa al invalidar, porque ese resultado puede ser viejo.
+        """
+        with self._lock:
+            if llave is None:
+                self._vuelos.clear()
+            else:
+                self._vuelos.pop(llave, None)
+
+def llave_consulta(request: httpx.Request) -> tuple:
+    """
+    Llave de una lectura a PostgREST: los parámetros se ordenan, porque el orden de los
+    filtros no cambia la respuesta, y se incluyen los headers que sí la cambian.
+    """
+    url = request.url
+    return (
+        request.method,
+        url.host,
+        url.path,
+        tuple(sorted(url.params.multi_items())),
+        tuple((nombre, request.headers.get(nombre, '')) for nombre in HEADERS_LLAVE)
+    )
+
+class RespuestaLeida:
+    """Respuesta de PostgREST ya leída, de la que se hace una copia por cada petición."""
+    __slots__ = ('status', 'headers', 'contenido')
+
+    def __init__(self, response: httpx.Response):
+        self.status = response.status_code
+        self.headers = [(nombre, valor) for nombre, valor in response.headers.multi_items()
+                        if nombre.lower() not in HEADERS_DESCARTADOS]
+        self.contenido = response.content
+
+    def respuesta(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(self.status, headers=self.headers, content=self.contenido, request=request)
+
+class TransporteCoalescido(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Transporte httpx que agrupa las lecturas concurrentes idénticas en una sola llamada al
+    transporte que envuelve. Cada petición recibe su propia copia de la respuesta.
+    """
+    def __init__(self, transport, vuelos: SingleFlight = None):
+        self._transport = transport
+        self._vuelos = vuelos or consultas_en_vuelo
+
+    def _agrupable(self, request: httpx.Request) -> bool:
+        if request.method in ('GET', 'HEAD'):
+            return True
+        # Una escritura puede cambiar el resultado de cualquier lectura en curso (también
+        # de las que la embeben), así que ninguna lectura siguiente debe unirse a ellas
+        self._vuelos.olvidar()
+        return False
+
+    def _llave(self, request: httpx.Request) -> tuple:
+        # Solo se agrupan lecturas que aceptan la misma respuesta vieja, si el líder recibe una
+        return llave_consulta(request), max_obsolescencia_peticion()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not self._agrupable(request):
+            try:
+                return self._transport.handle_request(request)
+            finally:
+                # Las lecturas que empezaron mientras la escritura estaba en curso pueden no verla
+                self._vuelos.olvidar()
+
+        def consultar():
+            response = self._transport.handle_request(request)
+            try:
+                response.read()
+            finally:
+                response.close()
+            return RespuestaLeida(response)
+
+        leida = self._vuelos.hacer(self._llave(request), consultar, tabla_de_url(request.url))
+        return leida.respuesta(request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not self._agrupable(request):
+            try:
+                return await self._transport.handle_async_request(request)
+            finally:
+                self._vuelos.olvidar()
+
+        async def consultar():
+            response = await self._transport.handle_async_request(request)
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+            return RespuestaLeida(response)
+
+        leida = await self._vuelos.hacer_async(self._llave(request), consultar, tabla_de_url(request.url))
+        return leida.respuesta(request)
+
+    def close(self) -> None:
+        self._transport.close()
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+def con_coalescencia(transport):
+    """Envuelve el transporte con TransporteCoalescido salvo que SINGLEFLIGHT_ENABLED sea false."""
+    return TransporteCoalescido(transport) if SINGLEFLIGHT_ENABLED else transport
+
+def _proporciones() -> dict:
+    totales: Dict[tuple, list] = {}
+    for (nombre, tabla, resultado), valor in singleflight_calls_total.valores().items():
+        conteo = totales.setdefault((nombre, tabla), [0, 0])
+        conteo[resultado == 'follower'] += valor
+    return {serie: round(seguidores / (lideres + seguidores), 4)
+            for serie, (lideres, seguidores) in totales.items() if lideres + seguidores}
+
+# Lecturas a PostgREST de todos los clientes del proceso
+consultas_en_vuelo = SingleFlight('upstream')
+
+singleflight_calls_total = registrar_metrica(Counter(
+    'singleflight_calls_total', 'Llamadas agrupadas por single-flight: leader las ejecuta, '
+    'follower espera el resultado de otra', ('flight', 'table', 'result')))
+singleflight_coalescing_ratio = registrar_metrica(GaugeCalculado(
+    'singleflight_coalescing_ratio', 'Fracción de las llamadas que se resolvió esperando a otra en curso',
+    ('flight', 'table'), _proporciones))
@@ -1,5 +1,55 @@
 import os
-from supabase import create_client, Client
+import asyncio
+import weakref
+from supabase import Client
+from postgrest import AsyncPostgrestClient
+import httpx
+from app.utils.supabase_transport import TransporteInstrumentado
+from app.utils.replica import con_replica
+from app.utils.singleflight import con_coalescencia
+from app.utils.resiliencia import con_resiliencia
+
+def _transporte_postgrest(base):
+    """
+    Cadena de transportes de PostgREST, de afuera hacia adentro: réplica local, agrupación de
+    lecturas idénticas, resiliencia (deadline, reintentos, circuit breaker) e instrumentación.
+    """
+    return con_replica(con_coalescencia(con_resiliencia(TransporteInstrumentado(base))))
+
+class _ClienteInstrumentado(Client):
+    """
+    Cliente de Supabase cuyas llamadas a PostgREST pasan por la cadena de _transporte_postgrest.
+    Si `transporte_base` está definido (backend en memoria), PostgREST y Storage lo usan
+    en lugar de la red.
+    """
+    transporte_base: httpx.BaseTransport = None
+
+    @property
+    def postgrest(self):
+        if self._postgrest is None:
+            http_client = httpx.Client(
+                transport=_transporte_postgrest(self.transporte_base or httpx.HTTPTransport(http2=True)),
+                timeout=self.options.postgrest_client_timeout,
+                follow_redirects=True
+            )
+            self._postgrest = self._init_postgrest_client(
+                rest_url=self.rest_url,
+                headers=self.options.headers,
+                schema=self.options.schema,
+                http_client=http_client
+            )
+        return self._postgrest
+
+    @property
+    def storage(self):
+        if self._storage is None and self.transporte_base is not None:
+            self._storage = self._init_storage_client(
+                storage_url=self.storage_url,
+                headers=self.options.headers,
+                http_client=httpx.Client(transport=self.transporte_base)
+            )
+        return super().storage
+
 
 class supabaseConnection:
     """
@@ -10,7 +60,17 @@ class supabaseConnection:
     def __init__(self):
         self.url: str = os.environ.get("SUPABASE_URL")
         self.key: str = os.environ.get("SUPABASE_KEY")
-        self.supabase: Client = create_client(self.url, self.key)
+        # SUPABASE_BACKEND=memory usa un backend en memoria para pruebas y benchmarks
+        self.fake = None
+        if os.environ.get("SUPABASE_BACKEND") == "memory":
+            # Solo se importa con el backend en memoria: en producción no se carga
+            from app.utils.fake_supabase import FakeSupabase
+            self.fake = FakeSupabase.desde_entorno()
+            self.url = self.url or "http://localhost:54321"
+            self.key = self.key or "fake-key"
+        self.supabase: Client = _ClienteInstrumentado.create(self.url, self.key)
+        self.supabase.transporte_base = self.fake
+        self._clientes_async = weakref.WeakKeyDictionary()
     
     @classmethod
     def get_instance(cls) -> 'supabaseConnection':
@@ -26,4 +86,26 @@ class supabaseConnection:
         """
         Método para obtener el cliente de Supabase.
         """
-        return self.supabase
\ No newline at end of file
+        return self.supabase
+
+    def get_async_client(self) -> AsyncPostgrestClient:
+        """
+        Método para obtener un cliente PostgREST asíncrono para vistas `async def`.
+        Se crea uno por event loop, porque httpx.AsyncClient no puede compartirse entre loops.
+        """
+        loop = asyncio.get_running_loop()
+        cliente = self._clientes_async.get(loop)
+        if cliente is None:
+            http_client = httpx.AsyncClient(
+                transport=_transporte_postgrest(self.fake or httpx.AsyncHTTPTransport(http2=True)),
+                timeout=self.supabase.options.postgrest_client_timeout,
+                follow_redirects=True
+            )
+            cliente = AsyncPostgrestClient(
+                self.supabase.rest_url,
+                headers=self.supabase.options.headers,
+                schema=self.supabase.options.schema,
+                http_client=http_client
+            )
+            self._clientes_async[loop] = cliente
+        return cliente
\ No newline at end of file
@@ -0,0 +1,122 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Callable, List, NamedTuple, Optional
+import httpx
+from flask import g, has_request_context
+
+class ConsultaUpstream(NamedTuple):
+    """Resumen de una llamada HTTP hecha por el cliente PostgREST."""
+    metodo: str
+    tabla: str
+    params: tuple
+    duracion: float
+    status: int
+
+    @property
+    def error(self) -> bool:
+        return self.status == 0 or self.status >= 400
+
+_listeners: List[Callable[[ConsultaUpstream], None]] = []
+
+def registrar_listener(listener: Callable[[ConsultaUpstream], None]) -> None:
+    """Registra una función que recibe cada ConsultaUpstream al terminar."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+def eliminar_listener(listener: Callable[[ConsultaUpstream], None]) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+_lecturas_autoritativas = contextvars.ContextVar('lecturas_autoritativas', default=False)
+
+@contextmanager
+def lecturas_autoritativas():
+    """
+    Las lecturas dentro del bloque van siempre a Supabase aunque el endpoint use la réplica local,
+    y nunca se responden con una respuesta vieja guardada (ver app.utils.resiliencia).
+    Para datos de autorización y pertenencia, que no deben resolverse con datos atrasados.
+    """
+    token = _lecturas_autoritativas.set(True)
+    try:
+        yield
+    finally:
+        _lecturas_autoritativas.reset(token)
+
+def es_lectura_autoritativa() -> bool:
+    return _lecturas_autoritativas.get()
+
+def max_obsolescencia_peticion() -> Optional[float]:
+    """
+    Antigüedad máxima (s) que la petición HTTP actual acepta en una respuesta vieja, o None si no
+    acepta ninguna. Fuera de una petición (sincronización de la réplica, feed de cambios) o dentro
+    de lecturas_autoritativas() siempre es None.
+    """
+    if es_lectura_autoritativa() or not has_request_context():
+        return None
+    return g.get('max_obsolescencia')
+
+def tabla_de_url(url: httpx.URL) -> str:
+    """
+    Obtiene el recurso de PostgREST a partir de la URL, p. ej. 'asignacion' o 'rpc/crear_maestro'.
+    """
+    path = url.path
+    marcador = '/rest/v1/'
+    if marcador in path:
+        path = path.split(marcador, 1)[1]
+    return path.strip('/') or '/'
+
+class TransporteInstrumentado(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Transporte httpx que mide cada llamada a PostgREST y notifica a los listeners registrados.
+    Todas las llamadas de `.execute()` del cliente pasan por aquí. Funciona con clientes
+    síncronos y asíncronos según el transporte que envuelva.
+    """
+    def __init__(self, transport):
+        self._transport = transport
+
+    def _notificar(self, request: httpx.Request, inicio: float, status: int) -> None:
+        consulta = ConsultaUpstream(
+            metodo=request.method,
+            tabla=tabla_de_url(request.url),
+            params=tuple(request.url.params.multi_items()),
+            duracion=time.perf_counter() - inicio,
+            status=status
+        )
+        for listener in list(_listeners):
+            listener(consulta)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not _listeners:
+            return self._transport.handle_request(request)
+
+        inicio = time.perf_counter()
+        status = 0
+        try:
+            response = self._transport.handle_request(request)
+            # Leer el cuerpo aquí para que la duración incluya la transferencia completa
+            response.read()
+            status = response.status_code
+            return response
+        finally:
+            self._notificar(request, inicio, status)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not _listeners:
+            return await self._transport.handle_async_request(request)
+
+        inicio = time.perf_counter()
+        status = 0
+        try:
+            response = await self._transport.handle_async_request(request)
+            await response.aread()
+            status = response.status_code
+            return response
+        finally:
+            self._notificar(request, inicio, status)
+
+    def close(self) -> None:
+        self._transport.close()
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
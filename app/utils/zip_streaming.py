@@ -0,0 +1,27 @@
+class SalidaStreaming:
+    """
+    Destino de escritura para ZipFile que solo acumula lo escrito hasta que se entrega.
+    No tiene tell() ni seek(), así que ZipFile escribe en modo streaming (con data descriptors)
+    y el archivo se puede enviar por partes sin crear un temporal.
+
+    Uso:
+        salida = SalidaStreaming()
+        with zipfile.ZipFile(salida, 'w') as archivo_zip:
+            archivo_zip.writestr(nombre, contenido)
+            yield salida.vaciar()
+        yield salida.vaciar()
+    """
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos) -> int:
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self) -> None:
+        pass
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
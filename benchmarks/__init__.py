@@ -0,0 +1 @@
+"""Benchmarks de la API contra el backend en memoria (SUPABASE_BACKEND=memory)."""
@@ -0,0 +1,162 @@
+"""
+Compara el throughput de las vistas de lectura de maestro servidas por WSGI con hilos
+(camino síncrono) contra el adaptador ASGI (app.asgi), con la misma latencia simulada de Supabase.
+
+- sync: `--hilos` hilos, cada uno con una petición en curso a la vez (como un worker gthread).
+- async: `--concurrencia` maestros virtuales en un solo event loop, sin hilos adicionales.
+
+Para cada modo reporta throughput, p50/p95/p99, hilos usados y pico de memoria, de modo que se
+puede comparar el throughput a igual memoria. La memoria se mide con tracemalloc en una corrida
+corta aparte, porque el trazado reduce mucho el throughput.
+
+Uso:
+    python -m benchmarks.async_vs_sync [--hilos 32] [--concurrencia 200] [--duracion 15] [--latencia-ms 20]
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+import tracemalloc
+from benchmarks.comun import (
+    crear_app_con_datos, guardar_resultados, iniciar_sesion, metadatos, preparar_entorno, resumen_latencias
+)
+
+def _rutas(asignaciones) -> list:
+    """Rutas de lectura de alto tráfico para un maestro."""
+    rutas = ['/v1/maestro/dashboard']
+    for asignacion in asignaciones:
+        rutas += [
+            f'/v1/maestro/grades/{asignacion.id_asignacion}/1',
+            f'/v1/maestro/groups/{asignacion.id_grupo}/students',
+            f'/v1/maestro/assignments/{asignacion.id_asignacion}/students',
+            f'/v1/maestro/assignments/{asignacion.id_asignacion}/schedule'
+        ]
+    return rutas
+
+def _resumen(latencias: list, errores: int, duracion: float, pico: int, hilos: int) -> dict:
+    return {
+        'peticiones': len(latencias),
+        'errores': errores,
+        'throughput_rps': round(len(latencias) / duracion, 2),
+        **resumen_latencias(latencias),
+        'hilos': hilos,
+        'pico_memoria_kb': round(pico / 1024, 1)
+    }
+
+def medir_sync(app, maestros: list, hilos: int, duracion: float, trazar: bool = False) -> dict:
+    latencias, errores = [], [0]
+    clientes = []
+    for id_maestro, asignaciones in maestros[:hilos]:
+        cliente = app.test_client()
+        iniciar_sesion(cliente, 'maestro', id_maestro)
+        clientes.append((cliente, _rutas(asignaciones)))
+
+    fin = time.perf_counter() + duracion
+
+    def trabajador(cliente, rutas, semilla):
+        rng = random.Random(semilla)
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            response = cliente.get(rng.choice(rutas))
+            latencias.append(time.perf_counter() - inicio)
+            if response.status_code != 200:
+                errores[0] += 1
+
+    if trazar:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    trabajadores = [
+        threading.Thread(target=trabajador, args=(cliente, rutas, i)) for i, (cliente, rutas) in enumerate(clientes)
+    ]
+    for trabajador_hilo in trabajadores:
+        trabajador_hilo.start()
+    for trabajador_hilo in trabajadores:
+        trabajador_hilo.join()
+    total = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1] if trazar else 0
+    tracemalloc.stop()
+    return _resumen(latencias, errores[0], total, pico, len(trabajadores))
+
+async def _medir_async(asgi, maestros: list, concurrencia: int, duracion: float, trazar: bool = False) -> dict:
+    import httpx
+    from benchmarks.dataset import CONTRASENA
+
+    transporte = httpx.ASGITransport(app=asgi)
+    clientes = []
+    for id_maestro, asignaciones in maestros[:concurrencia]:
+        cliente = httpx.AsyncClient(transport=transporte, base_url='http://benchmark')
+        await cliente.post('/v1/maestro/login', json={'id_usuario': id_maestro, 'contrasena': CONTRASENA})
+        clientes.append((cliente, _rutas(asignaciones)))
+
+    latencias, errores = [], [0]
+    fin = time.perf_counter() + duracion
+
+    async def usuario(cliente, rutas, semilla):
+        rng = random.Random(semilla)
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            response = await cliente.get(rng.choice(rutas))
+            latencias.append(time.perf_counter() - inicio)
+            if response.status_code != 200:
+                errores[0] += 1
+
+    if trazar:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    await asyncio.gather(*[usuario(cliente, rutas, i) for i, (cliente, rutas) in enumerate(clientes)])
+    total = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1] if trazar else 0
+    tracemalloc.stop()
+
+    for cliente, _ in clientes:
+        await cliente.aclose()
+    return _resumen(latencias, errores[0], total, pico, 1)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Throughput de las vistas de lectura: WSGI con hilos vs ASGI')
+    parser.add_argument('--hilos', type=int, default=32, help='Hilos del camino síncrono')
+    parser.add_argument('--concurrencia', type=int, default=200, help='Peticiones en curso del camino asíncrono')
+    parser.add_argument('--duracion', type=float, default=15, help='Segundos por modo')
+    parser.add_argument('--duracion-memoria', type=float, default=3, help='Segundos de la corrida con tracemalloc')
+    parser.add_argument('--escala', type=float, default=1.0)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--latencia-ms', type=float, default=20, help='Latencia simulada por llamada a Supabase')
+    parser.add_argument('--jitter-ms', type=float, default=5)
+    parser.add_argument('--salida', help='Archivo JSON de salida')
+    args = parser.parse_args(argv)
+
+    preparar_entorno(args.latencia_ms, args.jitter_ms)
+    # El login no se mide; se usan pocas rondas de bcrypt para crear las sesiones rápido
+    app, _, institucion = crear_app_con_datos(args.escala, args.semilla, rondas_bcrypt=4)
+    from app.asgi import AsgiFlask
+
+    maestros = [(id_maestro, asignaciones) for id_maestro, asignaciones in institucion.maestros.items() if asignaciones]
+    random.Random(args.semilla).shuffle(maestros)
+
+    print(f'sync: {args.hilos} hilos durante {args.duracion:.0f} s')
+    sync = medir_sync(app, maestros, args.hilos, args.duracion)
+    sync['pico_memoria_kb'] = medir_sync(app, maestros, args.hilos, args.duracion_memoria, True)['pico_memoria_kb']
+
+    print(f'async: {args.concurrencia} peticiones en curso durante {args.duracion:.0f} s')
+    asgi = AsgiFlask(app)
+    asincrono = asyncio.run(_medir_async(asgi, maestros, args.concurrencia, args.duracion))
+    asincrono['pico_memoria_kb'] = asyncio.run(
+        _medir_async(asgi, maestros, args.concurrencia, args.duracion_memoria, True)
+    )['pico_memoria_kb']
+
+    for modo, datos in (('sync', sync), ('async', asincrono)):
+        print(f'  {modo:<6} {datos["throughput_rps"]:>8.1f} req/s  p50={datos["p50_ms"]:>8.2f} ms  '
+              f'p95={datos["p95_ms"]:>8.2f} ms  p99={datos["p99_ms"]:>8.2f} ms  hilos={datos["hilos"]:<3} '
+              f'memoria={datos["pico_memoria_kb"]:.0f} KB  errores={datos["errores"]}')
+
+    resultados = {
+        'meta': metadatos(hilos=args.hilos, concurrencia=args.concurrencia, duracion=args.duracion,
+                          escala=args.escala, semilla=args.semilla, latencia_ms=args.latencia_ms,
+                          jitter_ms=args.jitter_ms),
+        'resultados': {'sync': sync, 'async': asincrono}
+    }
+    print(f'Resultados guardados en {guardar_resultados(resultados, args.salida, "async_vs_sync")}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""
+Simulación de carga de la última hora antes del cierre de un parcial.
+
+Cada maestro virtual inicia sesión con /login y repite el flujo de captura sobre sus
+asignaciones: verificar la ventana (`/check`), consultar calificaciones y subirlas, con
+tiempos de espera exponenciales entre pasos. Los maestros arrancan escalonados durante la rampa.
+
+Uso:
+    python -m benchmarks.cierre_parcial [--maestros 200] [--duracion 60] [--rampa 10]
+                                        [--pensar-ms 1500] [--latencia-ms 20]
+                                        [--url http://localhost:5001]
+
+Sin --url se usa la app en el mismo proceso con el backend en memoria. Con --url se ataca un
+servidor levantado con `python -m benchmarks.servidor` (misma escala y semilla).
+"""
+import argparse
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import List, NamedTuple
+from benchmarks.comun import guardar_resultados, metadatos, preparar_entorno, resumen_latencias
+
+class Medicion(NamedTuple):
+    operacion: str
+    inicio: float
+    duracion: float
+    resultado: str  # código HTTP o nombre de la excepción
+
+class _ClienteHttp:
+    """Adaptador para usar httpx con la misma interfaz que el cliente de pruebas de Flask."""
+    def __init__(self, url: str):
+        import httpx
+        self._cliente = httpx.Client(base_url=url, timeout=30)
+
+    def peticion(self, metodo: str, ruta: str, cuerpo=None) -> int:
+        return self._cliente.request(metodo, ruta, json=cuerpo).status_code
+
+class _ClienteFlask:
+    def __init__(self, app):
+        self._cliente = app.test_client()
+
+    def peticion(self, metodo: str, ruta: str, cuerpo=None) -> int:
+        return self._cliente.open(ruta, method=metodo, json=cuerpo).status_code
+
+class MaestroVirtual(threading.Thread):
+    def __init__(self, cliente, id_maestro: str, asignaciones: list, inicio: float, fin: float,
+                 pensar_ms: float, semilla: int, mediciones: List[Medicion]):
+        super().__init__(daemon=True)
+        self.cliente = cliente
+        self.id_maestro = id_maestro
+        self.asignaciones = asignaciones
+        self.inicio = inicio
+        self.fin = fin
+        self.pensar_ms = pensar_ms
+        self.rng = random.Random(semilla)
+        self.mediciones = mediciones
+
+    def _pensar(self, factor: float = 1.0) -> None:
+        if self.pensar_ms <= 0:
+            return
+        media = self.pensar_ms * factor / 1000
+        espera = min(self.rng.expovariate(1 / media), media * 5)
+        time.sleep(max(0.0, min(espera, self.fin - time.perf_counter())))
+
+    def _medir(self, operacion: str, metodo: str, ruta: str, cuerpo=None) -> str:
+        inicio = time.perf_counter()
+        try:
+            resultado = str(self.cliente.peticion(metodo, ruta, cuerpo))
+        except Exception as e:
+            resultado = type(e).__name__
+        # list.append es atómico, no hace falta lock
+        self.mediciones.append(Medicion(operacion, inicio, time.perf_counter() - inicio, resultado))
+        return resultado
+
+    def run(self) -> None:
+        from benchmarks.dataset import CONTRASENA
+
+        time.sleep(max(0.0, self.inicio - time.perf_counter()))
+        if self._medir('login', 'POST', '/v1/maestro/login',
+                       {'id_usuario': self.id_maestro, 'contrasena': CONTRASENA}) != '200':
+            return
+
+        while time.perf_counter() < self.fin:
+            asignacion = self.rng.choice(self.asignaciones)
+            base = f'/v1/maestro/grades/{asignacion.id_asignacion}/1'
+
+            self._medir('check', 'GET', f'{base}/check')
+            self._pensar()
+            if time.perf_counter() >= self.fin:
+                break
+            self._medir('consultar', 'GET', base)
+            self._pensar(2)
+            if time.perf_counter() >= self.fin:
+                break
+            calificaciones = [
+                {'id_alumno': id_alumno, 'calificacion': round(self.rng.uniform(5, 10), 1)}
+                for id_alumno in asignacion.alumnos
+            ]
+            self._medir('subir', 'POST', base, calificaciones)
+            self._pensar(3)
+
+def reporte(mediciones: List[Medicion], inicio: float, fin: float) -> dict:
+    """Throughput, latencias por operación y desglose de errores."""
+    duracion = max(fin - inicio, 1e-9)
+    por_operacion = defaultdict(list)
+    errores = defaultdict(lambda: defaultdict(int))
+    for medicion in mediciones:
+        por_operacion[medicion.operacion].append(medicion.duracion)
+        if not medicion.resultado.startswith('2'):
+            errores[medicion.operacion][medicion.resultado] += 1
+
+    operaciones = {
+        operacion: {
+            'peticiones': len(duraciones),
+            'throughput_rps': round(len(duraciones) / duracion, 2),
+            **resumen_latencias(duraciones),
+            'errores': sum(errores.get(operacion, {}).values())
+        }
+        for operacion, duraciones in por_operacion.items()
+    }
+    total_errores = sum(sum(e.values()) for e in errores.values())
+    return {
+        'duracion_s': round(duracion, 2),
+        'peticiones': len(mediciones),
+        'throughput_rps': round(len(mediciones) / duracion, 2),
+        'tasa_error': round(total_errores / len(mediciones), 4) if mediciones else 0.0,
+        **resumen_latencias([m.duracion for m in mediciones]),
+        'operaciones': operaciones,
+        'errores': {operacion: dict(detalle) for operacion, detalle in errores.items()}
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Carga de captura de calificaciones antes del cierre de parcial')
+    parser.add_argument('--maestros', type=int, default=200, help='Maestros virtuales concurrentes')
+    parser.add_argument('--duracion', type=float, default=60, help='Segundos de carga, incluyendo la rampa')
+    parser.add_argument('--rampa', type=float, default=10, help='Segundos para arrancar a todos los maestros')
+    parser.add_argument('--pensar-ms', type=float, default=1500, help='Tiempo medio de espera entre pasos')
+    parser.add_argument('--escala', type=float, default=1.0)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--latencia-ms', type=float, default=20, help='Latencia simulada por llamada a Supabase')
+    parser.add_argument('--jitter-ms', type=float, default=10)
+    parser.add_argument('--rondas-bcrypt', type=int,
+                        help='Rondas de bcrypt de los usuarios sintéticos (por defecto 12, como en producción)')
+    parser.add_argument('--url', help='URL de un servidor de benchmarks.servidor en lugar de la app en proceso')
+    parser.add_argument('--salida', help='Archivo JSON de salida')
+    args = parser.parse_args(argv)
+
+    preparar_entorno(args.latencia_ms, args.jitter_ms)
+    if args.url:
+        from app.utils.fake_supabase import FakeSupabase
+        from benchmarks.dataset import generar_institucion
+        # Solo se necesitan los IDs; el servidor generó los mismos datos con la misma semilla
+        institucion = generar_institucion(FakeSupabase(), escala=args.escala, semilla=args.semilla, rondas_bcrypt=4)
+        crear_cliente = lambda: _ClienteHttp(args.url)
+    else:
+        from benchmarks.comun import crear_app_con_datos
+        app, _, institucion = crear_app_con_datos(args.escala, args.semilla, args.rondas_bcrypt)
+        crear_cliente = lambda: _ClienteFlask(app)
+
+    maestros = [(id_maestro, asignaciones) for id_maestro, asignaciones in institucion.maestros.items() if asignaciones]
+    maestros = random.Random(args.semilla).sample(maestros, min(args.maestros, len(maestros)))
+
+    mediciones: List[Medicion] = []
+    inicio = time.perf_counter()
+    fin = inicio + args.duracion
+    hilos = [
+        MaestroVirtual(crear_cliente(), id_maestro, asignaciones, inicio + args.rampa * i / len(maestros), fin,
+                       args.pensar_ms, args.semilla + i, mediciones)
+        for i, (id_maestro, asignaciones) in enumerate(maestros)
+    ]
+    print(f'Iniciando {len(hilos)} maestros virtuales durante {args.duracion:.0f} s '
+          f'(rampa {args.rampa:.0f} s, espera media {args.pensar_ms:.0f} ms)')
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    resumen = reporte(mediciones, inicio, time.perf_counter())
+
+    print(f'{resumen["peticiones"]} peticiones, {resumen["throughput_rps"]} req/s, '
+          f'tasa de error {resumen["tasa_error"]:.2%}')
+    for operacion, datos in resumen['operaciones'].items():
+        print(f'  {operacion:<10} n={datos["peticiones"]:<6} {datos["throughput_rps"]:>7.2f} req/s  '
+              f'p50={datos["p50_ms"]:>8.2f} ms  p95={datos["p95_ms"]:>8.2f} ms  p99={datos["p99_ms"]:>8.2f} ms  '
+              f'errores={datos["errores"]}')
+    if resumen['errores']:
+        print(f'  Errores: {resumen["errores"]}')
+
+    resultados = {
+        'meta': metadatos(maestros=len(hilos), duracion=args.duracion, rampa=args.rampa, pensar_ms=args.pensar_ms,
+                          escala=args.escala, semilla=args.semilla, latencia_ms=args.latencia_ms,
+                          jitter_ms=args.jitter_ms, url=args.url),
+        'resultados': resumen
+    }
+    print(f'Resultados guardados en {guardar_resultados(resultados, args.salida, "cierre_parcial")}')
+
+if __name__ == '__main__':
+    main()
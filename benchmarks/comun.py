@@ -0,0 +1,96 @@
+"""
+Utilidades compartidas por los escenarios de benchmark.
+
+`preparar_entorno` debe llamarse antes de importar cualquier módulo de `app`, porque la
+conexión a Supabase lee SUPABASE_BACKEND al crearse.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from typing import List
+
+DIRECTORIO_RESULTADOS = os.path.join(os.path.dirname(__file__), 'resultados')
+
+def preparar_entorno(latencia_ms: float = 0, jitter_ms: float = 0) -> None:
+    """Configura la app para usar el backend en memoria y sesiones en memoria."""
+    os.environ['SUPABASE_BACKEND'] = 'memory'
+    os.environ['FAKE_SUPABASE_LATENCY_MS'] = str(latencia_ms)
+    os.environ['FAKE_SUPABASE_JITTER_MS'] = str(jitter_ms)
+    os.environ.setdefault('SESSION_BACKEND', 'memory')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+def crear_app_con_datos(escala: float, semilla: int, rondas_bcrypt: int = None):
+    """
+    Crea la app y carga la institución sintética.
+
+    Returns:
+        (app, fake, institucion)
+    """
+    from app import create_app
+    from app.utils.supabase_connection import supabaseConnection
+    from benchmarks.dataset import generar_institucion
+
+    app = create_app()
+    fake = supabaseConnection.get_instance().fake
+    institucion = generar_institucion(fake, escala=escala, semilla=semilla, rondas_bcrypt=rondas_bcrypt)
+    return app, fake, institucion
+
+def iniciar_sesion(cliente, rol: str, id_usuario: str) -> None:
+    """Inicia sesión con el cliente de pruebas de Flask; lanza RuntimeError si falla."""
+    from benchmarks.dataset import CONTRASENA
+
+    response = cliente.post(f'/v1/{rol}/login', json={'id_usuario': id_usuario, 'contrasena': CONTRASENA})
+    if response.status_code != 200:
+        raise RuntimeError(f'No se pudo iniciar sesión como {id_usuario}: {response.status_code} {response.get_data(as_text=True)}')
+
+def percentil(ordenadas: List[float], p: float) -> float:
+    """Percentil por interpolación lineal sobre una lista ya ordenada."""
+    if not ordenadas:
+        return 0.0
+    posicion = (len(ordenadas) - 1) * p / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenadas) - 1)
+    return ordenadas[inferior] + (ordenadas[superior] - ordenadas[inferior]) * (posicion - inferior)
+
+def resumen_latencias(segundos: List[float]) -> dict:
+    """p50/p95/p99, media, mínimo y máximo en milisegundos."""
+    ordenadas = sorted(s * 1000 for s in segundos)
+    if not ordenadas:
+        return {'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'media_ms': 0.0, 'min_ms': 0.0, 'max_ms': 0.0}
+    return {
+        'p50_ms': round(percentil(ordenadas, 50), 3),
+        'p95_ms': round(percentil(ordenadas, 95), 3),
+        'p99_ms': round(percentil(ordenadas, 99), 3),
+        'media_ms': round(sum(ordenadas) / len(ordenadas), 3),
+        'min_ms': round(ordenadas[0], 3),
+        'max_ms': round(ordenadas[-1], 3)
+    }
+
+def metadatos(**parametros) -> dict:
+    """Información de la corrida para poder comparar resultados entre commits."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(__file__), timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'plataforma': platform.platform(),
+        'parametros': parametros
+    }
+
+def guardar_resultados(resultados: dict, salida: str, prefijo: str) -> str:
+    """Guarda el JSON en `salida` o en benchmarks/resultados/<prefijo>-<fecha>.json."""
+    if not salida:
+        os.makedirs(DIRECTORIO_RESULTADOS, exist_ok=True)
+        salida = os.path.join(DIRECTORIO_RESULTADOS, f'{prefijo}-{datetime.now():%Y%m%d-%H%M%S}.json')
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+    return salida
@@ -0,0 +1,147 @@
+"""
+Generador de una institución sintética para el backend en memoria (SUPABASE_BACKEND=memory).
+
+Con escala=1.0 genera 20k alumnos, 600 maestros, 400 grupos, 150 cursos, 3k asignaciones
+con horario y fechas parciales, y las calificaciones de todos los alumnos en cada asignación.
+La generación es determinista para una misma semilla.
+"""
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple
+import bcrypt
+from app.models.alumno_model import SexoEnum
+from app.models.base_model import DiaSemanaEnum
+
+# Todos los usuarios sintéticos comparten contraseña para no pagar bcrypt por cada uno
+CONTRASENA = 'benchmark'
+# Rondas del hash; 12 es el costo por defecto de bcrypt, el mismo que pagan los logins reales
+RONDAS_BCRYPT = int(os.environ.get('BENCHMARK_BCRYPT_ROUNDS', 12))
+ADMIN_ID = 'ADMIN0001'
+
+NOMBRES = ['Ana', 'Luis', 'María', 'José', 'Fernanda', 'Carlos', 'Sofía', 'Diego', 'Valeria', 'Jorge',
+           'Daniela', 'Miguel', 'Camila', 'Andrés', 'Lucía', 'Ricardo', 'Paola', 'Héctor', 'Regina', 'Emilio']
+APELLIDOS = ['García', 'Hernández', 'López', 'Martínez', 'González', 'Pérez', 'Rodríguez', 'Sánchez',
+             'Ramírez', 'Cruz', 'Flores', 'Gómez', 'Morales', 'Vázquez', 'Reyes', 'Jiménez', 'Torres', 'Ruiz']
+ESPECIALIDADES = ['Matemáticas', 'Física', 'Programación', 'Química', 'Administración', 'Idiomas']
+FACULTADES = ['Ingeniería', 'Ciencias', 'Contaduría', 'Derecho']
+
+class AsignacionSintetica(NamedTuple):
+    id_asignacion: int
+    id_grupo: str
+    alumnos: tuple
+
+class Institucion(NamedTuple):
+    """Resumen de lo generado, para que los escenarios sepan qué IDs usar."""
+    maestros: Dict[str, List[AsignacionSintetica]]
+    grupos: Dict[str, List[int]]
+    total_filas: Dict[str, int]
+    # id_maestro -> nombre y apellido paterno, para los escenarios de búsqueda por nombre
+    nombres_maestros: Dict[str, str]
+
+def _nombre(rng: random.Random) -> dict:
+    return {
+        'nombre': rng.choice(NOMBRES),
+        'apellido_paterno': rng.choice(APELLIDOS),
+        'apellido_materno': rng.choice(APELLIDOS)
+    }
+
+def generar_institucion(fake, escala: float = 1.0, semilla: int = 42, rondas_bcrypt: int = None) -> Institucion:
+    """
+    Carga la institución sintética en el backend en memoria `fake` y regresa su resumen.
+
+    El parcial 1 de todas las asignaciones queda abierto alrededor de la fecha actual,
+    el 2 y el 3 en el futuro.
+    """
+    rng = random.Random(semilla)
+    total_alumnos = max(1, int(20_000 * escala))
+    total_maestros = max(1, int(600 * escala))
+    total_grupos = max(1, int(400 * escala))
+    total_cursos = max(1, int(150 * escala))
+    total_asignaciones = max(1, int(3_000 * escala))
+
+    rondas = rondas_bcrypt or RONDAS_BCRYPT
+    hash_contrasena = bcrypt.hashpw(CONTRASENA.encode('utf-8'), bcrypt.gensalt(rondas)).decode('utf-8')
+    ids_maestros = [f'M{i:05d}' for i in range(1, total_maestros + 1)]
+    ids_grupos = [f'G{i:04d}' for i in range(1, total_grupos + 1)]
+    ids_cursos = [f'C{i:04d}' for i in range(1, total_cursos + 1)]
+
+    fake.cargar('usuario', [{'id_usuario': ADMIN_ID, 'contrasena': hash_contrasena, 'role': 'admin'}] + [
+        {'id_usuario': id_maestro, 'contrasena': hash_contrasena, 'role': 'maestro'} for id_maestro in ids_maestros
+    ])
+    filas_maestros = [
+        {'id_usuario': id_maestro, 'especialidad': rng.choice(ESPECIALIDADES),
+         'fecha_nacimiento': f'{rng.randint(1960, 1995)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+         **_nombre(rng)}
+        for id_maestro in ids_maestros
+    ]
+    fake.cargar('maestro', filas_maestros)
+    fake.cargar('grupo', [
+        {'id_grupo': id_grupo, 'nombre_grupo': f'{(i % 9) + 1}{chr(65 + i % 6)}-{i}',
+         'generacion': str(2020 + i % 6), 'facultad': rng.choice(FACULTADES)}
+        for i, id_grupo in enumerate(ids_grupos)
+    ])
+    fake.cargar('curso', [
+        {'id_curso': id_curso, 'nombre': f'Curso {i}', 'codigo': f'CUR{i:04d}', 'descripcion': f'Descripción del curso {i}'}
+        for i, id_curso in enumerate(ids_cursos, start=1)
+    ])
+
+    sexos = [sexo.value for sexo in SexoEnum]
+    grupos: Dict[str, List[int]] = {id_grupo: [] for id_grupo in ids_grupos}
+    alumnos = []
+    for i in range(total_alumnos):
+        id_alumno = 100_000 + i
+        id_grupo = ids_grupos[i % total_grupos]
+        grupos[id_grupo].append(id_alumno)
+        alumnos.append({
+            'id_alumno': id_alumno, 'id_grupo': id_grupo, 'sexo': rng.choice(sexos),
+            'fecha_nacimiento': f'{rng.randint(2000, 2007)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+            **_nombre(rng)
+        })
+    fake.cargar('alumno', alumnos)
+
+    ahora = datetime.now()
+    ventanas = {
+        1: (ahora - timedelta(days=7), ahora + timedelta(days=7)),
+        2: (ahora + timedelta(days=30), ahora + timedelta(days=44)),
+        3: (ahora + timedelta(days=60), ahora + timedelta(days=74)),
+    }
+    dias = [dia.value for dia in DiaSemanaEnum][:5]
+
+    maestros: Dict[str, List[AsignacionSintetica]] = {id_maestro: [] for id_maestro in ids_maestros}
+    asignaciones, horarios, fechas, calificaciones = [], [], [], []
+    for i in range(total_asignaciones):
+        id_asignacion = i + 1
+        id_grupo = ids_grupos[i % total_grupos]
+        id_maestro = ids_maestros[i % total_maestros]
+        asignaciones.append({
+            'id_asignacion': id_asignacion, 'id_curso': ids_cursos[i % total_cursos],
+            'id_grupo': id_grupo, 'id_maestro': id_maestro
+        })
+        maestros[id_maestro].append(AsignacionSintetica(id_asignacion, id_grupo, tuple(grupos[id_grupo])))
+
+        for dia in rng.sample(dias, 2):
+            hora = rng.randint(7, 18)
+            horarios.append({'id_asignacion': id_asignacion, 'dia_semana': dia,
+                             'hora_inicio': f'{hora:02d}:00', 'hora_fin': f'{hora + 2:02d}:00'})
+        for numero_parcial, (inicio, fin) in ventanas.items():
+            fechas.append({'id_asignacion': id_asignacion, 'numero_parcial': numero_parcial,
+                           'fecha_inicio': inicio.isoformat(), 'fecha_fin': fin.isoformat()})
+        for id_alumno in grupos[id_grupo]:
+            calificaciones.append({'id_alumno': id_alumno, 'id_asignacion': id_asignacion,
+                                   'parcial_1': round(rng.uniform(5, 10), 1)})
+
+    fake.cargar('asignacion', asignaciones)
+    fake.cargar('horario_asignacion', horarios)
+    fake.cargar('fechas_parciales', fechas)
+    fake.cargar('calificaciones', calificaciones)
+
+    total_filas = {
+        'usuario': total_maestros + 1, 'maestro': total_maestros, 'grupo': total_grupos, 'curso': total_cursos,
+        'alumno': total_alumnos, 'asignacion': total_asignaciones, 'horario_asignacion': len(horarios),
+        'fechas_parciales': len(fechas), 'calificaciones': len(calificaciones)
+    }
+    nombres_maestros = {
+        fila['id_usuario']: f"{fila['nombre']} {fila['apellido_paterno']}" for fila in filas_maestros
+    }
+    return Institucion(maestros, grupos, total_filas, nombres_maestros)
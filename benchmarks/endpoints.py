@@ -0,0 +1,147 @@
+"""
+Benchmark de los endpoints más pesados contra la institución sintética en memoria.
+
+Uso:
+    python -m benchmarks.endpoints [--escala 1.0] [--iteraciones 30] [--latencia-ms 0]
+                                   [--solo alumnos,dashboard_admin] [--salida resultados.json]
+                                   [--comparar resultados_anteriores.json]
+
+Por endpoint reporta p50/p95/p99, llamadas a Supabase por petición y el pico de memoria
+de una petición (medido con tracemalloc en una corrida aparte para no sesgar la latencia).
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from benchmarks.comun import (
+    crear_app_con_datos, guardar_resultados, iniciar_sesion, metadatos, preparar_entorno, resumen_latencias
+)
+
+def _escenarios(institucion) -> dict:
+    """nombre -> (rol, método, ruta, cuerpo JSON)"""
+    id_maestro, asignaciones = next(
+        (id_maestro, asignaciones) for id_maestro, asignaciones in institucion.maestros.items() if asignaciones
+    )
+    asignacion = asignaciones[0]
+    # Un maestro que sí existe: un nombre fijo puede no generarse y el escenario mediría un 404
+    nombre_maestro = institucion.nombres_maestros[id_maestro]
+    calificaciones = [
+        {'id_alumno': id_alumno, 'calificacion': 8.5} for id_alumno in asignacion.alumnos
+    ]
+    return {
+        'alumnos': ('admin', 'GET', '/v1/admin/alumnos', None),
+        'alumnos_por_nombre': ('admin', 'GET', '/v1/admin/alumnos/nombre/María López', None),
+        'maestros_por_nombre': ('admin', 'GET', f'/v1/admin/maestros/nombre/{nombre_maestro}', None),
+        'calificaciones_por_maestro': ('admin', 'GET', f'/v1/admin/grades/maestro/{id_maestro}', None),
+        'dashboard_admin': ('admin', 'GET', '/v1/admin/dashboard', None),
+        'asignaciones_maestro': ('maestro', 'GET', '/v1/maestro/assignments', None),
+        'dashboard_maestro': ('maestro', 'GET', '/v1/maestro/dashboard', None),
+        'subir_calificaciones': (
+            'maestro', 'POST', f'/v1/maestro/grades/{asignacion.id_asignacion}/1', calificaciones
+        ),
+    }, id_maestro
+
+def _ejecutar(cliente, metodo: str, ruta: str, cuerpo):
+    return cliente.open(ruta, method=metodo, json=cuerpo)
+
+def medir_endpoint(cliente, fake, metodo: str, ruta: str, cuerpo, iteraciones: int, calentamiento: int) -> dict:
+    for _ in range(calentamiento):
+        response = _ejecutar(cliente, metodo, ruta, cuerpo)
+        # Un escenario roto mediría la respuesta de error; se detiene en lugar de reportarlo
+        if response.status_code != 200:
+            raise RuntimeError(f'{metodo} {ruta} respondió {response.status_code} en el calentamiento: '
+                               f'{response.get_data(as_text=True)[:200]}')
+
+    latencias, llamadas, status = [], [], {}
+    bytes_respuesta = 0
+    for _ in range(iteraciones):
+        llamadas_antes = fake.total_llamadas
+        inicio = time.perf_counter()
+        response = _ejecutar(cliente, metodo, ruta, cuerpo)
+        latencias.append(time.perf_counter() - inicio)
+        llamadas.append(fake.total_llamadas - llamadas_antes)
+        status[str(response.status_code)] = status.get(str(response.status_code), 0) + 1
+        bytes_respuesta = len(response.get_data())
+
+    tracemalloc.start()
+    _ejecutar(cliente, metodo, ruta, cuerpo)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'metodo': metodo,
+        'ruta': ruta,
+        'iteraciones': iteraciones,
+        **resumen_latencias(latencias),
+        'llamadas_upstream': max(llamadas) if llamadas else 0,
+        'bytes_respuesta': bytes_respuesta,
+        'pico_memoria_kb': round(pico / 1024, 1),
+        'status': status
+    }
+
+def comparar(actual: dict, anterior: dict) -> str:
+    """Tabla de texto con la variación de p50/p95 y llamadas contra una corrida anterior."""
+    lineas = [f'{"endpoint":<28} {"p50 ms":>18} {"p95 ms":>18} {"llamadas":>10}']
+    for nombre, datos in actual['resultados'].items():
+        previo = anterior.get('resultados', {}).get(nombre)
+        if previo is None:
+            lineas.append(f'{nombre:<28} {datos["p50_ms"]:>18.2f} {datos["p95_ms"]:>18.2f} {datos["llamadas_upstream"]:>10}')
+            continue
+
+        def _delta(clave):
+            base = previo[clave] or 1e-9
+            return f'{datos[clave]:.2f} ({(datos[clave] - previo[clave]) / base:+.0%})'
+
+        llamadas = f'{previo["llamadas_upstream"]}->{datos["llamadas_upstream"]}'
+        lineas.append(f'{nombre:<28} {_delta("p50_ms"):>18} {_delta("p95_ms"):>18} {llamadas:>10}')
+    return '\n'.join(lineas)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de endpoints con backend en memoria')
+    parser.add_argument('--escala', type=float, default=1.0, help='Fracción del tamaño de la institución (1.0 = 20k alumnos)')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--iteraciones', type=int, default=30)
+    parser.add_argument('--calentamiento', type=int, default=3)
+    parser.add_argument('--latencia-ms', type=float, default=0, help='Latencia simulada por llamada a Supabase')
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--solo', help='Lista de escenarios separados por coma')
+    parser.add_argument('--salida', help='Archivo JSON de salida')
+    parser.add_argument('--comparar', help='JSON de una corrida anterior para mostrar la variación')
+    args = parser.parse_args(argv)
+
+    preparar_entorno(args.latencia_ms, args.jitter_ms)
+    inicio = time.perf_counter()
+    app, fake, institucion = crear_app_con_datos(args.escala, args.semilla)
+    print(f'Institución generada en {time.perf_counter() - inicio:.1f} s: {institucion.total_filas}')
+
+    escenarios, id_maestro = _escenarios(institucion)
+    if args.solo:
+        seleccion = set(args.solo.split(','))
+        escenarios = {nombre: e for nombre, e in escenarios.items() if nombre in seleccion}
+
+    from benchmarks.dataset import ADMIN_ID
+    clientes = {'admin': app.test_client(), 'maestro': app.test_client()}
+    iniciar_sesion(clientes['admin'], 'admin', ADMIN_ID)
+    iniciar_sesion(clientes['maestro'], 'maestro', id_maestro)
+
+    resultados = {
+        'meta': metadatos(escala=args.escala, semilla=args.semilla, iteraciones=args.iteraciones,
+                          latencia_ms=args.latencia_ms, jitter_ms=args.jitter_ms, filas=institucion.total_filas),
+        'resultados': {}
+    }
+    for nombre, (rol, metodo, ruta, cuerpo) in escenarios.items():
+        datos = medir_endpoint(clientes[rol], fake, metodo, ruta, cuerpo, args.iteraciones, args.calentamiento)
+        resultados['resultados'][nombre] = datos
+        print(f'{nombre:<28} p50={datos["p50_ms"]:>9.2f} ms  p95={datos["p95_ms"]:>9.2f} ms  '
+              f'p99={datos["p99_ms"]:>9.2f} ms  llamadas={datos["llamadas_upstream"]:<3} '
+              f'memoria={datos["pico_memoria_kb"]:.0f} KB  status={datos["status"]}')
+
+    salida = guardar_resultados(resultados, args.salida, 'endpoints')
+    print(f'Resultados guardados en {salida}')
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            print(comparar(resultados, json.load(f)))
+
+if __name__ == '__main__':
+    main()
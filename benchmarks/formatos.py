@@ -0,0 +1,149 @@
+"""
+Compara los formatos de respuesta de los endpoints de listado (ver app.utils.formatos):
+JSON por defecto, JSON columnar (?format=columnar) y MessagePack (Accept: application/msgpack).
+
+Por endpoint y formato reporta los bytes de la respuesta, el p50/p95 de la petición completa
+y el tiempo de codificar el mismo cuerpo fuera de Flask (solo la serialización).
+
+Uso:
+    python -m benchmarks.formatos [--escala 1.0] [--iteraciones 20] [--solo alumnos,asignaciones]
+                                  [--salida resultados.json]
+"""
+import argparse
+import time
+from benchmarks.comun import (
+    crear_app_con_datos, guardar_resultados, iniciar_sesion, metadatos, preparar_entorno, resumen_latencias
+)
+
+def _escenarios(institucion) -> dict:
+    """nombre -> (rol, ruta, clave de la lista en el cuerpo)"""
+    id_maestro, asignaciones = next(
+        (id_maestro, asignaciones) for id_maestro, asignaciones in institucion.maestros.items() if asignaciones
+    )
+    asignacion = asignaciones[0]
+    return {
+        'alumnos': ('admin', '/v1/admin/alumnos', 'data'),
+        'asignaciones': ('admin', '/v1/admin/asignaciones', 'data'),
+        'maestros': ('admin', '/v1/admin/maestros', 'data'),
+        'calificaciones_asignacion': (
+            'admin', f'/v1/admin/grades/assignments/{asignacion.id_asignacion}', 'data.calificaciones'
+        ),
+        'calificaciones_maestro': ('maestro', f'/v1/maestro/grades/{asignacion.id_asignacion}/1', 'data'),
+    }, id_maestro
+
+def _formatos() -> dict:
+    """formato -> (query string, headers)"""
+    from app.utils.formatos import msgpack
+
+    formatos = {
+        'json': ('', {}),
+        'columnar': ('?format=columnar', {}),
+    }
+    if msgpack is not None:
+        formatos['msgpack'] = ('', {'Accept': 'application/msgpack'})
+    return formatos
+
+def _codificadores(app) -> dict:
+    """formato -> función que serializa el cuerpo JSON ya armado"""
+    from app.utils.formatos import _reemplazar, msgpack
+
+    def columnar(cuerpo, clave):
+        return {**_reemplazar(cuerpo, clave.split('.')), 'formato': 'columnar'}
+
+    codificadores = {
+        'json': lambda cuerpo, clave: app.json.dumps(cuerpo).encode('utf-8'),
+        'columnar': lambda cuerpo, clave: app.json.dumps(columnar(cuerpo, clave)).encode('utf-8'),
+    }
+    if msgpack is not None:
+        codificadores['msgpack'] = lambda cuerpo, clave: msgpack.packb(columnar(cuerpo, clave), default=str)
+    return codificadores
+
+def medir_codificacion(codificar, cuerpo: dict, clave: str, iteraciones: int) -> dict:
+    tiempos = []
+    for _ in range(iteraciones):
+        inicio = time.perf_counter()
+        codificar(cuerpo, clave)
+        tiempos.append(time.perf_counter() - inicio)
+    resumen = resumen_latencias(tiempos)
+    return {'p50_ms': resumen['p50_ms'], 'p95_ms': resumen['p95_ms']}
+
+def medir_formato(cliente, ruta: str, query: str, headers: dict, iteraciones: int, calentamiento: int) -> dict:
+    for _ in range(calentamiento):
+        cliente.get(ruta + query, headers=headers)
+
+    latencias, status = [], {}
+    bytes_respuesta, content_type = 0, None
+    for _ in range(iteraciones):
+        inicio = time.perf_counter()
+        response = cliente.get(ruta + query, headers=headers)
+        latencias.append(time.perf_counter() - inicio)
+        status[str(response.status_code)] = status.get(str(response.status_code), 0) + 1
+        bytes_respuesta = len(response.get_data())
+        content_type = response.mimetype
+
+    resumen = resumen_latencias(latencias)
+    return {
+        'bytes_respuesta': bytes_respuesta,
+        'content_type': content_type,
+        'p50_ms': resumen['p50_ms'],
+        'p95_ms': resumen['p95_ms'],
+        'status': status
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bytes y tiempo de codificación por formato de respuesta')
+    parser.add_argument('--escala', type=float, default=1.0, help='Fracción del tamaño de la institución (1.0 = 20k alumnos)')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--iteraciones', type=int, default=20)
+    parser.add_argument('--calentamiento', type=int, default=2)
+    parser.add_argument('--solo', help='Lista de escenarios separados por coma')
+    parser.add_argument('--salida', help='Archivo JSON de salida')
+    args = parser.parse_args(argv)
+
+    preparar_entorno()
+    inicio = time.perf_counter()
+    app, fake, institucion = crear_app_con_datos(args.escala, args.semilla)
+    print(f'Institución generada en {time.perf_counter() - inicio:.1f} s: {institucion.total_filas}')
+
+    escenarios, id_maestro = _escenarios(institucion)
+    if args.solo:
+        seleccion = set(args.solo.split(','))
+        escenarios = {nombre: e for nombre, e in escenarios.items() if nombre in seleccion}
+
+    from benchmarks.dataset import ADMIN_ID
+    clientes = {'admin': app.test_client(), 'maestro': app.test_client()}
+    iniciar_sesion(clientes['admin'], 'admin', ADMIN_ID)
+    iniciar_sesion(clientes['maestro'], 'maestro', id_maestro)
+
+    formatos = _formatos()
+    codificadores = _codificadores(app)
+    if 'msgpack' not in formatos:
+        print('msgpack no está instalado: solo se comparan json y columnar')
+
+    resultados = {
+        'meta': metadatos(escala=args.escala, semilla=args.semilla, iteraciones=args.iteraciones,
+                          filas=institucion.total_filas),
+        'resultados': {}
+    }
+    for nombre, (rol, ruta, clave) in escenarios.items():
+        cuerpo = clientes[rol].get(ruta).get_json()
+        por_formato = {}
+        for formato, (query, headers) in formatos.items():
+            datos = medir_formato(clientes[rol], ruta, query, headers, args.iteraciones, args.calentamiento)
+            datos['codificacion'] = medir_codificacion(codificadores[formato], cuerpo, clave, args.iteraciones)
+            por_formato[formato] = datos
+
+        base = por_formato['json']['bytes_respuesta'] or 1
+        print(f'{nombre}:')
+        for formato, datos in por_formato.items():
+            datos['proporcion_bytes'] = round(datos['bytes_respuesta'] / base, 3)
+            print(f'  {formato:<9} bytes={datos["bytes_respuesta"]:>10} ({datos["proporcion_bytes"]:>5.0%})  '
+                  f'p50={datos["p50_ms"]:>8.2f} ms  codificación p50={datos["codificacion"]["p50_ms"]:>8.2f} ms  '
+                  f'status={datos["status"]}')
+        resultados['resultados'][nombre] = por_formato
+
+    salida = guardar_resultados(resultados, args.salida, 'formatos')
+    print(f'Resultados guardados en {salida}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""
+Servidor con la institución sintética precargada, para pruebas de carga contra un proceso real.
+
+Uso:
+    BENCHMARK_ESCALA=1.0 FAKE_SUPABASE_LATENCY_MS=20 python -m benchmarks.servidor --puerto 5001
+    SESSION_BACKEND=sqlite gunicorn -w 4 --threads 8 'benchmarks.servidor:crear_app()'
+
+Con varios workers cada uno tiene su propio backend en memoria (generado con la misma semilla,
+por lo que los IDs coinciden), pero las sesiones deben compartirse con SESSION_BACKEND=sqlite.
+"""
+import argparse
+import os
+from benchmarks.comun import crear_app_con_datos, preparar_entorno
+
+def crear_app():
+    preparar_entorno(
+        float(os.environ.get('FAKE_SUPABASE_LATENCY_MS', 0)),
+        float(os.environ.get('FAKE_SUPABASE_JITTER_MS', 0))
+    )
+    app, _, _ = crear_app_con_datos(
+        float(os.environ.get('BENCHMARK_ESCALA', 1.0)),
+        int(os.environ.get('BENCHMARK_SEMILLA', 42))
+    )
+    return app
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Servidor de la API con la institución sintética')
+    parser.add_argument('--puerto', type=int, default=5001)
+    args = parser.parse_args(argv)
+    crear_app().run(port=args.puerto, threaded=True)
+
+if __name__ == '__main__':
+    main()
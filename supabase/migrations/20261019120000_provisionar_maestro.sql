@@ -0,0 +1,66 @@
+-- Alta y baja de maestros en una sola transacción.
+--
+-- Se llaman desde el backend con supabase.rpc(...): una sola llamada a PostgREST, y si cualquier
+-- paso falla (ID duplicado, llave foránea) Postgres revierte ambos registros.
+
+-- Crea el usuario y su registro de maestro. Regresa {"usuario": {...}, "maestro": {...}}
+-- sin la contraseña. Un ID existente lanza unique_violation (23505, HTTP 409).
+create or replace function public.crear_maestro(datos_usuario jsonb, datos_maestro jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    nuevo_usuario public.usuario;
+    nuevo_maestro public.maestro;
+begin
+    insert into public.usuario
+    select * from jsonb_populate_record(null::public.usuario, datos_usuario)
+    returning * into nuevo_usuario;
+
+    insert into public.maestro
+    select * from jsonb_populate_record(
+        null::public.maestro,
+        datos_maestro || jsonb_build_object('id_usuario', nuevo_usuario.id_usuario)
+    )
+    returning * into nuevo_maestro;
+
+    return jsonb_build_object(
+        'usuario', to_jsonb(nuevo_usuario) - 'contrasena',
+        'maestro', to_jsonb(nuevo_maestro)
+    );
+end;
+$$;
+
+-- Elimina el maestro y su usuario. Regresa los registros eliminados (sin la contraseña).
+-- Si no existe lanza no_data_found (P0002); si aún tiene asignaciones o
+-- disponibilidad, la llave foránea lanza foreign_key_violation (23503, HTTP 409).
+create or replace function public.eliminar_maestro(maestro_id text)
+returns jsonb
+language plpgsql
+as $$
+declare
+    maestro_eliminado public.maestro;
+    usuario_eliminado public.usuario;
+begin
+    delete from public.maestro m where m.id_usuario = maestro_id
+    returning * into maestro_eliminado;
+
+    if not found then
+        raise exception 'Maestro % no encontrado', maestro_id using errcode = 'no_data_found';
+    end if;
+
+    delete from public.usuario u where u.id_usuario = maestro_id
+    returning * into usuario_eliminado;
+
+    return jsonb_build_object(
+        'usuario', to_jsonb(usuario_eliminado) - 'contrasena',
+        'maestro', to_jsonb(maestro_eliminado)
+    );
+end;
+$$;
+
+-- Solo el backend (llave service_role) puede dar de alta o baja maestros
+revoke execute on function public.crear_maestro(jsonb, jsonb) from public, anon, authenticated;
+revoke execute on function public.eliminar_maestro(text) from public, anon, authenticated;
+grant execute on function public.crear_maestro(jsonb, jsonb) to service_role;
+grant execute on function public.eliminar_maestro(text) to service_role;
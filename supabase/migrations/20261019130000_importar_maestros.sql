@@ -0,0 +1,26 @@
+-- Alta de maestros en lote para la importación masiva.
+--
+-- Inserta todos los usuarios y después todos los maestros de un lote con dos sentencias
+-- set-based, en una sola transacción: si cualquier fila falla se revierte el lote completo
+-- y el backend reintenta esas filas una por una con crear_maestro para reportar cada error.
+-- Regresa el arreglo de IDs creados.
+create or replace function public.crear_maestros(datos_usuarios jsonb, datos_maestros jsonb)
+returns jsonb
+language plpgsql
+as $$
+begin
+    insert into public.usuario
+    select * from jsonb_populate_recordset(null::public.usuario, datos_usuarios);
+
+    insert into public.maestro
+    select * from jsonb_populate_recordset(null::public.maestro, datos_maestros);
+
+    return (
+        select coalesce(jsonb_agg(m.id_usuario), '[]'::jsonb)
+        from jsonb_populate_recordset(null::public.maestro, datos_maestros) m
+    );
+end;
+$$;
+
+revoke execute on function public.crear_maestros(jsonb, jsonb) from public, anon, authenticated;
+grant execute on function public.crear_maestros(jsonb, jsonb) to service_role;
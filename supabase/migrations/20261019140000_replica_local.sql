@@ -0,0 +1,81 @@
+-- Soporte para la réplica local de lectura (app/utils/replica.py).
+--
+-- La réplica se sincroniza pidiendo las filas con actualizado_en reciente, así que cada tabla
+-- replicada lleva esa columna y un trigger que la pone en now() al insertar o actualizar
+-- (también cuando el INSERT la manda en null, como jsonb_populate_record en crear_maestro).
+-- Las filas borradas se anotan en replica_eliminaciones para que la réplica también las borre.
+
+create or replace function public.tocar_actualizado_en()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.actualizado_en := now();
+    return new;
+end;
+$$;
+
+create table if not exists public.replica_eliminaciones (
+    id_eliminacion bigserial primary key,
+    tabla text not null,
+    llave text not null,
+    eliminado_en timestamptz not null default now()
+);
+
+create index if not exists replica_eliminaciones_eliminado_en_idx
+    on public.replica_eliminaciones (eliminado_en);
+
+-- TG_ARGV[0]: columna de la llave primaria de la tabla
+create or replace function public.registrar_eliminacion()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into public.replica_eliminaciones (tabla, llave)
+    values (tg_table_name, to_jsonb(old) ->> tg_argv[0]);
+    return old;
+end;
+$$;
+
+do $$
+declare
+    replicada record;
+begin
+    for replicada in
+        select * from (values
+            ('grupo', 'id_grupo'),
+            ('curso', 'id_curso'),
+            ('maestro', 'id_usuario'),
+            ('alumno', 'id_alumno'),
+            ('asignacion', 'id_asignacion'),
+            ('horario_asignacion', 'id_horario'),
+            ('disponibilidad', 'id_disponibilidad')
+        ) as t(tabla, llave)
+    loop
+        execute format(
+            'alter table public.%I add column if not exists actualizado_en timestamptz not null default now()',
+            replicada.tabla
+        );
+        execute format(
+            'create index if not exists %I on public.%I (actualizado_en)',
+            replicada.tabla || '_actualizado_en_idx', replicada.tabla
+        );
+        execute format('drop trigger if exists tocar_actualizado_en on public.%I', replicada.tabla);
+        execute format(
+            'create trigger tocar_actualizado_en before insert or update on public.%I '
+            'for each row execute function public.tocar_actualizado_en()',
+            replicada.tabla
+        );
+        execute format('drop trigger if exists registrar_eliminacion on public.%I', replicada.tabla);
+        execute format(
+            'create trigger registrar_eliminacion after delete on public.%I '
+            'for each row execute function public.registrar_eliminacion(%L)',
+            replicada.tabla, replicada.llave
+        );
+    end loop;
+end;
+$$;
+
+-- Las réplicas que lleven más de 7 días sin sincronizar se recargan completas, así que
+-- las eliminaciones más viejas se pueden purgar, p. ej. con pg_cron:
+--   delete from public.replica_eliminaciones where eliminado_en < now() - interval '7 days';
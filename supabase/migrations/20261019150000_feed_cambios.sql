@@ -0,0 +1,65 @@
+-- Fuentes del feed de cambios (app/utils/cambios.py).
+--
+-- Polling: calificaciones y fechas_parciales también llevan actualizado_en y registran sus
+-- eliminaciones, con los triggers de 20261019140000_replica_local.sql.
+-- Realtime: las tablas de la aplicación se publican en supabase_realtime.
+
+do $$
+declare
+    tabla_feed record;
+begin
+    for tabla_feed in
+        select * from (values
+            ('calificaciones', 'id_calif_alum_curso'),
+            ('fechas_parciales', 'id_fecha_parcial')
+        ) as t(tabla, llave)
+    loop
+        execute format(
+            'alter table public.%I add column if not exists actualizado_en timestamptz not null default now()',
+            tabla_feed.tabla
+        );
+        execute format(
+            'create index if not exists %I on public.%I (actualizado_en)',
+            tabla_feed.tabla || '_actualizado_en_idx', tabla_feed.tabla
+        );
+        execute format('drop trigger if exists tocar_actualizado_en on public.%I', tabla_feed.tabla);
+        execute format(
+            'create trigger tocar_actualizado_en before insert or update on public.%I '
+            'for each row execute function public.tocar_actualizado_en()',
+            tabla_feed.tabla
+        );
+        execute format('drop trigger if exists registrar_eliminacion on public.%I', tabla_feed.tabla);
+        execute format(
+            'create trigger registrar_eliminacion after delete on public.%I '
+            'for each row execute function public.registrar_eliminacion(%L)',
+            tabla_feed.tabla, tabla_feed.llave
+        );
+    end loop;
+end;
+$$;
+
+-- Con replica identity full, los DELETE de Realtime traen la fila completa (old_record) y no
+-- solo la llave: los suscriptores necesitan id_alumno e id_maestro para invalidar solo lo afectado
+alter table public.calificaciones replica identity full;
+alter table public.asignacion replica identity full;
+
+-- "add table" falla si la tabla ya está publicada; solo se agregan las que faltan para que la
+-- migración se pueda aplicar otra vez
+do $$
+declare
+    tabla_publicada text;
+begin
+    foreach tabla_publicada in array array[
+        'grupo', 'curso', 'maestro', 'alumno', 'asignacion',
+        'horario_asignacion', 'disponibilidad', 'fechas_parciales', 'calificaciones'
+    ]
+    loop
+        if not exists (
+            select 1 from pg_publication_tables
+            where pubname = 'supabase_realtime' and schemaname = 'public' and tablename = tabla_publicada
+        ) then
+            execute format('alter publication supabase_realtime add table public.%I', tabla_publicada);
+        end if;
+    end loop;
+end;
+$$;
@@ -0,0 +1,24 @@
+-- Una ventana por asignación y parcial (app/services/fechas_parciales_service.py).
+--
+-- Las ventanas se crean con upsert sobre (id_asignacion, numero_parcial), así que dos aperturas
+-- concurrentes del mismo parcial ya no chocan; para eso la llave debe ser única.
+
+-- Duplicados previos: se conserva la ventana más antigua de cada asignación y parcial
+delete from public.fechas_parciales duplicada
+using public.fechas_parciales original
+where duplicada.id_asignacion = original.id_asignacion
+  and duplicada.numero_parcial = original.numero_parcial
+  and duplicada.id_fecha_parcial > original.id_fecha_parcial;
+
+do $$
+begin
+    if not exists (
+        select 1 from pg_constraint
+        where conname = 'fechas_parciales_id_asignacion_numero_parcial_key'
+          and conrelid = 'public.fechas_parciales'::regclass
+    ) then
+        alter table public.fechas_parciales
+            add constraint fechas_parciales_id_asignacion_numero_parcial_key unique (id_asignacion, numero_parcial);
+    end if;
+end;
+$$;
@@ -0,0 +1,34 @@
+import httpx
+import pytest
+from flask import Flask, jsonify
+from app.utils.metrics import instrumentar_app
+from app.utils.query_tracer import PresupuestoConsultasExcedido, configurar_trazado, presupuesto_consultas
+from app.utils.supabase_transport import TransporteInstrumentado
+
+def _crear_app():
+    app = Flask(__name__)
+    app.testing = True
+    instrumentar_app(app)
+    configurar_trazado(app)
+    cliente = httpx.Client(base_url='http://postgrest/rest/v1', transport=TransporteInstrumentado(
+        httpx.MockTransport(lambda request: httpx.Response(200, json=[]))))
+
+    @app.route('/grupos/<int:cantidad>', methods=['GET'])
+    @presupuesto_consultas(3)
+    def alumnos_por_grupo(cantidad):
+        # Una consulta por grupo: el patrón N+1 que marca el trazado
+        for id_grupo in range(cantidad):
+            cliente.get('/alumno', params={'id_grupo': f'eq.{id_grupo}'})
+        return jsonify({'success': True})
+
+    return app
+
+def test_una_vista_dentro_de_su_presupuesto_pasa_y_marca_n_mas_1():
+    response = _crear_app().test_client().get('/grupos/3')
+    assert response.status_code == 200
+    assert response.headers['X-Upstream-Queries'] == '3'
+    assert response.headers['X-N-Plus-One'] == 'GET alumno x3'
+
+def test_una_vista_que_excede_su_presupuesto_falla_en_modo_testing():
+    with pytest.raises(PresupuestoConsultasExcedido, match='ejecutó 4 consultas'):
+        _crear_app().test_client().get('/grupos/4')
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+from app.utils.singleflight import SingleFlight, TransporteCoalescido
+
+def test_seguidores_reintentan_si_el_lider_se_cancela():
+    vuelos = SingleFlight('prueba')
+    llamadas = []
+    resultado_hilo = {}
+
+    async def consultar():
+        llamadas.append(1)
+        await asyncio.sleep(0.2 if len(llamadas) == 1 else 0)
+        return len(llamadas)
+
+    def seguidor_sincrono():
+        resultado_hilo['valor'] = vuelos.hacer('llave', lambda: 'sync')
+
+    async def escenario():
+        lider = asyncio.ensure_future(vuelos.hacer_async('llave', consultar))
+        await asyncio.sleep(0.02)
+        seguidor = asyncio.ensure_future(vuelos.hacer_async('llave', consultar))
+        hilo = threading.Thread(target=seguidor_sincrono)
+        hilo.start()
+        await asyncio.sleep(0.02)
+        lider.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await lider
+        valor = await seguidor
+        await asyncio.get_running_loop().run_in_executor(None, hilo.join)
+        return valor
+
+    valor = asyncio.run(escenario())
+    # Ni el seguidor async ni el síncrono reciben la cancelación del líder: repiten la llamada
+    assert valor in (2, 'sync')
+    assert resultado_hilo['valor'] in (2, 'sync')
+
+def test_los_errores_del_lider_llegan_a_los_seguidores():
+    vuelos = SingleFlight('prueba')
+    inicio = threading.Event()
+    liberar = threading.Event()
+    errores = []
+
+    def fallar():
+        inicio.set()
+        liberar.wait(1)
+        raise ValueError('falla')
+
+    def seguidor():
+        try:
+            vuelos.hacer('llave', lambda: 'nunca')
+        except ValueError as e:
+            errores.append(e)
+
+    lider = threading.Thread(target=lambda: pytest.raises(ValueError, vuelos.hacer, 'llave', fallar))
+    lider.start()
+    inicio.wait(1)
+    hilo = threading.Thread(target=seguidor)
+    hilo.start()
+    time.sleep(0.05)
+    liberar.set()
+    lider.join()
+    hilo.join()
+    assert len(errores) == 1
+
+class _TransporteControlado(httpx.BaseTransport):
+    """Detiene la escritura y la primera lectura hasta que la prueba las libera."""
+    def __init__(self):
+        self.lecturas = 0
+        self.escritura_enviada = threading.Event()
+        self.liberar_escritura = threading.Event()
+        self.lectura_enviada = threading.Event()
+        self.liberar_lectura = threading.Event()
+
+    def handle_request(self, request):
+        if request.method != 'GET':
+            self.escritura_enviada.set()
+            self.liberar_escritura.wait(1)
+            return httpx.Response(204)
+        self.lecturas += 1
+        numero = self.lecturas
+        if numero == 1:
+            self.lectura_enviada.set()
+            self.liberar_lectura.wait(1)
+        return httpx.Response(200, json={'lectura': numero})
+
+def test_las_lecturas_posteriores_a_una_escritura_no_se_unen_a_las_previas():
+    interno = _TransporteControlado()
+    transporte = TransporteCoalescido(interno, SingleFlight('prueba'))
+    url = 'http://postgrest/rest/v1/alumno?select=*'
+    respuestas = {}
+
+    escritura = threading.Thread(target=lambda: transporte.handle_request(httpx.Request('PATCH', url)))
+    escritura.start()
+    interno.escritura_enviada.wait(1)
+    # B empieza a leer mientras la escritura está en curso: su respuesta puede no incluirla
+    lectura_b = threading.Thread(target=lambda: respuestas.setdefault('b', transporte.handle_request(httpx.Request('GET', url)).json()))
+    lectura_b.start()
+    interno.lectura_enviada.wait(1)
+    interno.liberar_escritura.set()
+    escritura.join()
+
+    # A lee después de que la escritura terminó: hace su propia consulta en lugar de esperar a B
+    respuestas['a'] = transporte.handle_request(httpx.Request('GET', url)).json()
+    interno.liberar_lectura.set()
+    lectura_b.join()
+
+    assert respuestas == {'a': {'lectura': 2}, 'b': {'lectura': 1}}
+    assert interno.lecturas == 2